@@ -0,0 +1,90 @@
+"""_file_history.py — session 単位の Edit/Read 履歴ストア (SQLite WAL)
+
+posttooluse-edit-history.py (書き手) と userpromptsubmit-edit-recheck-warn.py (読み手) で共有。
+1 行 = (session, file) ごとの「最後の Edit」「最後の Read」。
+  - 書き手: tool call 1回につき UPSERT 1回 (ファイル全体を読まない)
+  - 読み手: PRIMARY KEY (session, file) の prefix で「この session で Edit したファイル」だけを引く
+edit-history.jsonl / read-history.jsonl は互換エクスポートとして書き手が引き続き追記する。
+
+ts は書き手の isoformat (ローカル tz 付き)。同一マシン内なので文字列比較で前後判定できる。
+"""
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+DB_NAME = "file-history.db"
+EDIT_TOOLS = ("Edit", "Write", "MultiEdit", "NotebookEdit")
+READ_TOOLS = ("Read", "NotebookRead")
+RETENTION_DAYS = 30
+BUSY_TIMEOUT_MS = 2000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS touches (
+    session        TEXT NOT NULL,
+    file           TEXT NOT NULL,
+    last_edit_ts   TEXT,
+    last_edit_tool TEXT,
+    last_read_ts   TEXT,
+    updated        TEXT NOT NULL,
+    PRIMARY KEY (session, file)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS touches_updated ON touches(updated);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+"""
+
+
+def db_path():
+    return os.path.join(os.path.expanduser("~"), ".claude", "state", DB_NAME)
+
+
+def connect(path=None, create=True):
+    """create=False なら DB が無いとき None (読み手は書き手より先に走りうる)。"""
+    path = path or db_path()
+    if not create and not os.path.exists(path):
+        return None
+    if create:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    if create:
+        db.executescript(SCHEMA)
+    return db
+
+
+def record(db, session, tool, file, ts):
+    """1 tool call を反映。Edit 系 / Read 系以外は無視。"""
+    if tool in EDIT_TOOLS:
+        db.execute(
+            "INSERT INTO touches(session, file, last_edit_ts, last_edit_tool, updated) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(session, file) DO UPDATE SET"
+            " last_edit_ts = excluded.last_edit_ts, last_edit_tool = excluded.last_edit_tool,"
+            " updated = excluded.updated",
+            (session, file, ts, tool, ts))
+    elif tool in READ_TOOLS:
+        db.execute(
+            "INSERT INTO touches(session, file, last_read_ts, updated) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(session, file) DO UPDATE SET"
+            " last_read_ts = excluded.last_read_ts, updated = excluded.updated",
+            (session, file, ts, ts))
+    prune_daily(db, ts)
+
+
+def prune_daily(db, ts):
+    """RETENTION_DAYS より古い行を1日1回だけ消す (判定は meta の日付1行を引くだけ)。"""
+    today = ts[:10]
+    row = db.execute("SELECT value FROM meta WHERE key = 'pruned'").fetchone()
+    if row and row[0] == today:
+        return
+    cutoff = (datetime.now().astimezone() - timedelta(days=RETENTION_DAYS)).isoformat()
+    db.execute("DELETE FROM touches WHERE updated < ?", (cutoff,))
+    db.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('pruned', ?)", (today,))
+
+
+def edited_files(db, session):
+    """この session で Edit したファイル: [(file, last_edit_tool, last_edit_ts, last_read_ts|None)]。
+    最後の Edit が古い順。"""
+    return db.execute(
+        "SELECT file, last_edit_tool, last_edit_ts, last_read_ts FROM touches"
+        " WHERE session = ? AND last_edit_ts IS NOT NULL ORDER BY last_edit_ts",
+        (session,)).fetchall()
@@ -0,0 +1,51 @@
+"""_history_jsonl.py — edit-history.jsonl / read-history.jsonl の読み手共通ヘルパ
+
+posttooluse-edit-history.py は SEGMENT_LINES 行で現行ファイルを <stem>.1.jsonl へ丸ごと改名する
+(現行は空から始まる)。現行だけを読むと rotate 直後にその session の前半を取りこぼすので、
+読み手は必ずここを通して「.1 → 現行」の順に読む。
+
+現行を先に open するので、間で rotate されても取りこぼさない (重複はありうる)。
+hook の heredoc からも import するため標準ライブラリの json だけに依存する。
+"""
+import json
+from pathlib import Path
+
+
+def segments(path):
+    """[<stem>.1.jsonl, path] (古い順)。"""
+    path = Path(path)
+    return [path.with_name(path.stem + ".1" + path.suffix), path]
+
+
+def iter_lines(path):
+    """.1 → 現行の順に生の行 (改行付き) を yield。どちらも無ければ何も出さない。"""
+    files = []
+    for p in reversed(segments(path)):
+        try:
+            files.append(p.open(encoding="utf-8", errors="replace"))
+        except FileNotFoundError:
+            continue
+    for f in reversed(files):
+        with f:
+            yield from f
+
+
+def load_jsonl(path):
+    """.1 → 現行の順に全行を dict で (空行・壊れた行は飛ばす)。"""
+    entries = []
+    for line in iter_lines(path):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(entry, dict):
+            entries.append(entry)
+    return entries
+
+
+def exists(path):
+    """現行か .1 のどちらかがあるか。"""
+    return any(p.exists() for p in segments(path))
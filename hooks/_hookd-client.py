@@ -0,0 +1,238 @@
+#!/usr/bin/env -S python3 -I -S
+"""_hookd-client.py — Python フックの入口 shim (常駐実行 + 呼び出しごとのプロファイル)
+
+settings.json: "command": "~/.claude/hooks/_hookd-client.py --event PreToolUse block-host-installs.py"
+Python フックは常にこの shim 経由なので、計測は追加のプロセス無しで済む (p50 +0.4ms 実測)。
+シェルフックは既定で直接登録 (shim を挟むと interpreter 起動が1回増える)。計測したい期間だけ
+_profile-toggle.py on で同じ形に包む。
+
+Python フック (*.py): 自分の fd 0/2 (+ stdout) と argv / cwd / 環境変数を _hookd.py に渡し、
+返ってきた終了コードで exit する (stdin / stderr はフックが直接読み書きする)。
+デーモンに繋がらない・デーモンがそのフックを知らないときは、デーモンを裏で起動してから
+フックを直接実行する (従来と同じ実行)。HOOKD_DISABLE=1 なら常に直接実行。
+それ以外 (*.sh 等・_profile-toggle.py on のときだけ来る): 直接実行。
+
+プロファイル (HOOK_PROFILE=0 で無効): 1呼び出しにつき壁時計 / 終了コード / stdout バイト数 /
+イベント種別 / フック名を ~/.claude/state/hook-profile.bin に固定長 (RECORD.size) で追記する。
+stdout はバイト数を数えるため pipe 経由で中継する。PROFILE_MAX_BYTES を超えたら .1 へ回して新規。
+集計: python3 ~/.claude/hooks/_profile-analyze.py
+接続先 / 記録先は HOOKD_SOCKET / HOOK_PROFILE_LOG で上書きできる (テスト用)。
+
+起動コストを削るため -S (site 無し) で、socket ではなく C 実装の _socket を直接使う
+(socket は selectors/enum を引き込み import だけで ~15ms。shim の存在意義が消える)。
+同じ理由で signal / json / struct ではなく _signal / 自前 encoder / _struct。
+"""
+import _signal
+import _socket
+import _struct
+import os
+import select
+import sys
+import time
+
+HOOKS_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_DIR = os.path.join(os.path.expanduser("~"), ".claude", "state")
+SOCK_PATH = os.environ.get("HOOKD_SOCKET") or os.path.join(STATE_DIR, "hookd.sock")
+PROFILE_LOG = os.environ.get("HOOK_PROFILE_LOG") or os.path.join(STATE_DIR, "hook-profile.bin")
+DAEMON = os.path.join(HOOKS_DIR, "_hookd.py")
+CONNECT_TIMEOUT = 0.5  # seconds
+PROFILE_MAX_BYTES = 4 << 20  # 96B x ~43k 呼び出し
+# 開始 epoch 秒 / 所要 µs / 終了コード / stdout バイト数 / イベント / フック名 (_profile-analyze.py と共有)
+RECORD = _struct.Struct("<dIhI18s60s")
+# フック終了後、stdout を握ったままの孫プロセス (バックグラウンド起動) を待たない猶予
+DRAIN_TIMEOUT = 0.05  # seconds
+
+
+def hook_path(name):
+    return os.path.join(HOOKS_DIR, name)
+
+
+def exec_direct(name, argv):
+    _signal.signal(_signal.SIGPIPE, _signal.SIG_DFL)  # Python が無視にした SIGPIPE をフックに持ち越さない
+    path = hook_path(name)
+    os.execv(path, [path] + argv)
+
+
+def start_daemon():
+    """二重起動はデーモン側の flock で弾く。失敗しても直接実行で続行。"""
+    try:
+        if os.fork() == 0:
+            os.setsid()
+            null = os.open(os.devnull, os.O_RDWR)
+            for fd in (0, 1, 2):
+                os.dup2(null, fd)
+            if os.fork() == 0:
+                os.execv(sys.executable, [sys.executable, "-I", DAEMON, "--socket", SOCK_PATH])
+            os._exit(0)
+        os.wait()
+    except OSError:
+        pass
+
+
+class Relay:
+    """フックの stdout を pipe で受けて本物の stdout に流し、バイト数を数える。"""
+
+    def __init__(self):
+        self.r, self.w = os.pipe()
+        self.nbytes = 0
+        self.eof = False
+        self.broken = False  # `| head` 等で読み手が先に閉じた後も読み捨てて子を詰まらせない
+
+    def pump(self, timeout):
+        """読めた分を流す。データを読めたら True (timeout / EOF は False)。"""
+        if not select.select([self.r], [], [], timeout)[0]:
+            return False
+        data = os.read(self.r, 65536)
+        if not data:
+            self.eof = True
+            return False
+        self.nbytes += len(data)
+        while data and not self.broken:
+            try:
+                data = data[os.write(1, data):]
+            except OSError:
+                self.broken = True
+        return True
+
+    def drain(self):
+        while not self.eof and self.pump(DRAIN_TIMEOUT):
+            pass
+        os.close(self.r)
+
+
+def spawn(name, argv, profile):
+    """直接実行して (終了コード, stdout バイト数)。終了コードは shell と同じ (シグナル死は 128+N)。"""
+    path = hook_path(name)
+    relay = Relay() if profile else None
+    actions = [(os.POSIX_SPAWN_DUP2, relay.w, 1)] if relay else []
+    pid = os.posix_spawn(path, [path] + argv, os.environ, file_actions=actions,
+                         setsigdef=[_signal.SIGPIPE])
+    status = None
+    if relay:
+        os.close(relay.w)
+        while not relay.eof:
+            if relay.pump(DRAIN_TIMEOUT) or relay.eof:
+                continue
+            done, st = os.waitpid(pid, os.WNOHANG)
+            if done:
+                status = st
+                break
+        relay.drain()
+    if status is None:
+        status = os.waitpid(pid, 0)[1]
+    code = os.waitstatus_to_exitcode(status)
+    return (128 - code if code < 0 else code), (relay.nbytes if relay else 0)
+
+
+def via_daemon(name, argv, profile):
+    """デーモンで実行して (終了コード, stdout バイト数)。
+    デーモン不在・未知フックなら None (フックは何も実行されていない)。"""
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(SOCK_PATH)
+        sock.settimeout(None)
+    except OSError:
+        sock.close()
+        start_daemon()
+        return None
+
+    # ここから先はフックが走り始めている可能性があるので、失敗しても直接実行で二重に走らせない
+    relay = Relay() if profile else None
+    reply = b""
+    try:
+        header = repr_json({"hook": name, "argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)})
+        data = header.encode("utf-8") + b"\n"
+        fds = b"".join(fd.to_bytes(4, sys.byteorder) for fd in (0, relay.w if relay else 1, 2))
+        sent = sock.sendmsg([data], [(_socket.SOL_SOCKET, _socket.SCM_RIGHTS, fds)])
+        sock.sendall(data[sent:])
+        if relay:
+            os.close(relay.w)
+            # 終了コードが届くまで stdout を中継
+            while not relay.eof and sock not in select.select([relay.r, sock], [], [])[0]:
+                relay.pump(0)
+        while not reply.endswith(b"\n"):
+            chunk = sock.recv(64)
+            if not chunk:
+                break
+            reply += chunk
+    except OSError as e:
+        sys.stderr.write(f"[hookd] {name}: {e}\n")
+    sock.close()
+    if relay:
+        relay.drain()
+
+    reply = reply.strip()
+    if reply == b"N":
+        return None
+    if not reply:
+        sys.stderr.write(f"[hookd] no exit status for {name}\n")
+        reply = b"1"
+    return int(reply), (relay.nbytes if relay else 0)
+
+
+def record(event, name, start, elapsed, code, nbytes):
+    """best-effort。記録の失敗でフックの結果を変えない。"""
+    try:
+        fd = os.open(PROFILE_LOG, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size >= PROFILE_MAX_BYTES:
+                os.replace(PROFILE_LOG, PROFILE_LOG + ".1")
+                os.close(fd)
+                fd = os.open(PROFILE_LOG, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            os.write(fd, RECORD.pack(start, min(int(elapsed * 1e6), 0xFFFFFFFF),
+                                     max(-32768, min(code, 32767)), min(nbytes, 0xFFFFFFFF),
+                                     event.encode("utf-8")[:18], name.encode("utf-8")[:60]))
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def parse_args(args):
+    event = ""
+    if args[:1] == ["--event"] and len(args) >= 2:
+        event, args = args[1], args[2:]
+    if not args:
+        sys.stderr.write("usage: _hookd-client.py [--event EVENT] HOOK [ARGS...]\n")
+        sys.exit(2)
+    return event, os.path.basename(args[0]), args[1:]
+
+
+def main():
+    event, name, argv = parse_args(sys.argv[1:])
+    profile = os.environ.get("HOOK_PROFILE") != "0"
+    use_daemon = name.endswith(".py") and os.environ.get("HOOKD_DISABLE") != "1"
+
+    start, t0 = time.time(), time.perf_counter()
+    result = via_daemon(name, argv, profile) if use_daemon else None
+    if result is None:
+        if not profile:
+            exec_direct(name, argv)
+        result = spawn(name, argv, profile)
+    code, nbytes = result
+    if profile:
+        record(event, name, start, time.perf_counter() - t0, code, nbytes)
+    sys.exit(code)
+
+
+def repr_json(obj):
+    # json は import が重い (-S でも ~3ms) ので str/list/dict だけの最小 encoder
+    if isinstance(obj, dict):
+        return "{" + ",".join(f"{repr_json(k)}:{repr_json(v)}" for k, v in obj.items()) + "}"
+    if isinstance(obj, list):
+        return "[" + ",".join(repr_json(v) for v in obj) + "]"
+    out = ['"']
+    for ch in obj:
+        if ch == '"' or ch == "\\":
+            out.append("\\" + ch)
+        elif ch < " " or "\ud800" <= ch <= "\udfff":
+            out.append(f"\\u{ord(ch):04x}")
+        else:
+            out.append(ch)
+    out.append('"')
+    return "".join(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env -S python3 -I
+"""_hookd.py — Python フックの常駐ランナー (Unix socket)
+
+フックは tool call / prompt のたびに `python3` を新規起動し、interpreter 起動 + import を毎回払う。
+このデーモンは hooks/*.py (フック実装・`_` prefix 以外) を起動時に compile して
+import を温めておき (Hook.load)、_hookd-client.py からの要求ごとに fork して子でフック本体を実行する。
+
+契約は直接実行と同じ:
+  - client は自分の fd 0/1/2 を SCM_RIGHTS で渡す → 子はそれを dup2 して stdin/stdout/stderr に
+    (stdin JSON はフックが直接読む・subprocess への継承もそのまま)
+  - argv / cwd / 環境変数は client のものを子に適用
+  - 終了コードは SystemExit を直接実行時と同じ規則で変換 (None→0 / int / その他→stderr に出して 1)、
+    未捕捉例外は traceback を stderr に出して 1
+  - shebang に -I の無いフックは sys.path[0] にフックの dir を入れる (スクリプト直接実行と同じ)
+fork するのでフック間・要求間でグローバル状態は共有しない。
+
+自己管理:
+  - フックのファイルが更新されたら次の要求で compile し直す
+  - _hookd.py 自身が更新されたら次の要求を返した後に終了 (次の client が起動し直す)
+  - IDLE_TIMEOUT 無要求で終了
+  - 二重起動は hookd.sock.lock の flock で防ぐ
+
+起動: client が接続できなかったとき自動で起動する (手動: python3 -I ~/.claude/hooks/_hookd.py)
+停止: kill $(cat ~/.claude/state/hookd.pid)
+"""
+import argparse
+import ast
+import builtins
+import fcntl
+import json
+import os
+import re
+import signal
+import socket
+import sys
+import traceback
+
+HOOKS_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_DIR = os.path.join(os.path.expanduser("~"), ".claude", "state")
+SOCK_PATH = os.path.join(STATE_DIR, "hookd.sock")
+IDLE_TIMEOUT = 6 * 3600  # seconds
+CHILD_TIMEOUT = 120  # seconds。settings.json の timeout より長く、暴走した子だけを止める
+HEADER_MAX = 1 << 20
+MAIN_GUARD_RE = re.compile(rb"^if __name__ == [\"']__main__[\"']:", re.M)
+
+
+class Hook:
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.code = None
+        self.isolated = False
+
+    def load(self):
+        """compile して import / re.compile を温める。
+
+        `if __name__ == "__main__":` ガードのあるフックは本体を __name__ != "__main__" で1回実行
+        (module 定数の正規表現まで温まる)。ガードの無いフックは本体に副作用があるので
+        トップレベルの import 文だけ実行する。
+        """
+        st = os.stat(self.path)
+        if st.st_mtime == self.mtime:
+            return
+        with open(self.path, "rb") as f:
+            src = f.read()
+        first = src.split(b"\n", 1)[0]
+        self.isolated = first.startswith(b"#!") and b" -I" in first
+        tree = ast.parse(src, self.path)
+        self.code = compile(tree, self.path, "exec")
+        self.mtime = st.st_mtime
+        if MAIN_GUARD_RE.search(src):
+            warm = self.code
+        else:
+            imports = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+            warm = compile(ast.Module(body=imports, type_ignores=[]), self.path, "exec")
+        try:
+            exec(warm, {"__name__": "_hookd_preload", "__file__": self.path,
+                        "__builtins__": builtins})
+        except BaseException:
+            pass  # 温めるだけ。失敗は実行時に直接実行と同じ形で表に出る
+
+
+def discover(hooks_dir):
+    return {name: Hook(os.path.join(hooks_dir, name))
+            for name in sorted(os.listdir(hooks_dir))
+            if name.endswith(".py") and not name.startswith("_")}
+
+
+def exit_code(e):
+    """SystemExit → プロセス終了コード (直接実行時の規則)。"""
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code & 0xFF
+    try:
+        sys.stderr.write(f"{e.code}\n")
+    except Exception:
+        pass
+    return 1
+
+
+def run_child(hook, req, fds, conn, inherited):
+    """fork 後の子。フックを __main__ として実行し、終了コードを conn に返して _exit。"""
+    code = 1
+    try:
+        for f in inherited:  # listen socket / lock はフック側に持ち越さない
+            f.close()
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)  # subprocess.wait が効くように戻す
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.alarm(CHILD_TIMEOUT)
+        for target, fd in enumerate(fds[:3]):
+            os.dup2(fd, target)
+        for fd in fds:
+            if fd > 2:
+                os.close(fd)
+        sys.stdin = open(0, "r", encoding="utf-8", closefd=False)
+        sys.stdout = open(1, "w", encoding="utf-8", closefd=False)
+        sys.stderr = open(2, "w", encoding="utf-8", errors="backslashreplace",
+                          buffering=1, closefd=False)
+        os.environ.clear()
+        os.environ.update(req.get("env") or {})
+        os.chdir(req.get("cwd") or "/")
+        sys.argv = [hook.path] + list(req.get("argv") or [])
+        if not hook.isolated:
+            sys.path.insert(0, os.path.dirname(hook.path))
+        try:
+            exec(hook.code, {"__name__": "__main__", "__file__": hook.path,
+                             "__builtins__": builtins})
+            code = 0
+        except SystemExit as e:
+            code = exit_code(e)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+    finally:
+        try:
+            conn.sendall(f"{code}\n".encode())
+        except Exception:
+            pass
+        os._exit(0)
+
+
+def recv_request(conn):
+    """client の1行 JSON ヘッダと fd 0/1/2 を受け取る。"""
+    buf, fds = b"", []
+    while b"\n" not in buf:
+        data, got, _flags, _addr = socket.recv_fds(conn, 65536, 3)
+        fds += got
+        if not data:
+            break
+        buf += data
+        if len(buf) > HEADER_MAX:
+            raise ValueError("header too large")
+    return json.loads(buf.split(b"\n", 1)[0]), fds
+
+
+def handle(conn, hooks, hooks_dir, inherited):
+    fds = []
+    try:
+        req, fds = recv_request(conn)
+        name = req.get("hook")
+        hook = hooks.get(name)
+        if hook is None and name in discover(hooks_dir):  # 起動後に追加されたフック
+            hook = hooks[name] = Hook(os.path.join(hooks_dir, name))
+        if hook is None or len(fds) != 3:
+            conn.sendall(b"N\n")  # 知らないフック → client が直接実行にフォールバック
+            return
+        try:
+            hook.load()
+        except (OSError, SyntaxError):
+            conn.sendall(b"N\n")
+            return
+        try:
+            pid = os.fork()
+        except OSError:
+            conn.sendall(b"N\n")
+            return
+        if pid == 0:
+            run_child(hook, req, fds, conn, inherited)
+    except (OSError, ValueError):
+        pass
+    finally:
+        for fd in fds:
+            os.close(fd)
+        conn.close()
+
+
+def serve(sock_path, hooks_dir, idle_timeout):
+    os.makedirs(os.path.dirname(sock_path), exist_ok=True)
+    lock = open(sock_path + ".lock", "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return 0  # 既に起動中
+    try:
+        os.unlink(sock_path)
+    except FileNotFoundError:
+        pass
+    hooks = discover(hooks_dir)
+    for hook in hooks.values():
+        try:
+            hook.load()
+        except (OSError, SyntaxError):
+            pass
+
+    old_umask = os.umask(0o177)
+    srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    srv.bind(sock_path)
+    os.umask(old_umask)
+    srv.listen(64)
+    srv.settimeout(idle_timeout)
+    with open(os.path.join(os.path.dirname(sock_path), "hookd.pid"), "w") as f:
+        f.write(f"{os.getpid()}\n")
+
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # 子は自動回収
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    self_path = os.path.abspath(__file__)
+    self_mtime = os.stat(self_path).st_mtime
+    try:
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except socket.timeout:
+                break
+            conn.settimeout(None)
+            handle(conn, hooks, hooks_dir, (srv, lock))
+            try:
+                if os.stat(self_path).st_mtime != self_mtime:
+                    break
+            except OSError:
+                break
+    finally:
+        srv.close()
+        try:
+            os.unlink(sock_path)
+        except OSError:
+            pass
+    return 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="resident runner for ~/.claude/hooks/*.py")
+    ap.add_argument("--socket", default=SOCK_PATH)
+    ap.add_argument("--hooks-dir", default=HOOKS_DIR)
+    ap.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT)
+    args = ap.parse_args()
+    sys.exit(serve(args.socket, args.hooks_dir, args.idle_timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Aggregate ~/.claude/state/hook-profile.bin (written by _hookd-client.py) into a hook latency report.
+
+Sections:
+  1. per hook      — n / p50 / p95 / p99 / max / total / non-zero exits / mean stdout bytes
+  2. per event     — critical path of each event occurrence (SessionStart, Stop, PreToolUse, ...):
+                     sum of all hooks' wall time (= cost of the event) and first-start→last-end wall
+  3. regressions   — last --window days vs the --baseline days before it, per hook and per event
+
+Hooks of one event are launched together, so an occurrence is the run of same-event records whose
+start falls within JOIN_WINDOW of the first one (a hook seen twice starts a new occurrence).
+
+Usage:
+  python3 ~/.claude/hooks/_profile-analyze.py              # all data
+  python3 ~/.claude/hooks/_profile-analyze.py --days 7     # last 7 days only
+  python3 ~/.claude/hooks/_profile-analyze.py --top 10     # top 10 hooks by p95
+  python3 ~/.claude/hooks/_profile-analyze.py --window 7 --baseline 28
+"""
+import argparse
+import struct
+import time
+from collections import defaultdict
+from pathlib import Path
+from statistics import median
+
+# same layout as RECORD in _hookd-client.py
+RECORD = struct.Struct("<dIhI18s60s")
+JOIN_WINDOW = 1.0  # seconds
+# regression: p95 grew by both this ratio and this many ms, with at least MIN_N samples on each side
+REGRESSION_RATIO = 1.5
+REGRESSION_MIN_MS = 10
+MIN_N = 5
+
+
+class Rec:
+    __slots__ = ("start", "ms", "exit_code", "stdout_bytes", "event", "hook")
+
+    def __init__(self, start, us, exit_code, stdout_bytes, event, hook):
+        self.start = start
+        self.ms = us / 1000
+        self.exit_code = exit_code
+        self.stdout_bytes = stdout_bytes
+        self.event = event.rstrip(b"\0").decode("utf-8", "replace") or "?"
+        self.hook = hook.rstrip(b"\0").decode("utf-8", "replace")
+
+    @property
+    def end(self):
+        return self.start + self.ms / 1000
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    k = (len(sorted_values) - 1) * (pct / 100)
+    f = int(k)
+    c = min(f + 1, len(sorted_values) - 1)
+    if f == c:
+        return sorted_values[f]
+    return sorted_values[f] + (sorted_values[c] - sorted_values[f]) * (k - f)
+
+
+def load(log_path):
+    """rotated (.1) → current の順に全レコード。末尾の書きかけ (RECORD.size 未満) は捨てる。"""
+    recs = []
+    for path in (Path(str(log_path) + ".1"), Path(log_path)):
+        if not path.exists():
+            continue
+        data = path.read_bytes()
+        usable = len(data) - len(data) % RECORD.size
+        recs.extend(Rec(*t) for t in RECORD.iter_unpack(data[:usable]))
+    recs.sort(key=lambda r: r.start)
+    return recs
+
+
+def occurrences(recs):
+    """event → [[Rec, ...], ...] (1要素 = 1回のイベント発火)。"""
+    by_event = defaultdict(list)
+    open_occ = {}
+    for r in recs:
+        occ = open_occ.get(r.event)
+        if occ is None or r.start > occ[0].start + JOIN_WINDOW or any(o.hook == r.hook for o in occ):
+            occ = [r]
+            open_occ[r.event] = occ
+            by_event[r.event].append(occ)
+        else:
+            occ.append(r)
+    return by_event
+
+
+def hook_rows(recs):
+    by_hook = defaultdict(list)
+    for r in recs:
+        by_hook[r.hook].append(r)
+    rows = []
+    for hook, rs in by_hook.items():
+        durations = sorted(r.ms for r in rs)
+        rows.append({
+            "hook": hook,
+            "n": len(rs),
+            "p50": median(durations),
+            "p95": percentile(durations, 95),
+            "p99": percentile(durations, 99),
+            "max": durations[-1],
+            "total_s": sum(durations) / 1000,
+            "non_zero_exits": sum(1 for r in rs if r.exit_code != 0),
+            "stdout_avg": sum(r.stdout_bytes for r in rs) / len(rs),
+        })
+    return rows
+
+
+def event_rows(recs):
+    rows = []
+    for event, occs in occurrences(recs).items():
+        sums = sorted(sum(r.ms for r in occ) for occ in occs)
+        walls = sorted((max(r.end for r in occ) - occ[0].start) * 1000 for occ in occs)
+        share = defaultdict(float)
+        for occ in occs:
+            for r in occ:
+                share[r.hook] += r.ms
+        top = max(share, key=share.get)
+        rows.append({
+            "event": event,
+            "n": len(occs),
+            "hooks": sum(len(o) for o in occs) / len(occs),
+            "sum_p50": median(sums),
+            "sum_p95": percentile(sums, 95),
+            "wall_p50": median(walls),
+            "wall_p95": percentile(walls, 95),
+            "top": f"{top} ({share[top] / sum(share.values()):.0%})",
+        })
+    rows.sort(key=lambda r: r["sum_p95"], reverse=True)
+    return rows
+
+
+def regressions(recs, now, window_days, baseline_days):
+    """(種別, 名前, base n, base p95, recent n, recent p95)。種別は hook / event。"""
+    split = now - window_days * 86400
+    lo = split - baseline_days * 86400
+    base = [r for r in recs if lo <= r.start < split]
+    recent = [r for r in recs if r.start >= split]
+    out = []
+
+    def compare(kind, base_map, recent_map):
+        for name, cur in recent_map.items():
+            old = base_map.get(name)
+            if not old or len(old) < MIN_N or len(cur) < MIN_N:
+                continue
+            b95, c95 = percentile(sorted(old), 95), percentile(sorted(cur), 95)
+            if c95 >= b95 * REGRESSION_RATIO and c95 - b95 >= REGRESSION_MIN_MS:
+                out.append((kind, name, len(old), b95, len(cur), c95))
+
+    def by_hook(rs):
+        d = defaultdict(list)
+        for r in rs:
+            d[r.hook].append(r.ms)
+        return d
+
+    def by_event(rs):
+        return {e: [sum(r.ms for r in occ) for occ in occs] for e, occs in occurrences(rs).items()}
+
+    compare("hook", by_hook(base), by_hook(recent))
+    compare("event", by_event(base), by_event(recent))
+    out.sort(key=lambda t: t[5] - t[3], reverse=True)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=0, help="filter to last N days (0=all)")
+    ap.add_argument("--top", type=int, default=0, help="show top N hooks by p95 (0=all)")
+    ap.add_argument("--window", type=int, default=7, help="regression: recent window in days")
+    ap.add_argument("--baseline", type=int, default=28, help="regression: baseline days before the window")
+    ap.add_argument("--log", default=str(Path.home() / ".claude/state/hook-profile.bin"))
+    args = ap.parse_args()
+
+    recs = load(args.log)
+    if not recs:
+        print(f"No records in {args.log}")
+        return
+    now = time.time()
+    all_recs = recs
+    if args.days > 0:
+        recs = [r for r in recs if r.start >= now - args.days * 86400]
+    if not recs:
+        print(f"No records found in last {args.days} days.")
+        return
+
+    rows = hook_rows(recs)
+    rows.sort(key=lambda r: r["p95"], reverse=True)
+    n_hooks = len(rows)
+    if args.top:
+        rows = rows[:args.top]
+    print(f"# Hook profiling report  (records: {len(recs)}, hooks: {n_hooks}"
+          + (f", last {args.days}d" if args.days else "") + ")")
+    print(f"# Log: {args.log}")
+    print()
+    header = (f"{'hook':<40} {'n':>6} {'p50ms':>7} {'p95ms':>7} {'p99ms':>7} {'maxms':>7} "
+              f"{'total_s':>9} {'fails':>6} {'stdoutB':>8}")
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(f"{r['hook']:<40} {r['n']:>6} {r['p50']:>7.0f} {r['p95']:>7.0f} {r['p99']:>7.0f} "
+              f"{r['max']:>7.0f} {r['total_s']:>9.1f} {r['non_zero_exits']:>6} {r['stdout_avg']:>8.0f}")
+    print()
+    print(f"# Total wall time spent in measured hooks: {sum(r.ms for r in recs) / 1000:.1f}s")
+
+    print()
+    print("# Per-event critical path  (sum = all hooks of one occurrence added up, wall = first start → last end)")
+    header = (f"{'event':<18} {'n':>6} {'hooks':>6} {'sum p50':>8} {'sum p95':>8} "
+              f"{'wall p50':>9} {'wall p95':>9}  top contributor")
+    print(header)
+    print("-" * len(header))
+    for r in event_rows(recs):
+        print(f"{r['event']:<18} {r['n']:>6} {r['hooks']:>6.1f} {r['sum_p50']:>8.0f} {r['sum_p95']:>8.0f} "
+              f"{r['wall_p50']:>9.0f} {r['wall_p95']:>9.0f}  {r['top']}")
+
+    print()
+    print(f"# Regressions  (p95, last {args.window}d vs the {args.baseline}d before;"
+          f" >= x{REGRESSION_RATIO} and +{REGRESSION_MIN_MS}ms, n >= {MIN_N})")
+    found = regressions(all_recs, now, args.window, args.baseline)
+    if not found:
+        print("none")
+    for kind, name, bn, b95, cn, c95 in found:
+        print(f"{kind:<6} {name:<40} {b95:>7.0f}ms (n={bn}) -> {c95:>7.0f}ms (n={cn})  x{c95 / max(b95, 0.001):.1f}")
+
+
+if __name__ == "__main__":
+    main()
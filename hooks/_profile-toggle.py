@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""_profile-toggle.py — シェルフックのプロファイル計測を settings.json で入り切りする (既定: 切)
+
+Python フックは常に _hookd-client.py 経由 (常駐実行) なので、計測はその shim の中で済み追加コストは無い。
+シェルフックを shim に通すと interpreter 起動が1回増える (trivial な .sh で p50 +26ms 実測) ため、
+既定では settings.json に直接登録し、調べたい期間だけここで包む:
+
+  on     ~/.claude/hooks/<hook>.sh → ~/.claude/hooks/_hookd-client.py --event <Event> <hook>.sh
+  off    上の逆 (既定の登録に戻す)
+  status 包んでいる / 直接のシェルフック数
+
+settings.json は書式 (インデント・エスケープ・キー順) を保つため JSON を書き直さず、
+"command" 行の文字列だけを置換する。イベントはその行が属する hooks.<Event> ブロック。
+書込みは同じディレクトリの一時ファイル → os.replace。設定の変更は次のセッションから効く。
+
+使い方: python3 ~/.claude/hooks/_profile-toggle.py on|off|status [--settings PATH]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+SETTINGS = Path.home() / ".claude" / "settings.json"
+EVENT_LINE = re.compile(r'^    "(\w+)": \[')
+DIRECT = re.compile(r'~/\.claude/hooks/(?!_)([\w.\-]+\.sh)\b')
+WRAPPED = re.compile(r'~/\.claude/hooks/_hookd-client\.py --event \w+ ([\w.\-]+\.sh)\b')
+
+
+def rewrite(text, mode):
+    """(新しい本文, 書き換えたコマンド数)。mode: on / off。"""
+    out, n, event, in_hooks = [], 0, None, False
+    for line in text.splitlines(keepends=True):
+        if line.startswith('  "hooks": {'):
+            in_hooks = True
+        elif in_hooks and line.startswith("  }"):
+            in_hooks = False
+        m = EVENT_LINE.match(line)
+        if in_hooks and m:
+            event = m.group(1)
+        if in_hooks and event and '"command":' in line:
+            if mode == "on":
+                line, k = DIRECT.subn(
+                    lambda m: "~/.claude/hooks/_hookd-client.py --event %s %s" % (event, m.group(1)), line)
+            else:
+                line, k = WRAPPED.subn(lambda m: "~/.claude/hooks/" + m.group(1), line)
+            n += k
+        out.append(line)
+    return "".join(out), n
+
+
+def count(text):
+    """(包んでいるシェルフック数, 直接のシェルフック数)。"""
+    cmds = [l for l in text.splitlines() if '"command":' in l]
+    return sum(len(WRAPPED.findall(l)) for l in cmds), sum(len(DIRECT.findall(l)) for l in cmds)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="シェルフックのプロファイル計測を入り切りする")
+    ap.add_argument("mode", choices=("on", "off", "status"))
+    ap.add_argument("--settings", type=Path, default=SETTINGS)
+    args = ap.parse_args()
+
+    text = args.settings.read_text(encoding="utf-8")
+    if args.mode == "status":
+        wrapped, direct = count(text)
+        print(f"shell hooks: profiled {wrapped} / direct {direct}")
+        return 0
+    new, n = rewrite(text, args.mode)
+    if n:
+        fd, tmp = tempfile.mkstemp(dir=str(args.settings.parent), prefix=".settings.", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(new)
+        os.chmod(tmp, os.stat(args.settings).st_mode & 0o777)
+        os.replace(tmp, args.settings)
+    print(f"{args.mode}: {n} shell hook command(s) rewritten (次のセッションから有効)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,10 +7,12 @@ INPUT=$(cat)
 # Stop 時: 同一セッションの編集履歴を観測し、project 知見だけが編集された場合に1回だけ警告する。
 # warn-only / fail-open: stdout への注意喚起のみで、終了コードによるブロックは行わない。
 export HOOK_INPUT="$INPUT"
+export HOOKS_DIR="$(cd "$(dirname "$0")" && pwd)"
 python3 -I <<'PYWARN'
 import hashlib
 import json
 import os
+import sys
 from pathlib import Path
 
 try:
@@ -21,16 +23,15 @@ try:
 
     home = Path.home()
     state_dir = home / ".claude" / "state"
+    # 現行 + 1つ前の segment (posttooluse-edit-history.py が丸ごと改名で rotate)
+    sys.path.insert(0, os.environ.get("HOOKS_DIR", ""))
+    from _history_jsonl import exists, load_jsonl
     history = state_dir / "edit-history.jsonl"
-    if not history.exists():
+    if not exists(history):
         raise SystemExit(0)
 
     edited = []
-    for line in history.read_text(encoding="utf-8", errors="replace").splitlines():
-        try:
-            entry = json.loads(line)
-        except (json.JSONDecodeError, TypeError):
-            continue
+    for entry in load_jsonl(history):
         if str(entry.get("session", "")) == session_id and entry.get("file"):
             edited.append(str(entry["file"]))
 
@@ -8,6 +8,8 @@
 # 設計理由 (wiki/meta/mistakes.md「自編集ファイルの記憶過信」再発防止 (b) 改修):
 # - 自分で Write/Edit したファイルを Read せず推測回答するパターンを機械検出するため
 # - jsonl は session_id + tool + file_path のみ記録 (低コスト)
+# - 読み手の照会用には _file_history.py (SQLite WAL・(session, file) ごとの最後の Edit/Read) に UPSERT。
+#   jsonl は互換エクスポートとして従来どおり追記する
 #
 # 旧 posttooluse-edit-history.sh (python3 を 6 回 spawn) を単一 python プロセスに置換。
 # JSONL 契約・挙動を完全維持。
@@ -15,18 +17,52 @@
 # 並行/読み手安全性 (Codex 3R P0 対応):
 # - append + rotate 全体を専用ロックファイル (history + ".lock") の flock(LOCK_EX) で排他。
 # - 読み手 (userpromptsubmit-edit-recheck-warn.py 等) は flock を取らないため、rotate は
-#   データファイル自身を truncate せず、tmp へ書いて os.replace で atomic に差し替える。
+#   データファイル自身を truncate せず、os.replace で丸ごと改名する。
 #   これにより読み手は常に「完全な旧ファイル」か「完全な新ファイル」のいずれかしか見ない。
 # - あらゆる例外・malformed 入力は握りつぶして exit 0 (fail-open・hook を絶対にブロックしない)。
+#
+# rotate (hot path でデータファイルを読まない):
+# - 現行ファイルの行数は lock ファイル本体に数字で持つ (flock 下で pread/pwrite)
+# - SEGMENT_LINES 行に達したら 現行 → <name>.1.jsonl へ os.replace (前の .1 は丸ごと捨てる)
+# - よって直近 SEGMENT_LINES〜2×SEGMENT_LINES 行が .1 + 現行 に残る。読み手は両方を読む
+# - lock ファイルが空/壊れている (旧版からの移行直後等) ときだけ1回数え直す
 
+import os
 import sys
 
+SEGMENT_LINES = 1000
+
+
+def segment_path(history_file):
+    """edit-history.jsonl → edit-history.1.jsonl"""
+    base, ext = history_file.rsplit(".", 1)
+    return "%s.1.%s" % (base, ext)
+
+
+def read_counter(lock_fd):
+    try:
+        return int(os.pread(lock_fd, 32, 0).decode("ascii").strip())
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def write_counter(lock_fd, count):
+    data = b"%d\n" % count
+    os.pwrite(lock_fd, data, 0)
+    os.ftruncate(lock_fd, len(data))
+
+
+def count_lines(path):
+    try:
+        with open(path, "rb") as f:
+            return sum(1 for _ in f)
+    except FileNotFoundError:
+        return 0
+
 
 def main():
-    import json
-    import os
     import fcntl
-    import tempfile
+    import json
     from datetime import datetime
 
     raw = sys.stdin.read()
@@ -71,42 +107,41 @@ def main():
         json.dumps(file_path),
     )
 
+    # 照会用ストア。失敗しても jsonl 側は書く
+    try:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import _file_history
+
+        db = _file_history.connect()
+        try:
+            _file_history.record(db, session_id, tool, file_path, ts)
+        finally:
+            db.close()
+    except Exception:
+        pass
+
     # 専用ロックファイルで append + rotate 全体を排他 (データファイル自身はロックしない)
     lock_fd = os.open(lock_file, os.O_CREAT | os.O_RDWR, 0o644)
     try:
         fcntl.flock(lock_fd, fcntl.LOCK_EX)
 
+        count = read_counter(lock_fd)
+        if count is None:
+            count = count_lines(history_file)
+
+        # rotate: 現行が満杯なら丸ごと .1 へ改名 (atomic・データは読まない)
+        if count >= SEGMENT_LINES:
+            try:
+                os.replace(history_file, segment_path(history_file))
+            except FileNotFoundError:
+                pass
+            count = 0
+
         # append: ロック下で open→write→flush→close
         with open(history_file, "a") as f:
             f.write(line)
             f.flush()
-
-        # rotate: 1000 行超なら直近 1000 行を atomic 差し替え (truncate せず os.replace)
-        try:
-            with open(history_file, "r") as f:
-                lines = f.readlines()
-        except FileNotFoundError:
-            lines = []
-        if len(lines) > 1000:
-            keep = lines[-1000:]
-            tmp = tempfile.NamedTemporaryFile(mode="w", dir=state_dir, delete=False)
-            tmp_path = tmp.name
-            try:
-                tmp.writelines(keep)
-                tmp.flush()
-                os.fsync(tmp.fileno())
-                tmp.close()
-                os.replace(tmp_path, history_file)  # atomic (同一 FS)
-            except Exception:
-                # rotate 失敗時は tmp を掃除 (append は既に永続済みなので欠落しない)
-                try:
-                    tmp.close()
-                except Exception:
-                    pass
-                try:
-                    os.unlink(tmp_path)
-                except Exception:
-                    pass
+        write_counter(lock_fd, count + 1)
     finally:
         try:
             fcntl.flock(lock_fd, fcntl.LOCK_UN)
@@ -27,10 +27,12 @@ except: print('')" 2>/dev/null)
 
 # edit-history.jsonl から同 session の rules/42 対象を抽出
 # (stop-vault-summary-suggest.sh と同一 PAT・drift 防止)
-CANDIDATES=$(python3 - "$SESSION" <<'PY'
-import json, sys, re
+CANDIDATES=$(python3 - "$SESSION" "$(cd "$(dirname "$0")" && pwd)" <<'PY'
+import sys, re
 from pathlib import Path
 session = sys.argv[1]
+sys.path.insert(0, sys.argv[2])
+from _history_jsonl import load_jsonl  # .1 → 現行 (rotate 直後も前半を落とさない)
 log = Path.home() / ".claude/state/edit-history.jsonl"
 PAT = re.compile(
     r"/(plan|measures-detail|measure-impact-table|spec|analysis|"
@@ -39,17 +41,12 @@ PAT = re.compile(
     r"|/tasks/phase-tracker\.md$"
 )
 seen = {}
-if log.exists():
-    for line in log.read_text().splitlines():
-        try:
-            d = json.loads(line)
-        except Exception:
-            continue
-        if d.get("session") != session:
-            continue
-        f = d.get("file", "")
-        if PAT.search(f):
-            seen[f] = d.get("ts", "")
+for d in load_jsonl(log):
+    if d.get("session") != session:
+        continue
+    f = d.get("file", "")
+    if PAT.search(f):
+        seen[f] = d.get("ts", "")
 for f, ts in sorted(seen.items(), key=lambda x: x[1])[-10:]:
     print(f)
 PY
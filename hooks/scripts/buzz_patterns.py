@@ -80,13 +80,95 @@ PATTERNS = {
     },
 }
 
-# Build a compiled regex that ORs all keywords from all patterns
-# Used for fast pre-filtering of raw text lines before JSON parsing
 _all_keywords = []
 for _pattern in PATTERNS.values():
     _all_keywords.extend(_pattern["keywords"])
 _unique_keywords = list(dict.fromkeys(_all_keywords))  # deduplicate preserving order
-PREFILTER_REGEX = re.compile("|".join(re.escape(kw) for kw in _unique_keywords))
+_PATTERN_KEYWORDS = {name: list(dict.fromkeys(p["keywords"])) for name, p in PATTERNS.items()}
+_KEYWORD_PATTERNS = {kw: [name for name, kws in _PATTERN_KEYWORDS.items() if kw in kws]
+                     for kw in _unique_keywords}
+
+
+def _trie_regex(words):
+    """
+    Alternation of words factored by common prefix ("自動(?:化|実行|集計)?").
+    At each position the longest word starting there wins (children are tried
+    before the shorter word ends), and the leading character set lets the
+    regex engine skip positions where no keyword can start.
+    """
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if "" in node:
+            body = (body if len(alts) == 1 and len(alts[0]) == 1 else "(?:" + body + ")") + "?"
+        return body
+
+    return build(trie)
+
+
+# All keywords in one precompiled automaton, built once at import.
+# Used for fast pre-filtering of raw text lines before JSON parsing.
+PREFILTER_REGEX = re.compile(_trie_regex(_unique_keywords))
+
+# keyword_hits() scans with one automaton per leading-character script.
+# The engine tries a branch's alternatives one by one, so in English/code text
+# every "e", "s", "t"... would otherwise walk past the ~70 Japanese branches;
+# split, each scan skips the other script's characters via its leading charset.
+_KEYWORD_REGEXES = tuple(
+    re.compile(_trie_regex(group))
+    for group in ([kw for kw in _unique_keywords if kw[0].isascii()],
+                  [kw for kw in _unique_keywords if not kw[0].isascii()])
+    if group
+)
+
+# findall() reports one (longest) keyword per start position and does not
+# revisit positions inside a match. Two tables recover exactly the set that
+# `kw in text` would give for every keyword:
+#   _IMPLIED[kw]   keywords that are substrings of kw (present whenever kw is)
+#   _STRADDLE[kw]  keywords that can start inside kw and run past its end
+#                  ("LOC" / "CVR"); only these need a direct `in` check
+_IMPLIED = {kw: frozenset(k for k in _unique_keywords if k in kw) for kw in _unique_keywords}
+_PREFIXES = {}  # proper prefix -> keywords starting with it
+for _b in _unique_keywords:
+    for _i in range(1, len(_b)):
+        _PREFIXES.setdefault(_b[:_i], []).append(_b)
+_STRADDLE = {}
+for _a in _unique_keywords:
+    for _j in range(len(_a)):
+        for _b in _PREFIXES.get(_a[_j:], ()):
+            if _b not in _a and _b not in _STRADDLE.get(_a, ()):
+                _STRADDLE.setdefault(_a, []).append(_b)
+
+
+def keyword_hits(text: str) -> set:
+    """
+    Every keyword (across all patterns) that occurs in text, independent of the
+    number of keywords: one findall per script automaton plus a few `in` checks
+    for straddling pairs. Equivalent to {kw for kw in all keywords if kw in text}.
+    """
+    found = set()
+    for rx in _KEYWORD_REGEXES:
+        found.update(rx.findall(text))
+    hits = set()
+    for kw in found:
+        hits |= _IMPLIED[kw]
+    todo = [kw for kw in hits if kw in _STRADDLE]
+    while todo:
+        for kw in _STRADDLE[todo.pop()]:
+            if kw not in hits and kw in text:
+                new = _IMPLIED[kw] - hits
+                hits |= new
+                todo.extend(k for k in new if k in _STRADDLE)
+    return hits
 
 
 @dataclass
@@ -97,34 +179,33 @@ class PatternMatch:
     text_excerpt: str  # max 2000 chars
 
 
+def _pattern_score(pattern_def: dict, count: int):
+    """Unrounded score for count distinct keywords, or None below min_keywords."""
+    if count < pattern_def["min_keywords"]:
+        return None
+    base_score = pattern_def["base_score"]
+    raw_score = base_score + 0.1 * (count - pattern_def["min_keywords"])
+    return min(raw_score, base_score + 1.0)
+
+
 def match_patterns(text: str) -> list:
     """
     For each pattern, count how many distinct keywords appear in text.
     If count >= min_keywords, create a PatternMatch.
     Score = base_score + 0.1 * (count - min_keywords), capped at base_score + 1.0.
     text_excerpt = first 2000 chars of text.
+    The keyword scan is shared by all patterns (keyword_hits).
     """
     results = []
     excerpt = text[:2000]
+    hits = keyword_hits(text)
 
     for pattern_name, pattern_def in PATTERNS.items():
-        keywords = pattern_def["keywords"]
-        min_keywords = pattern_def["min_keywords"]
-        base_score = pattern_def["base_score"]
-
-        matched = [kw for kw in keywords if kw in text]
-        # Deduplicate while preserving order
-        seen = set()
-        distinct_matched = []
-        for kw in matched:
-            if kw not in seen:
-                seen.add(kw)
-                distinct_matched.append(kw)
-
-        count = len(distinct_matched)
-        if count >= min_keywords:
-            raw_score = base_score + 0.1 * (count - min_keywords)
-            score = min(raw_score, base_score + 1.0)
+        # Distinct, in keyword-list order
+        distinct_matched = [kw for kw in _PATTERN_KEYWORDS[pattern_name] if kw in hits]
+
+        score = _pattern_score(pattern_def, len(distinct_matched))
+        if score is not None:
             results.append(PatternMatch(
                 pattern_name=pattern_name,
                 matched_keywords=distinct_matched,
@@ -135,6 +216,51 @@ def match_patterns(text: str) -> list:
     return results
 
 
+class KeywordWindow:
+    """
+    Keyword counts over a sliding window of messages, kept incrementally:
+    add() / remove() take one message's keyword_hits() as it enters / leaves.
+    scores() and keywords() then give what match_patterns() would report for
+    the window's messages joined with "\n" -- no keyword contains a newline,
+    so no hit can span two messages and the window's hits are the union.
+    """
+
+    def __init__(self):
+        self._counts = {}  # keyword -> number of messages in the window containing it
+        self._distinct = dict.fromkeys(PATTERNS, 0)  # pattern -> distinct keywords present
+
+    def add(self, hits: set):
+        for kw in hits:
+            n = self._counts.get(kw, 0)
+            self._counts[kw] = n + 1
+            if n == 0:
+                for pattern_name in _KEYWORD_PATTERNS[kw]:
+                    self._distinct[pattern_name] += 1
+
+    def remove(self, hits: set):
+        for kw in hits:
+            n = self._counts[kw] - 1
+            if n:
+                self._counts[kw] = n
+                continue
+            del self._counts[kw]
+            for pattern_name in _KEYWORD_PATTERNS[kw]:
+                self._distinct[pattern_name] -= 1
+
+    def scores(self) -> list:
+        """[(pattern_name, score)] in PATTERNS order, as match_patterns() would score them."""
+        results = []
+        for pattern_name, count in self._distinct.items():
+            score = _pattern_score(PATTERNS[pattern_name], count)
+            if score is not None:
+                results.append((pattern_name, round(score, 2)))
+        return results
+
+    def keywords(self, pattern_name: str) -> list:
+        """Distinct keywords of pattern_name present in the window, in keyword-list order."""
+        return [kw for kw in _PATTERN_KEYWORDS[pattern_name] if kw in self._counts]
+
+
 def extract_numbers(text: str) -> list:
     """
     Find numeric patterns like "5000→3000", "30%削減", "10秒→2秒", etc.
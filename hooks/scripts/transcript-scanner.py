@@ -14,13 +14,15 @@ import re
 import os
 import hashlib
 import fcntl
+import sqlite3
+import time
 from datetime import date
 from pathlib import Path
 
 # Ensure the sibling buzz_patterns module is importable
 sys.path.insert(0, str(Path(__file__).parent))
 
-from buzz_patterns import PATTERNS, PREFILTER_REGEX, match_patterns, extract_numbers, generate_title, PatternMatch, story_score, story_elements
+from buzz_patterns import PATTERNS, PREFILTER_REGEX, KeywordWindow, keyword_hits, extract_numbers, generate_title, story_score
 
 
 # ---------------------------------------------------------------------------
@@ -33,6 +35,7 @@ MIN_SCORE = 6.0
 MIN_TEXT_LEN = 100
 CJK_REGEX = re.compile(r"[\u3000-\u9fff\uf900-\ufaff]")
 CJK_MIN_RATIO = 0.20
+FINGERPRINT_RE = re.compile(r"[0-9a-f]{16}")
 TOP_K = 5
 
 # System content to strip from messages
@@ -47,8 +50,13 @@ NOISE_PREFIXES = (
 )
 
 STATE_DIR = Path.home() / ".claude" / "state"
-FINGERPRINT_FILE = STATE_DIR / "auto-capture-fingerprints.txt"
+FINGERPRINT_FILE = STATE_DIR / "auto-capture-fingerprints.txt"  # 旧形式 (QueueIndex 作成時に1回だけ取り込む)
 QUEUE_FILE = STATE_DIR / "improvement-queue.jsonl"
+INDEX_DB = STATE_DIR / "auto-capture-index.db"  # queue の次 ID + fingerprint (QueueIndex)
+# transcript ごとの続き位置 (前回どこまで読んだか + 窓を跨ぐための直前 WINDOW_SIZE-1 件)
+CURSOR_DIR = STATE_DIR / "transcript-scanner-cursors"
+CURSOR_MAX_AGE = 30 * 86400  # これより古い cursor (終わったセッション) は保存時に掃除
+TAIL_BYTES = 32  # cursor 直前の bytes を控え、transcript の書換え・差し替えを検知する
 
 
 # ---------------------------------------------------------------------------
@@ -59,20 +67,119 @@ def get_fingerprint(pattern_name: str, text: str) -> str:
     return hashlib.sha256(f"{pattern_name}:{text[:100]}".encode()).hexdigest()[:16]
 
 
-def get_next_id() -> int:
-    """Read last entry in queue to determine next mat_XXX id."""
-    max_id = 0
-    if QUEUE_FILE.exists():
-        for line in QUEUE_FILE.read_text(encoding="utf-8", errors="replace").strip().splitlines():
+def queue_id_number(entry: dict) -> int:
+    """mat_NNN → NNN (読めない ID は 0)。"""
+    try:
+        return int(entry.get("id", "mat_000").split("_")[1])
+    except (AttributeError, ValueError, IndexError):
+        return 0
+
+
+class QueueIndex:
+    """improvement-queue.jsonl の sidecar 索引 (SQLite)。queue を毎回全部読まずに済ませる。
+
+    meta:
+      next_id       次に振る mat_NNN の番号 (= queue 内の最大 ID + 1)
+      queue_offset  索引が取り込み済みの queue の byte 位置
+      queue_tail    その直前 TAIL_BYTES の hex (queue の書換え・差し替え検知)
+    fingerprints: 8 byte の fingerprint を主キーに、seq = 最後に登録/照合した順番。
+    FP_CAPACITY 件を超えたら seq の古い順に捨てる (LRU)。
+
+    queue には capture-improvement スキル等の別の書き手も追記するので、sync() で
+    queue_offset 以降だけを読んで next_id と auto-capture 由来の fingerprint を追いつかせる。
+    queue が縮んだ・書き換わったときは next_id を全量から数え直す (fingerprint は残す)。
+    旧 auto-capture-fingerprints.txt は DB 作成時に1回だけ取り込む (原本は触らない)。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS fingerprints (fp BLOB PRIMARY KEY, seq INTEGER NOT NULL) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS fingerprints_seq ON fingerprints (seq);
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+    """
+    FP_CAPACITY = 1000
+
+    def __init__(self, path=INDEX_DB, legacy=FINGERPRINT_FILE):
+        self.db = sqlite3.connect(str(path), timeout=10, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(self.SCHEMA)
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            if self._meta("next_id") is None:
+                self._set_meta("next_id", 1)
+                if legacy.exists():
+                    for fp in legacy.read_text(encoding="utf-8", errors="replace").split():
+                        if FINGERPRINT_RE.fullmatch(fp):
+                            self.add(fp)
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.next_id = int(self._meta("next_id"))
+
+    def _meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, str(value)))
+
+    def begin(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        self.next_id = int(self._meta("next_id"))
+
+    def sync(self, f) -> bool:
+        """queue_offset 以降 (他の書き手の追記) を取り込む。書きかけ行が残れば False。"""
+        fd = f.fileno()
+        size = os.fstat(fd).st_size
+        offset = int(self._meta("queue_offset") or 0)
+        tail = bytes.fromhex(self._meta("queue_tail") or "")
+        if not (len(tail) <= offset <= size and os.pread(fd, len(tail), offset - len(tail)) == tail):
+            offset, self.next_id = 0, 1
+        data = os.pread(fd, size - offset, offset)
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
             try:
                 entry = json.loads(line)
-                id_str = entry.get("id", "mat_000")
-                num = int(id_str.split("_")[1])
-                if num > max_id:
-                    max_id = num
-            except (json.JSONDecodeError, ValueError, IndexError):
+            except ValueError:
+                continue
+            if not isinstance(entry, dict):
                 continue
-    return max_id + 1
+            self.next_id = max(self.next_id, queue_id_number(entry) + 1)
+            if entry.get("source") == "session_auto_capture" and entry.get("buzz_pattern"):
+                self.add(get_fingerprint(entry["buzz_pattern"], entry.get("content", "")))
+        self.commit_offset(f, offset + end)
+        return end == len(data)
+
+    def seen(self, fp: str) -> bool:
+        """登録済みなら LRU 順を更新して True。"""
+        seq = self._next_seq()
+        cur = self.db.execute("UPDATE fingerprints SET seq = ? WHERE fp = ?", (seq, bytes.fromhex(fp)))
+        return cur.rowcount > 0
+
+    def add(self, fp: str):
+        self.db.execute("INSERT OR REPLACE INTO fingerprints VALUES (?, ?)", (bytes.fromhex(fp), self._next_seq()))
+        # 新しい順に FP_CAPACITY 件を残す (超えていなければ副問い合わせが NULL で何も消えない)
+        self.db.execute("DELETE FROM fingerprints WHERE seq <= "
+                        "(SELECT seq FROM fingerprints ORDER BY seq DESC LIMIT 1 OFFSET ?)", (self.FP_CAPACITY,))
+
+    def _next_seq(self) -> int:
+        row = self.db.execute("SELECT MAX(seq) FROM fingerprints").fetchone()
+        return (row[0] or 0) + 1
+
+    def commit_offset(self, f, offset: int):
+        n = min(TAIL_BYTES, offset)
+        self._set_meta("queue_offset", offset)
+        self._set_meta("queue_tail", os.pread(f.fileno(), n, offset - n).hex())
+
+    def commit(self):
+        self._set_meta("next_id", self.next_id)
+        self.db.execute("COMMIT")
+
+    def rollback(self):
+        self.db.execute("ROLLBACK")
+
+    def close(self):
+        self.db.close()
 
 
 def extract_project_name(cwd_path: str) -> str:
@@ -86,6 +193,45 @@ def cjk_ratio(text: str) -> float:
     return cjk_chars / len(text)
 
 
+def cursor_file(transcript_path: str) -> Path:
+    key = hashlib.sha256(os.path.abspath(transcript_path).encode()).hexdigest()[:16]
+    return CURSOR_DIR / f"{key}.json"
+
+
+def load_cursor(transcript_path: str, f) -> dict:
+    """
+    前回の続き位置 {"path", "offset", "tail", "line", "context"}。
+    offset がファイル内に収まり直前 bytes が tail と一致するときだけ有効 (それ以外は None = 読み直し)。
+    """
+    try:
+        cursor = json.loads(cursor_file(transcript_path).read_text(encoding="utf-8"))
+        tail = bytes.fromhex(cursor["tail"])
+        offset = cursor["offset"]
+        if (cursor["path"] == os.path.abspath(transcript_path)
+                and len(tail) <= offset <= os.fstat(f.fileno()).st_size
+                and os.pread(f.fileno(), len(tail), offset - len(tail)) == tail):
+            return cursor
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def save_cursor(transcript_path: str, cursor: dict):
+    CURSOR_DIR.mkdir(parents=True, exist_ok=True)
+    path = cursor_file(transcript_path)
+    tmp = path.with_suffix(f".tmp.{os.getpid()}")
+    tmp.write_text(json.dumps(cursor, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+    cutoff = time.time() - CURSOR_MAX_AGE
+    for entry in os.scandir(CURSOR_DIR):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+        except OSError:
+            pass
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
@@ -95,89 +241,133 @@ def main():
     cwd = sys.argv[2]
 
     # ------------------------------------------------------------------
-    # Phase 1: Stream parse with tail-seek
+    # Phase 1: Stream parse from the resume cursor (or tail-seek)
     # ------------------------------------------------------------------
-    file_size = os.path.getsize(transcript_path)
+    # 前回の cursor 以降に追記された行だけを読む。直前の WINDOW_SIZE-1 件 (context) を
+    # 先頭に戻すので、前回の末尾を跨ぐ窓も Phase 2 で評価される。
     messages = []  # list of {"role": str, "text": str, "line_idx": int}
 
-    with open(transcript_path, "r", encoding="utf-8", errors="replace") as f:
-        if file_size > 5 * 1024 * 1024:
-            f.seek(max(0, file_size - MAX_READ))
+    with open(transcript_path, "rb") as f:
+        file_size = os.fstat(f.fileno()).st_size
+        cursor = load_cursor(transcript_path, f)
+        if cursor:
+            start, line_base, context = cursor["offset"], cursor["line"], cursor["context"]
+        else:
+            start, line_base, context = 0, 0, []
+        if file_size > 5 * 1024 * 1024 and file_size - start > MAX_READ:
+            f.seek(file_size - MAX_READ)
             f.readline()  # skip partial first line
+            start, line_base, context = f.tell(), 0, []
+        f.seek(start)
+        data = f.read()
+        end = data.rfind(b"\n") + 1  # 書きかけの最終行は次回へ
+        offset = start + end
+        tail = os.pread(f.fileno(), min(TAIL_BYTES, offset), offset - min(TAIL_BYTES, offset))
+
+    lines = data[:end].split(b"\n")[:-1]
+
+    for line_idx, raw in enumerate(lines, line_base):
+        line = raw.decode("utf-8", errors="replace")
+        # Pre-filter: skip lines without any buzz keywords
+        if not PREFILTER_REGEX.search(line):
+            continue
 
-        for line_idx, line in enumerate(f):
-            # Pre-filter: skip lines without any buzz keywords
-            if not PREFILTER_REGEX.search(line):
-                continue
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
 
-            try:
-                entry = json.loads(line)
-            except json.JSONDecodeError:
-                continue
+        entry_type = entry.get("type", "")
+        if entry_type not in ("user", "assistant"):
+            continue
 
-            entry_type = entry.get("type", "")
-            if entry_type not in ("user", "assistant"):
+        content = entry.get("message", {}).get("content", "")
+        raw_texts = []
+        if isinstance(content, str):
+            raw_texts = [content]
+        elif isinstance(content, list):
+            raw_texts = [
+                block.get("text", "")
+                for block in content
+                if isinstance(block, dict) and block.get("type") == "text"
+            ]
+
+        # Filter out system content / noise
+        clean_texts = []
+        for t in raw_texts:
+            if any(t.lstrip().startswith(p) for p in NOISE_PREFIXES):
                 continue
+            # Strip inline system-reminder tags
+            t = SYSTEM_TAG_RE.sub("", t).strip()
+            if t:
+                clean_texts.append(t)
 
-            content = entry.get("message", {}).get("content", "")
-            raw_texts = []
-            if isinstance(content, str):
-                raw_texts = [content]
-            elif isinstance(content, list):
-                raw_texts = [
-                    block.get("text", "")
-                    for block in content
-                    if isinstance(block, dict) and block.get("type") == "text"
-                ]
-
-            # Filter out system content / noise
-            clean_texts = []
-            for t in raw_texts:
-                if any(t.lstrip().startswith(p) for p in NOISE_PREFIXES):
-                    continue
-                # Strip inline system-reminder tags
-                t = SYSTEM_TAG_RE.sub("", t).strip()
-                if t:
-                    clean_texts.append(t)
-
-            text = " ".join(clean_texts)
-
-            if not text or len(text) < 50:
-                continue
+        text = " ".join(clean_texts)
 
-            messages.append({"role": entry_type, "text": text, "line_idx": line_idx})
+        if not text or len(text) < 50:
+            continue
 
-    print(f"[transcript-scanner] Parsed {len(messages)} qualifying messages")
+        messages.append({"role": entry_type, "text": text, "line_idx": line_idx})
+
+    new_cursor = {
+        "path": os.path.abspath(transcript_path),
+        "offset": offset,
+        "tail": tail.hex(),
+        "line": line_base + len(lines),
+        "context": (context + messages)[-(WINDOW_SIZE - 1):],
+    }
+    # 新着なし → 前回までの窓は評価済みなので何もしない。新着あり → context を先頭に足して窓を組む
+    new_count = len(messages)
+    messages = context + messages if messages else []
+
+    print(f"[transcript-scanner] Parsed {new_count} qualifying messages "
+          f"(+{len(context)} carried over, bytes {start}-{offset})")
 
     # ------------------------------------------------------------------
     # Phase 2: Sliding window pattern matching
     # ------------------------------------------------------------------
+    # Keywords are matched once per message; the window keeps per-keyword
+    # counts (entering message added, leaving message removed), so a window
+    # costs O(changed hits) instead of re-joining and re-scanning 5 messages.
+    # Every message is >= 50 chars (Phase 1), so a window is simply
+    # messages[i:i + WINDOW_SIZE].
     raw_candidates = []  # {"pattern_name", "matched_text", "keyword_hits", "score", "type", "start_idx"}
+    message_hits = [keyword_hits(m["text"]) for m in messages]
+    window = KeywordWindow()
+    for hits in message_hits[:WINDOW_SIZE]:
+        window.add(hits)
 
     for i in range(len(messages)):
+        if i:
+            window.remove(message_hits[i - 1])
+            if i + WINDOW_SIZE - 1 < len(messages):
+                window.add(message_hits[i + WINDOW_SIZE - 1])
+
         # Skip windows starting with short messages (acknowledgments/confirmations)
         if len(messages[i]["text"]) < 80:
             continue
 
-        window_end = min(i + WINDOW_SIZE, len(messages))
-        window_msgs = [m for m in messages[i:window_end] if len(m["text"]) >= 50]
-        if not window_msgs:
-            continue
-        window_text = "\n".join(m["text"] for m in window_msgs)
-        # ユーザー発言のみを分離（結果・価値の判定用）
-        user_text = "\n".join(m["text"] for m in window_msgs if m["role"] == "user")
-
-        matches = match_patterns(window_text)
-        for m in matches:
-            raw_candidates.append({
-                "pattern_name": m.pattern_name,
-                "matched_text": m.text_excerpt,
-                "keyword_hits": m.matched_keywords,
-                "score": m.score,
-                "type": PATTERNS[m.pattern_name]["type"],
+        window_text = user_text = None
+        for pattern_name, score in window.scores():
+            candidate = {
+                "pattern_name": pattern_name,
+                "score": score,
+                "type": PATTERNS[pattern_name]["type"],
                 "start_idx": messages[i]["line_idx"],
-                "user_text": user_text,
-            })
+            }
+            # 本文は Phase 3 に進める窓だけ組み立てる (MIN_SCORE 未満は dedup の比較にだけ使う)
+            if score >= MIN_SCORE:
+                if window_text is None:
+                    window_msgs = messages[i:i + WINDOW_SIZE]
+                    window_text = "\n".join(m["text"] for m in window_msgs)
+                    # ユーザー発言のみを分離（結果・価値の判定用）
+                    user_text = "\n".join(m["text"] for m in window_msgs if m["role"] == "user")
+                candidate.update(
+                    matched_text=window_text[:2000],
+                    keyword_hits=window.keywords(pattern_name),
+                    user_text=user_text,
+                )
+            raw_candidates.append(candidate)
 
     # Deduplicate overlapping candidates: same pattern_name + start_idx within WINDOW_SIZE
     # Keep the higher-score entry.
@@ -221,74 +411,65 @@ def main():
     print(f"[transcript-scanner] {len(raw_candidates)} raw candidates → {len(filtered)} after quality gate (story_scores: {[c['story_score'] for c in filtered]})")
 
     # ------------------------------------------------------------------
-    # Phase 4: Fingerprint dedup
+    # Phase 4-5: Fingerprint dedup + append to queue
     # ------------------------------------------------------------------
-    existing_fps: set = set()
-    if FINGERPRINT_FILE.exists():
-        existing_fps = set(FINGERPRINT_FILE.read_text(encoding="utf-8", errors="replace").strip().splitlines())
-
-    new_candidates = []
-    new_fps = []
-    for c in filtered:
-        fp = get_fingerprint(c["pattern_name"], c["matched_text"])
-        if fp not in existing_fps:
-            new_candidates.append(c)
-            new_fps.append(fp)
-            existing_fps.add(fp)
-
-    # ------------------------------------------------------------------
-    # Phase 5: Append to queue
-    # ------------------------------------------------------------------
-    STATE_DIR.mkdir(parents=True, exist_ok=True)
-
-    next_id = get_next_id()
+    # 次 ID と fingerprint は QueueIndex から引く (queue 全体は読まない)。queue の flock と
+    # 索引の書込みトランザクションを最後まで持ち、採番 → 追記 → 索引更新を1単位にする。
+    # 追記後・commit 前に落ちても、次回 sync() が追記ぶんから ID と fingerprint を取り戻す。
     entries_written = 0
-
-    for c in new_candidates:
-        entry = {
-            "id": f"mat_{next_id:03d}",
-            "category": PATTERNS[c["pattern_name"]].get("x_category", "tech_tips"),
-            "type": c["type"],
-            "title": generate_title(c["matched_text"], c["pattern_name"]),
-            "content": c["matched_text"][:2000],
-            "key_numbers": extract_numbers(c["matched_text"]),
-            "quality_score": {
-                "metric_significance": round(c["score"], 1),
-                "composite": round(c["score"] * 0.7, 1),
-            },
-            "tags": c["keyword_hits"][:5],
-            "collected_at": date.today().isoformat(),
-            "source": "session_auto_capture",
-            "source_project": extract_project_name(cwd),
-            "buzz_pattern": c["pattern_name"],
-            "story_score": c.get("story_score", 0),
-            "status": c.get("auto_status", "pending_review"),
-        }
-
-        with open(QUEUE_FILE, "a", encoding="utf-8") as qf:
+    if filtered:
+        STATE_DIR.mkdir(parents=True, exist_ok=True)
+        index = QueueIndex()
+        with open(QUEUE_FILE, "a+b") as qf:
             fcntl.flock(qf, fcntl.LOCK_EX)
             try:
-                qf.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                index.begin()
+                try:
+                    synced = index.sync(qf)
+                    queued = []
+                    for c in filtered:
+                        fp = get_fingerprint(c["pattern_name"], c["matched_text"])
+                        if index.seen(fp):
+                            continue
+                        index.add(fp)
+                        entry = {
+                            "id": f"mat_{index.next_id:03d}",
+                            "category": PATTERNS[c["pattern_name"]].get("x_category", "tech_tips"),
+                            "type": c["type"],
+                            "title": generate_title(c["matched_text"], c["pattern_name"]),
+                            "content": c["matched_text"][:2000],
+                            "key_numbers": extract_numbers(c["matched_text"]),
+                            "quality_score": {
+                                "metric_significance": round(c["score"], 1),
+                                "composite": round(c["score"] * 0.7, 1),
+                            },
+                            "tags": c["keyword_hits"][:5],
+                            "collected_at": date.today().isoformat(),
+                            "source": "session_auto_capture",
+                            "source_project": extract_project_name(cwd),
+                            "buzz_pattern": c["pattern_name"],
+                            "story_score": c.get("story_score", 0),
+                            "status": c.get("auto_status", "pending_review"),
+                        }
+                        queued.append(json.dumps(entry, ensure_ascii=False) + "\n")
+                        index.next_id += 1
+                    if queued:
+                        qf.write("".join(queued).encode("utf-8"))
+                        qf.flush()
+                        # 他者の書きかけ行が残っているときは offset を据え置き (次回その行から読み直す)
+                        if synced:
+                            index.commit_offset(qf, os.fstat(qf.fileno()).st_size)
+                    index.commit()
+                except BaseException:
+                    index.rollback()
+                    raise
             finally:
                 fcntl.flock(qf, fcntl.LOCK_UN)
+                index.close()
+        entries_written = len(queued)
 
-        next_id += 1
-        entries_written += 1
-
-    # Write new fingerprints
-    if new_fps:
-        with open(FINGERPRINT_FILE, "a", encoding="utf-8") as ff:
-            fcntl.flock(ff, fcntl.LOCK_EX)
-            try:
-                ff.write("\n".join(new_fps) + "\n")
-            finally:
-                fcntl.flock(ff, fcntl.LOCK_UN)
-
-        # Trim fingerprint file if > 1000 entries
-        if FINGERPRINT_FILE.exists():
-            all_fps = FINGERPRINT_FILE.read_text(encoding="utf-8", errors="replace").strip().splitlines()
-            if len(all_fps) > 1000:
-                FINGERPRINT_FILE.write_text("\n".join(all_fps[-500:]) + "\n", encoding="utf-8")
+    # queue / fingerprint を書き終えてから進める (途中で落ちたら次回同じ範囲を読み直す)
+    save_cursor(transcript_path, new_cursor)
 
     print(
         f"[transcript-scanner] Scanned {len(messages)} messages, "
@@ -12,6 +12,7 @@
 
 INPUT=$(cat)
 export HOOK_INPUT="$INPUT"
+export HOOKS_DIR="$(cd "$(dirname "$0")" && pwd)"
 
 python3 -I <<'PYEOF'
 import json, os, re, subprocess, sys
@@ -26,33 +27,28 @@ if str(data.get("stop_hook_active", False)).lower() == "true":
     sys.exit(0)
 
 session = str(data.get("session_id", ""))
+sys.path.insert(0, os.environ.get("HOOKS_DIR", ""))
+from _history_jsonl import exists, load_jsonl
+
 hist = os.path.expanduser("~/.claude/state/edit-history.jsonl")
-if not os.path.isfile(hist):
+if not exists(hist):
     sys.exit(0)
 
-# --- このセッションで Write/Edit した .md を収集 ---
+# --- このセッションで Write/Edit した .md を収集 (.1 → 現行: rotate 直後も前半を落とさない) ---
 md_files = []
 seen = set()
 try:
-    with open(hist, encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                o = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-            if session and o.get("session") != session:
-                continue
-            if o.get("tool") not in ("Write", "Edit", "MultiEdit"):
-                continue
-            fp = o.get("file", "")
-            if not fp.endswith(".md"):
-                continue
-            if fp not in seen:
-                seen.add(fp)
-                md_files.append(fp)
+    for o in load_jsonl(hist):
+        if session and o.get("session") != session:
+            continue
+        if o.get("tool") not in ("Write", "Edit", "MultiEdit"):
+            continue
+        fp = o.get("file", "")
+        if not fp.endswith(".md"):
+            continue
+        if fp not in seen:
+            seen.add(fp)
+            md_files.append(fp)
 except OSError:
     sys.exit(0)
 
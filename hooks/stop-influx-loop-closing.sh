@@ -24,7 +24,7 @@ esac
 # 注意: heredoc はスクリプト自体を python の stdin に流すため、hook 入力JSONは
 # bash 側で先に受けて argv で渡す（stdinから読むと空EOFになり全て fail-open する実測バグ）
 INPUT=$(cat)
-exec /usr/bin/env python3 -I - "$PWD" "$INPUT" <<'PY'
+exec /usr/bin/env python3 -I - "$PWD" "$INPUT" "$(cd "$(dirname "$0")" && pwd)" <<'PY'
 import glob
 import json
 import os
@@ -61,22 +61,21 @@ if os.path.exists(flag):
     sys.exit(0)  # 自己制限: セッション1回のみ（③）
 
 # このセッションの編集ファイル集合（Read は記録されるが編集ではないので除外）
+# .1 → 現行の順に読む（rotate 直後の現行は空に近い＝現行だけだと前半の編集を落とす）
+sys.path.insert(0, sys.argv[3] if len(sys.argv) > 3 else "")
+from _history_jsonl import load_jsonl
+
 hist = os.path.expanduser("~/.claude/state/edit-history.jsonl")
 edited = set()
 try:
-    with open(hist, encoding="utf-8", errors="replace") as fh:
-        for line in fh:
-            try:
-                r = json.loads(line)
-            except Exception:
-                continue
-            if r.get("session") != sid:
-                continue
-            if r.get("tool") not in ("Edit", "Write", "MultiEdit"):
-                continue
-            fp = r.get("file") or ""
-            if fp:
-                edited.add(fp)
+    for r in load_jsonl(hist):
+        if r.get("session") != sid:
+            continue
+        if r.get("tool") not in ("Edit", "Write", "MultiEdit"):
+            continue
+        fp = r.get("file") or ""
+        if fp:
+            edited.add(fp)
 except OSError:
     sys.exit(0)  # 履歴が読めない時は fail-open
 if not edited:
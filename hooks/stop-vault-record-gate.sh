@@ -39,27 +39,25 @@ fi
 
 # 実績ベース判定: repo 分析成果物への Write/Edit あり ∧ vault への Write/Edit ゼロ
 EDIT_LOG="${VAULT_RECORD_GATE_EDITLOG:-$STATE_DIR/edit-history.jsonl}"
-VERDICT=$(python3 - "$SESSION" "$EDIT_LOG" <<'PY'
-import json, sys, re
+VERDICT=$(python3 - "$SESSION" "$EDIT_LOG" "$(cd "$(dirname "$0")" && pwd)" <<'PY'
+import sys, re
 from pathlib import Path
 session, log = sys.argv[1], Path(sys.argv[2])
+sys.path.insert(0, sys.argv[3])
+from _history_jsonl import load_jsonl
 # repo 側の「分析成果物」: reports/ metrics/ tasks/findings/ 配下の md/csv
 REPO_PAT = re.compile(r"/(reports|metrics|tasks/findings)/[^ ]*\.(md|csv)$")
 VAULT_PAT = re.compile(r"/Obsidian Vault/")
 repo_hits, vault_hits = [], 0
-if log.exists():
-    for line in log.read_text().splitlines():
-        try:
-            d = json.loads(line)
-        except Exception:
-            continue
-        if d.get("session") != session:
-            continue
-        f = d.get("file", "")
-        if VAULT_PAT.search(f):
-            vault_hits += 1
-        elif REPO_PAT.search(f):
-            repo_hits.append(f)
+# 現行 + 1つ前の segment (edit-history.1.jsonl)。現行を先に読むので間で rotate されても取りこぼさない
+for d in load_jsonl(log):
+    if d.get("session") != session:
+        continue
+    f = d.get("file", "")
+    if VAULT_PAT.search(f):
+        vault_hits += 1
+    elif REPO_PAT.search(f):
+        repo_hits.append(f)
 if repo_hits and vault_hits == 0:
     print("FIRE\t" + str(len(repo_hits)) + "\t" + repo_hits[-1])
 else:
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""test_buzz_patterns.py — buzz_patterns.keyword_hits / match_patterns の一致テスト
+
+正本 = 旧実装の意味論 (カテゴリごとに `kw in text`・部分文字列・重なり可)。
+検証: ①入れ子 (自動 ⊂ 自動化) ②跨ぎ (LOC の途中から始まる CVR) ③正規表現メタ文字 (%・空白入り)
+④乱数生成テキスト (キーワード断片の連結) で集合が完全一致 ⑤match_patterns の順序・score
+⑥KeywordWindow (差分更新) が窓の連結テキストへの match_patterns と一致
+⑦score の丸め: _pattern_score は旧式そのまま (丸めない)・丸めは出口 (PatternMatch.score / scores()) で2桁
+
+実行: python3 ~/.claude/hooks/tests/test_buzz_patterns.py
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import buzz_patterns as bp  # noqa: E402
+
+KEYWORDS = list(dict.fromkeys(kw for p in bp.PATTERNS.values() for kw in p["keywords"]))
+PASS = 0
+FAIL = 0
+
+
+def check(name, cond, detail=""):
+    global PASS, FAIL
+    if cond:
+        PASS += 1
+        print("  PASS %s" % name)
+    else:
+        FAIL += 1
+        print("  FAIL %s  %s" % (name, detail))
+
+
+def reference_hits(text):
+    return {kw for kw in KEYWORDS if kw in text}
+
+
+def reference_matches(text):
+    out = []
+    for name, pdef in bp.PATTERNS.items():
+        distinct = list(dict.fromkeys(kw for kw in pdef["keywords"] if kw in text))
+        if len(distinct) >= pdef["min_keywords"]:
+            score = min(pdef["base_score"] + 0.1 * (len(distinct) - pdef["min_keywords"]),
+                        pdef["base_score"] + 1.0)
+            out.append((name, distinct, round(score, 2)))
+    return out
+
+
+def same(text):
+    got, want = bp.keyword_hits(text), reference_hits(text)
+    return got == want, "got-want=%s want-got=%s" % (sorted(got - want), sorted(want - got))
+
+
+def main():
+    print("[1] 境界ケース")
+    check("入れ子 自動/自動化/自動実行", *same("hook で自動化し、自動実行も入れた"))
+    check("跨ぎ LOC→CVR", *same("LOCVR"))
+    check("跨ぎ gitignore→env (連鎖)", *same("gitignorenv pass"))
+    check("メタ文字・空白入り", *same("30% 削減 / Claude Code と Claude  Code"))
+    check("ヒットなし", bp.keyword_hits("nothing to see here") == set())
+
+    print("[2] 乱数テキスト (キーワード断片の連結)")
+    rng = random.Random(20261017)
+    alpha = "".join(KEYWORDS) + "abc 。\n"
+    bad = []
+    for _ in range(20000):
+        t = "".join(rng.choice([rng.choice(KEYWORDS), rng.choice(alpha),
+                                rng.choice(KEYWORDS)[1:], rng.choice(KEYWORDS)[:-1]])
+                    for _ in range(rng.randint(1, 10)))
+        if bp.keyword_hits(t) != reference_hits(t):
+            bad.append(t)
+    check("keyword_hits == {kw | kw in text}", not bad, bad[:3])
+    check("PREFILTER_REGEX.search == any(kw in text)",
+          all(bool(bp.PREFILTER_REGEX.search(t)) == bool(reference_hits(t))
+              for t in ("API 連携", "x" * 50, "2時間で", "ほげ")))
+
+    print("[3] match_patterns")
+    text = ("売上が 30% 改善し、CVR と ROI も上がった。hook と cron で自動化した"
+            "パイプライン → 毎朝 Slack に通知。初心者でも 30分 で導入できた")
+    got = [(m.pattern_name, m.matched_keywords, m.score) for m in bp.match_patterns(text)]
+    check("カテゴリ・キーワード順・score が旧実装と一致", got == reference_matches(text), got)
+    check("text_excerpt は先頭 2000 字", all(m.text_excerpt == ("あ" * 3000 + text)[:2000]
+                                       for m in bp.match_patterns("あ" * 3000 + text)))
+
+    print("[4] KeywordWindow (出入りの差分だけで窓を採点)")
+    check("キーワードに改行なし (窓の hits = メッセージ hits の和集合の前提)",
+          not any("\n" in kw for kw in KEYWORDS))
+    msgs = ["".join(rng.choice(KEYWORDS + ["。設定を確認した", "ok "]) for _ in range(rng.randint(1, 8)))
+            for _ in range(300)]
+    hits = [bp.keyword_hits(m) for m in msgs]
+    window = bp.KeywordWindow()
+    for h in hits[:5]:
+        window.add(h)
+    bad = []
+    for i in range(len(msgs)):
+        if i:
+            window.remove(hits[i - 1])
+            if i + 4 < len(msgs):
+                window.add(hits[i + 4])
+        got = [(name, window.keywords(name), score) for name, score in window.scores()]
+        if got != reference_matches("\n".join(msgs[i:i + 5])):
+            bad.append(i)
+    check("全窓で連結テキストの match_patterns と一致", not bad, bad[:5])
+    window = bp.KeywordWindow()
+    window.add({"自動化", "自動", "hook"})
+    window.add({"自動"})
+    window.remove({"自動化", "自動", "hook"})
+    check("重複キーワードは最後の1件が出るまで残る", window.keywords("効率化") == ["自動"], window.keywords("効率化"))
+
+    print("[5] score の丸め")
+    bad = []
+    for name, pdef in bp.PATTERNS.items():
+        for count in range(pdef["min_keywords"], pdef["min_keywords"] + 15):
+            want = min(pdef["base_score"] + 0.1 * (count - pdef["min_keywords"]), pdef["base_score"] + 1.0)
+            if bp._pattern_score(pdef, count) != want:
+                bad.append((name, count, bp._pattern_score(pdef, count), want))
+    check("_pattern_score は旧式の値そのまま (丸めない)", not bad, bad[:3])
+    pdef = next(iter(bp.PATTERNS.values()))
+    check("min_keywords 未満は None", bp._pattern_score(pdef, pdef["min_keywords"] - 1) is None)
+    name = next(iter(bp.PATTERNS))
+    kws = list(dict.fromkeys(bp.PATTERNS[name]["keywords"]))[:pdef["min_keywords"] + 3]
+    window = bp.KeywordWindow()
+    window.add(set(kws))
+    score = dict(window.scores())[name]
+    unrounded = bp._pattern_score(pdef, len(kws))
+    check("出口の score は2桁に丸める (浮動小数の端数を出さない)",
+          score == round(unrounded, 2) and repr(score) == repr(round(pdef["base_score"] + 0.3, 2)),
+          (score, unrounded))
+
+    print("\n%d passed, %d failed" % (PASS, FAIL))
+    sys.exit(1 if FAIL else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""test_count_tool_uses.py — skills/env-factcheck/count_tool_uses.py (1パス走査 + 日次 rollup) テスト
+
+検証: ①rollup / --raw が「全行 json.loads して top-level の timestamp / sessionId で数え直した結果」と一致
+(tool_use input・toolUseResult・snapshot に同名キーが入れ子で入っている fixture で)
+②byte offset カーソル: 追記 (追記分だけ読む) / 書込み途中の末尾行 (数えない → 続きで1回) / 静止した
+改行なし最終行 / 縮んだ / 先頭の書換え / 再起動 (別プロセスの CLI で catch-up 0 件・--raw と同じ出力)
+各段で rollup が全行 json.loads の数え直しと一致すること。
+③読込失敗 (寄与を消した後の OSError) はそのファイル分を ROLLBACK: 寄与もカーソルも前のまま・次回で正しく追いつく
+④同時実行: 空の DB に CLI を並列に走らせても二重加算・UNIQUE 衝突なし (rollup = 数え直し)
+⑤json decode は tool_use / <command-name> の行と、top-level の sessionId / timestamp を生の行で確定できない行だけ
+
+HOME を一時ディレクトリに差し替えて import (本物の ~/.claude/projects と tool-usage.db を触らない)。
+実行: python3 ~/.claude/hooks/tests/test_count_tool_uses.py
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+SKILL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                         "skills", "env-factcheck")
+PASS = 0
+FAIL = 0
+
+
+def check(name, cond, detail=""):
+    global PASS, FAIL
+    if cond:
+        PASS += 1
+        print("  PASS %s" % name)
+    else:
+        FAIL += 1
+        print("  FAIL %s  %s" % (name, detail))
+
+
+def rec(kind, ts, sid, content, **extra):
+    d = {"parentUuid": None, "cwd": "/x", "sessionId": sid, "type": kind,
+         "message": {"role": kind, "content": content}, "uuid": "u"}
+    if ts:
+        d["timestamp"] = ts
+    d.update(extra)
+    return json.dumps(d, separators=(",", ":"))
+
+
+def tool_use(name, **inp):
+    return [{"type": "tool_use", "id": "t", "name": name, "input": inp}]
+
+
+# 入れ子の "timestamp" / "sessionId" が top-level より前 (message 内) にも後 (toolUseResult) にもある
+NESTED = [
+    rec("assistant", "2026-10-02T01:00:00Z", "s-real",
+        tool_use("mcp__sheets__append", rows=[{"timestamp": "2020-01-01T00:00:00Z", "sessionId": "s-nested"}])),
+    rec("assistant", "2026-10-02T02:00:00Z", "s-real",
+        tool_use("Write", file_path="/p/log.jsonl",
+                 content='{"timestamp": "2019-05-05T00:00:00Z", "sessionId": "s-in-string"}')),
+    rec("user", "2026-10-03T00:00:00Z", "s-real",
+        [{"type": "tool_result", "tool_use_id": "t", "content": "ok"}],
+        toolUseResult={"file": {"timestamp": "2018-01-01T00:00:00Z", "sessionId": "s-result"}}),
+    rec("user", "2026-10-03T01:00:00Z", "s-real", "<command-name>/env-factcheck</command-name>"),
+    rec("assistant", "2026-10-03T02:00:00Z", "s-real", [{"type": "text", "text": "plain"}]),
+    # top-level に timestamp が無く入れ子にだけある → ファイル mtime の日付
+    rec("assistant", None, "s-real", tool_use("Edit", file_path="/p/a.py", meta={"timestamp": "2017-01-01"})),
+    # top-level に sessionId が無く入れ子にだけある → session に数えない
+    json.dumps({"type": "file-history-snapshot", "snapshot": {"timestamp": "2026-10-04T00:00:00Z",
+                                                              "sessionId": "s-snapshot"}}),
+    rec("assistant", "2026-10-04T00:00:00Z", "s-other", tool_use("Bash", command="ls")),
+    "not json {\"sessionId\":\"s-broken\",\"timestamp\":\"2026-10-04",
+]
+
+
+def reference(paths, ctu):
+    """全行 json.loads・top-level だけで数え直す (count_tool_uses.py を使わない独立実装)。"""
+    out = Counter()
+    for path in paths:
+        fallback = datetime.fromtimestamp(os.stat(path).st_mtime, timezone.utc).date().isoformat()
+        with open(path, "rb") as f:
+            for raw in f:
+                try:
+                    d = json.loads(raw)
+                except ValueError:
+                    continue
+                ts = d.get("timestamp")
+                day = ts[:10] if isinstance(ts, str) and ts[:4].isdigit() else fallback
+                events = []
+                content = (d.get("message") or {}).get("content")
+                for item in content if isinstance(content, list) else []:
+                    if isinstance(item, dict) and item.get("type") == "tool_use":
+                        name = item.get("name") or ""
+                        if name.startswith("mcp__"):
+                            events.append(("mcp", name.split("__")[1]))
+                        elif name:
+                            events.append(("builtin", name))
+                        if name in ctu.EDIT_TOOLS:
+                            events.append(("file", (item.get("input") or {}).get("file_path")))
+                texts = [content] if isinstance(content, str) else [
+                    i.get("text") or "" for i in content or [] if isinstance(i, dict) and i.get("type") == "text"]
+                for t in texts:
+                    events += [("skill", s) for s in ctu.SKILL_PAT.findall(t)]
+                if isinstance(d.get("sessionId"), str):
+                    events.append(("session", d["sessionId"]))
+                for kind, name in events:
+                    out[(day, kind, name)] += 1
+    return out
+
+
+def rollup_table(db):
+    return Counter({(day, kind, name): n for day, kind, name, n in db.execute(
+        "SELECT day, kind, name, SUM(n) FROM rollup GROUP BY day, kind, name")})
+
+
+def write_lines(path, lines, mode="w"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, mode, encoding="utf-8") as f:
+        f.write("".join(l + "\n" for l in lines))
+
+
+def bump(path, seconds=1):
+    """書換えを mtime に確実に反映させる (同じ tick 内の書換えはカーソル側では見分けない)。"""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 10 ** 9))
+
+
+def age(path, seconds=3600):
+    t = time.time() - seconds
+    os.utime(path, (t, t))
+
+
+def tool_line(i, name="Bash", day="2026-10-05"):
+    return rec("assistant", "%sT00:00:%02dZ" % (day, i % 60), "s-cur", tool_use(name, command="c%d" % i))
+
+
+def cli(script, *args):
+    return subprocess.run([sys.executable, script, "--days", "30", "--type", "all", *args],
+                          capture_output=True, text=True, env=dict(os.environ))
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="test-count-tool-uses-")
+    os.environ["HOME"] = tmp
+    sys.path.insert(0, SKILL_DIR)
+    import count_tool_uses as ctu  # noqa: E402  (HOME 差し替え後に import)
+    try:
+        proj = os.path.join(tmp, ".claude", "projects", "proj")
+        nested = os.path.join(proj, "nested.jsonl")
+        write_lines(nested, NESTED)
+
+        print("[1] 入れ子の timestamp / sessionId")
+        want = reference([nested], ctu)
+        check("fixture が入れ子キーを含む (参照側で s-nested 等は出ない)",
+              not any(n.startswith(("s-nested", "s-in-string", "s-result", "s-snapshot", "s-broken"))
+                      for (_d, k, n) in want if k == "session") and want[("2026-10-02", "session", "s-real")] == 2,
+              want)
+        db = ctu.open_rollup(ctu.ROLLUP_DB)
+        ctu.refresh_rollup(db, 30)
+        got = rollup_table(db)
+        check("rollup = 全行 json.loads の数え直し", got == want, sorted(set(got.items()) ^ set(want.items())))
+        raw, _ = ctu.scan_raw(30, ctu.COUNTERS)
+        flat = Counter()
+        for (_day, kind, name), n in want.items():
+            flat[(kind, name)] += n
+        got_raw = Counter({(k, name): n for k, c in raw.items() for name, n in c.items()})
+        check("--raw も同じ", got_raw == flat, sorted(set(got_raw.items()) ^ set(flat.items())))
+        db.close()
+
+        print("[2] byte offset カーソル")
+        cur = os.path.join(proj, "cursor.jsonl")
+        paths = [nested, cur]
+        db = ctu.open_rollup(ctu.ROLLUP_DB)
+
+        def same(label):
+            got, want = rollup_table(db), reference(paths, ctu)
+            check(label, got == want, sorted(set(got.items()) ^ set(want.items())))
+
+        write_lines(cur, [tool_line(i) for i in range(5)])
+        ctu.refresh_rollup(db, 30)
+        same("初回")
+        size = os.path.getsize(cur)
+        write_lines(cur, [tool_line(i, "Read") for i in range(5, 8)], "a")
+        stats = ctu.refresh_rollup(db, 30)
+        check("追記: 追記分の byte だけ読む", stats.files == 1 and stats.bytes == os.path.getsize(cur) - size,
+              (stats.files, stats.bytes, os.path.getsize(cur) - size))
+        same("追記後")
+
+        with open(cur, "a", encoding="utf-8") as f:
+            f.write(tool_line(8, "Grep")[:30])
+        ctu.refresh_rollup(db, 30)
+        check("書込み途中の末尾行は数えない", ("2026-10-05", "builtin", "Grep") not in rollup_table(db))
+        with open(cur, "a", encoding="utf-8") as f:
+            f.write(tool_line(8, "Grep")[30:] + "\n")
+        bump(cur)
+        ctu.refresh_rollup(db, 30)
+        same("続きが来たら1回だけ数える")
+
+        with open(cur, "a", encoding="utf-8") as f:
+            f.write(tool_line(9, "Glob"))
+        ctu.refresh_rollup(db, 30)
+        check("書込み中の改行なし最終行は待つ", ("2026-10-05", "builtin", "Glob") not in rollup_table(db))
+        age(cur)
+        ctu.refresh_rollup(db, 30)
+        same("静止したら改行なし最終行も数える")
+        stats = ctu.refresh_rollup(db, 30)
+        check("その後は読み直さない", stats.files == 0, stats.files)
+
+        write_lines(cur, [tool_line(i) for i in range(2)])
+        bump(cur, 7200)
+        ctu.refresh_rollup(db, 30)
+        same("縮んだ: 寄与を消して数え直す")
+
+        with open(cur, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        lines[0] = lines[0].replace('"Bash"', '"Task"')
+        write_lines(cur, lines + [tool_line(3)])
+        bump(cur, 7201)
+        ctu.refresh_rollup(db, 30)
+        same("先頭の書換え (サイズは増えた): 追記扱いにせず数え直す")
+        db.close()
+
+        script = os.path.join(SKILL_DIR, "count_tool_uses.py")
+        out = cli(script)
+        raw_out = cli(script, "--raw")
+        check("再起動: 別プロセスでも catch-up 0 件", out.returncode == 0 and "rollup catch-up" not in out.stderr,
+              out.stderr)
+        check("再起動: --raw と同じ出力", out.stdout == raw_out.stdout, (out.stdout, raw_out.stdout))
+
+        print("[3] 読込失敗は ROLLBACK")
+
+        class Failing(ctu.BuiltinCounter):
+            def events(self, d):
+                raise OSError("read failed")
+
+        db = ctu.open_rollup(ctu.ROLLUP_DB)
+        before = rollup_table(db)
+        cursor = db.execute("SELECT byte_offset, head_hash FROM files WHERE path = ?", (cur,)).fetchone()
+        write_lines(cur, [tool_line(i, "Agent") for i in range(4)])
+        bump(cur, 7202)
+        ctu.refresh_rollup(db, 30, counters=(Failing(),))
+        check("寄与の削除は残らない・カーソルも前のまま", rollup_table(db) == before and cursor
+              == db.execute("SELECT byte_offset, head_hash FROM files WHERE path = ?", (cur,)).fetchone())
+        check("トランザクションは閉じている", not db.in_transaction)
+        ctu.refresh_rollup(db, 30)
+        same("次回で正しく追いつく")
+        db.close()
+
+        print("[4] 同時実行")
+        os.remove(str(ctu.ROLLUP_DB))
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(str(ctu.ROLLUP_DB) + suffix):
+                os.remove(str(ctu.ROLLUP_DB) + suffix)
+        bulk = [os.path.join(proj, "bulk%02d.jsonl" % n) for n in range(12)]
+        for path in bulk:
+            write_lines(path, [tool_line(i, "Tool%d" % (i % 9)) for i in range(3000)])
+        procs = [subprocess.Popen([sys.executable, script, "--days", "30", "--type", "all"],
+                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=dict(os.environ))
+                 for _ in range(4)]
+        errs = [p.communicate()[1].decode() for p in procs]
+        check("並列の CLI が全部成功", all(p.returncode == 0 for p in procs),
+              [e.strip().splitlines()[-1:] for e in errs])
+        db = ctu.open_rollup(ctu.ROLLUP_DB)
+        got, want = rollup_table(db), reference(paths + bulk, ctu)
+        check("二重加算なし (rollup = 数え直し)", got == want, sorted(set(got.items()) ^ set(want.items()))[:5])
+        check("ファイル行は1つずつ", db.execute("SELECT COUNT(*), COUNT(DISTINCT path) FROM files").fetchone()
+              == (len(paths + bulk),) * 2)
+        db.close()
+
+        print("[5] decode は必要な行だけ")
+        plain = [rec("user", "2026-10-06T00:00:%02dZ" % i, "s-plain", "質問 %d" % i) for i in range(10)]
+        plain += [rec("assistant", "2026-10-06T01:00:00Z", "s-plain", [{"type": "text", "text": "答え"}],
+                      requestId="r")]
+        stats = ctu.ScanStats()
+        got = [ctu.line_events(raw.encode(), ctu.COUNTERS, stats) for raw in plain]
+        check("sessionId / timestamp だけの行は decode しない", stats.decoded == 0, stats.decoded)
+        check("その日付と session", all(g == ("2026-10-06", [("session", "s-plain")]) for g in got), got)
+        decoded = []
+        for i, raw in enumerate(NESTED):
+            stats = ctu.ScanStats()
+            ctu.line_events(raw.encode(), ctu.COUNTERS, stats)
+            if stats.decoded:
+                decoded.append(i)
+        # 0,1,5,7: tool_use / 3: <command-name> / 2: timestamp の後ろに toolUseResult / 6: sessionId が入れ子だけ
+        check("tool_use / <command-name> の行と入れ子で確定できない行だけ decode",
+              decoded == [0, 1, 2, 3, 5, 6, 7], decoded)
+        top = ctu.top_level_str
+        check("top_level_str: 入れ子の後ろの top-level (末尾まで括弧なし)",
+              top(b'{"m":{"sessionId":"n"},"sessionId":"t"}', b"sessionId") == "t")
+        check("top_level_str: 入れ子だけ・値が文字列でない・{…} でない → UNKNOWN",
+              top(b'{"m":{"sessionId":"n"},"x":[1]}', b"sessionId") is ctu.UNKNOWN
+              and top(b'{"sessionId":null}', b"sessionId") is ctu.UNKNOWN
+              and top(b'not json {"sessionId":"x"}', b"sessionId") is ctu.UNKNOWN)
+        check("top_level_str: 文字列中のエスケープされた同名は無視・キー自体が無ければ None",
+              top(b'{"cwd":"\\"sessionId\\":\\"x","m":{}}', b"sessionId") is None
+              and top(b'{"cwd":"/x"}', b"sessionId") is None)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n%d passed, %d failed" % (PASS, FAIL))
+    sys.exit(1 if FAIL else 0)
+
+
+if __name__ == "__main__":
+    main()
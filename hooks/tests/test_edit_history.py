@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""test_edit_history.py — posttooluse-edit-history.py → userpromptsubmit-edit-recheck-warn.py の結合テスト
+
+検証: ①Edit 後 Read なしで言及 → warning ②Read 後は出ない ③再 Edit で再び出る (最後の Edit 基準)
+④別 session は無関係 ⑤jsonl 互換エクスポートも追記される ⑥ストアが無ければ jsonl から同じ判定
+⑦malformed 入力でも exit 0 ⑧rotate (行数は lock ファイル・満杯で .1 へ改名・読み手は .1 も読む)
+⑨rotate 直後でも他の読み手 (precompact-vault-sync.sh / stop-dup-guard.sh / sync-vault-summary.py list) が
+.1 側に入った同 session の Edit を拾う
+
+HOME を一時ディレクトリに差し替えて実行 (本物の ~/.claude/state を汚さない)。
+実行: python3 ~/.claude/hooks/tests/test_edit_history.py
+"""
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+HOOKS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WRITER = os.path.join(HOOKS, "posttooluse-edit-history.py")
+READER = os.path.join(HOOKS, "userpromptsubmit-edit-recheck-warn.py")
+SYNC = os.path.join(os.path.dirname(HOOKS), "scripts", "sync-vault-summary.py")
+PASS = 0
+FAIL = 0
+
+
+def check(name, cond, detail=""):
+    global PASS, FAIL
+    if cond:
+        PASS += 1
+        print("  PASS %s" % name)
+    else:
+        FAIL += 1
+        print("  FAIL %s  %s" % (name, detail))
+
+
+def run(hook, payload, env):
+    data = payload if isinstance(payload, str) else json.dumps(payload)
+    return subprocess.run([sys.executable, hook], input=data, capture_output=True, text=True, env=env)
+
+
+def touch(env, session, tool, path):
+    return run(WRITER, {"session_id": session, "tool_name": tool, "tool_input": {"file_path": path}}, env)
+
+
+def ask(env, session, prompt):
+    return run(READER, {"session_id": session, "prompt": prompt}, env).stdout
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="test-edit-history-")
+    env = dict(os.environ, HOME=tmp)
+    state = os.path.join(tmp, ".claude", "state")
+    try:
+        print("[1] ストア経由の判定")
+        touch(env, "s1", "Edit", "/p/app/foo.py")
+        touch(env, "s1", "Read", "/p/app/other.py")
+        check("Edit 後 Read なし → warning", "`foo.py`" in ask(env, "s1", "foo.py の変更どうなった?"))
+        check("言及なし → 出ない", ask(env, "s1", "テスト走らせて") == "")
+        touch(env, "s1", "Read", "/p/app/foo.py")
+        check("Read 後 → 出ない", ask(env, "s1", "foo.py の変更どうなった?") == "")
+        touch(env, "s1", "MultiEdit", "/p/app/foo.py")
+        out = ask(env, "s1", "/p/app/foo.py 見て")
+        check("再 Edit → 再び warning (tool は最後の Edit)", "MultiEdit 後" in out, out)
+        check("別 session は無関係", ask(env, "s2", "foo.py") == "")
+        check("ストア作成", os.path.exists(os.path.join(state, "file-history.db")))
+
+        print("[2] jsonl 互換エクスポート")
+        with open(os.path.join(state, "edit-history.jsonl")) as f:
+            edits = [json.loads(line) for line in f]
+        check("edit-history.jsonl 追記", [e["tool"] for e in edits] == ["Edit", "MultiEdit"]
+              and set(edits[0]) == {"ts", "session", "tool", "file"}, edits)
+        with open(os.path.join(state, "read-history.jsonl")) as f:
+            check("read-history.jsonl 追記", len(f.readlines()) == 2)
+
+        print("[3] ストアが無いときは jsonl から")
+        for p in glob.glob(os.path.join(state, "file-history.db*")):
+            os.remove(p)
+        out = ask(env, "s1", "foo.py")
+        check("jsonl フォールバックでも同じ判定", "MultiEdit 後" in out, out)
+
+        print("[4] rotate (SEGMENT_LINES 行で現行 → .1)")
+        edit_log = os.path.join(state, "edit-history.jsonl")
+        seg = os.path.join(state, "edit-history.1.jsonl")
+        with open(edit_log + ".lock") as f:
+            check("行数は lock ファイルに保持", f.read().strip() == "2")
+        with open(edit_log, "a") as f:
+            for i in range(997):
+                f.write('{"ts":"2026-01-01T00:00:00","session":"s9","tool":"Edit","file":"/p/x%d.py"}\n' % i)
+        with open(edit_log + ".lock", "w") as f:
+            f.write("")  # 旧版からの移行直後 (counter なし) → 1回だけ数え直す
+        touch(env, "s3", "Edit", "/p/app/bar.py")
+        with open(edit_log + ".lock") as f:
+            check("counter なし → 数え直して続きから", f.read().strip() == "1000")
+        touch(env, "s3", "Edit", "/p/app/baz.py")
+        with open(seg) as f:
+            n_seg = len(f.readlines())
+        with open(edit_log) as f:
+            n_cur = len(f.readlines())
+        check("1001 行目で rotate (.1 = 1000 / 現行 = 1)", (n_seg, n_cur) == (1000, 1), (n_seg, n_cur))
+        for p in glob.glob(os.path.join(state, "file-history.db*")):
+            os.remove(p)
+        out = ask(env, "s3", "bar.py と baz.py")
+        check("jsonl フォールバックは .1 側の Edit も見る", "`bar.py`" in out and "`baz.py`" in out, out)
+
+        print("[5] rotate 直後の他の読み手")
+        plan = os.path.join(tmp, "p", "docs", "plan.md")
+        os.makedirs(os.path.dirname(plan))
+        with open(plan, "w") as f:
+            f.write("## 同じ見出し\n本文\n\n## 同じ見出し\n本文\n")
+        touch(env, "s4", "Edit", plan)
+        with open(edit_log + ".lock", "w") as f:
+            f.write("%d\n" % 1000)  # 満杯扱い → 次の追記で plan.md の行ごと .1 へ
+        touch(env, "s4", "Edit", "/p/app/after.py")
+        with open(edit_log) as f:
+            cur = f.read()
+        check("plan.md の Edit は .1 側にある", "plan.md" not in cur and "after.py" in cur, cur)
+        open(os.path.join(state, "vault-cc-enabled"), "w").close()
+        out = subprocess.run(["bash", os.path.join(HOOKS, "precompact-vault-sync.sh")],
+                             input=json.dumps({"session_id": "s4"}), capture_output=True, text=True, env=env).stdout
+        check("precompact-vault-sync.sh が .1 側の rules/42 対象を拾う", "- " + plan in out, out)
+        out = subprocess.run(["bash", os.path.join(HOOKS, "stop-dup-guard.sh")],
+                             input=json.dumps({"session_id": "s4"}), capture_output=True, text=True, env=env).stdout
+        reason = json.loads(out or "{}").get("reason", "")
+        check("stop-dup-guard.sh が .1 側の .md の重複見出しで止める", "plan.md: 重複見出し" in reason, out)
+        out = subprocess.run([sys.executable, SYNC, "list", "s4"], capture_output=True, text=True, env=env).stdout
+        check("sync-vault-summary.py list も .1 側を出す", out.rstrip().endswith("\t" + plan), out)
+        for p in glob.glob(os.path.join(state, "file-history.db*")):
+            os.remove(p)
+
+        print("[6] fail-open")
+        r = run(WRITER, "not json", env)
+        check("writer malformed → exit 0", r.returncode == 0 and r.stdout == "")
+        r = run(READER, "not json", env)
+        check("reader malformed → exit 0", r.returncode == 0 and r.stdout == "")
+        r = touch(env, "s1", "Bash", "/p/app/foo.py")
+        check("対象外 tool は記録しない", r.returncode == 0 and not os.path.exists(os.path.join(state, "file-history.db")))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n%d passed, %d failed" % (PASS, FAIL))
+    sys.exit(1 if FAIL else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""test_hookd.py — _hookd.py (常駐ランナー) + _hookd-client.py (shim) の契約テスト
+
+検証: ①stdin/stdout/stderr/終了コード/argv/cwd/環境変数が直接実行と一致
+②SystemExit(str)・未捕捉例外・subprocess への fd 継承 ③要求間で状態が漏れない
+④フック更新・起動後追加フックを拾う ⑤デーモン不在なら直接実行 + デーモン自動起動
+⑥プロファイル記録 (shell フック・stdout バイト数・`| head`・stdout を握る孫・HOOK_PROFILE=0)
+⑦_profile-analyze.py のイベント別クリティカルパス / 退行検知
+⑧_profile-toggle.py: 既定は shell フック直接登録・on で --event 付きに包み off で元の本文に戻る
+
+一時 dir に _hookd*.py と検証用フックを置き、HOOKD_SOCKET で専用 socket を使う。
+実行: python3 ~/.claude/hooks/tests/test_hookd.py
+"""
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HOOKS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASS = 0
+FAIL = 0
+
+ECHO_HOOK = r'''#!/usr/bin/env python3
+import json, os, sys
+data = json.load(sys.stdin)
+leak = os.environ.get("HOOKD_TEST_LEAK")
+os.environ["HOOKD_TEST_LEAK"] = "1"
+print(json.dumps({"stdin": data, "argv": sys.argv[1:], "cwd": os.getcwd(),
+                  "foo": os.environ.get("FOO"), "leak": leak, "path0": sys.path[0]}))
+sys.stderr.write("to-stderr\n")
+sys.exit(data.get("code", 0))
+'''
+STR_EXIT_HOOK = '#!/usr/bin/env -S python3 -I\nimport sys\nsys.exit("blocked: reason")\n'
+RAISE_HOOK = '#!/usr/bin/env python3\nraise RuntimeError("boom")\n'
+SHELL_HOOK = '#!/bin/sh\necho "sh-out"\nexit 4\n'
+BG_HOOK = '#!/bin/sh\n(sleep 5; echo late) 2>/dev/null &\necho now\n'
+YES_HOOK = '#!/bin/sh\nyes | head -100000\n'
+SUBPROC_HOOK = ('#!/usr/bin/env python3\nimport subprocess, sys\nprint("parent", flush=True)\n'
+                'sys.exit(subprocess.run(["sh", "-c", "echo child; exit 3"]).returncode)\n')
+
+
+def check(name, cond, detail=""):
+    global PASS, FAIL
+    if cond:
+        PASS += 1
+        print("  PASS %s" % name)
+    else:
+        FAIL += 1
+        print("  FAIL %s  %s" % (name, detail))
+
+
+def write_hook(d, name, src):
+    path = os.path.join(d, name)
+    with open(path, "w") as f:
+        f.write(src)
+    os.chmod(path, 0o755)
+
+
+def run(d, env, name, payload, *argv, direct=False, cwd=None, event=None):
+    e = dict(env)
+    if direct:
+        e["HOOKD_DISABLE"] = "1"
+    pre = ["--event", event] if event else []
+    return subprocess.run([os.path.join(d, "_hookd-client.py"), *pre, name, *argv],
+                          input=json.dumps(payload), capture_output=True, text=True,
+                          env=e, cwd=cwd, timeout=20)
+
+
+def start_daemon(d, env, sock):
+    p = subprocess.Popen([sys.executable, "-I", os.path.join(d, "_hookd.py"), "--socket", sock],
+                         env=env)
+    wait_for(lambda: os.path.exists(sock))
+    return p
+
+
+def wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def load_analyzer():
+    spec = importlib.util.spec_from_file_location("profile_analyze", os.path.join(HOOKS, "_profile-analyze.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="test-hookd-")
+    d = os.path.join(tmp, "hooks")
+    os.makedirs(d)
+    for name in ("_hookd.py", "_hookd-client.py"):
+        shutil.copy(os.path.join(HOOKS, name), d)
+    write_hook(d, "echo.py", ECHO_HOOK)
+    write_hook(d, "strexit.py", STR_EXIT_HOOK)
+    write_hook(d, "raise.py", RAISE_HOOK)
+    write_hook(d, "subproc.py", SUBPROC_HOOK)
+    sock = os.path.join(tmp, "hookd.sock")
+    prof = os.path.join(tmp, "hook-profile.bin")
+    env = dict(os.environ, HOME=tmp, HOOKD_SOCKET=sock, HOOK_PROFILE_LOG=prof, FOO="bar")
+    daemon = start_daemon(d, env, sock)
+    try:
+        print("[1] 直接実行と同じ契約")
+        payload = {"tool_name": "Bash", "code": 2, "text": "日本語 \"quote\" \\ \t"}
+        via = run(d, env, "echo.py", payload, "a b", "-x", cwd=tmp)
+        ref = run(d, env, "echo.py", payload, "a b", "-x", cwd=tmp, direct=True)
+        check("exit code", via.returncode == ref.returncode == 2, f"{via.returncode} {ref.returncode}")
+        check("stdout", via.stdout == ref.stdout, f"{via.stdout!r} != {ref.stdout!r}")
+        check("stderr", via.stderr == ref.stderr == "to-stderr\n", repr(via.stderr))
+        out = json.loads(via.stdout)
+        check("stdin/argv/cwd/env", out["stdin"] == payload and out["argv"] == ["a b", "-x"]
+              and os.path.realpath(out["cwd"]) == os.path.realpath(tmp) and out["foo"] == "bar", out)
+        check("sys.path[0] = hook dir (-I 無し)", out["path0"] == d, out["path0"])
+
+        print("[2] 終了規則 / fd 継承")
+        via, ref = run(d, env, "strexit.py", {}), run(d, env, "strexit.py", {}, direct=True)
+        check("sys.exit(str) → 1 + stderr", via.returncode == ref.returncode == 1
+              and via.stderr == ref.stderr == "blocked: reason\n", repr(via.stderr))
+        via = run(d, env, "raise.py", {})
+        check("未捕捉例外 → 1 + traceback", via.returncode == 1 and "RuntimeError: boom" in via.stderr,
+              repr(via.stderr))
+        via = run(d, env, "subproc.py", {})
+        check("subprocess は client の stdout を継承", via.stdout == "parent\nchild\n" and via.returncode == 3,
+              f"{via.stdout!r} {via.returncode}")
+
+        print("[3] 要求間で状態が漏れない")
+        run(d, env, "echo.py", {})
+        out = json.loads(run(d, env, "echo.py", {}).stdout)
+        check("os.environ は要求ごと", out["leak"] is None, out)
+
+        print("[4] 更新・追加を拾う")
+        time.sleep(0.05)
+        write_hook(d, "echo.py", ECHO_HOOK.replace('"to-stderr', '"updated'))
+        os.utime(os.path.join(d, "echo.py"), (time.time() + 5, time.time() + 5))
+        via = run(d, env, "echo.py", {})
+        check("フック更新後は新しいコード", via.stderr == "updated\n", repr(via.stderr))
+        write_hook(d, "late.py", '#!/usr/bin/env python3\nprint("late")\n')
+        via = run(d, env, "late.py", {})
+        check("起動後に追加したフック", via.stdout == "late\n" and via.returncode == 0, repr(via.stdout))
+        check("上記がデーモン経由 (直接実行にフォールバックしていない)", daemon.poll() is None)
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+    print("[5] デーモン不在")
+    check("socket 片付け", not os.path.exists(sock))
+    via = run(d, env, "strexit.py", {})
+    check("直接実行にフォールバック", via.returncode == 1 and via.stderr == "blocked: reason\n",
+          repr(via.stderr))
+    check("デーモン自動起動", wait_for(lambda: os.path.exists(sock)))
+    pid_file = os.path.join(tmp, "hookd.pid")
+    if wait_for(lambda: os.path.exists(pid_file)):
+        with open(pid_file) as f:
+            pid = int(f.read())
+        via = run(d, env, "echo.py", {"code": 0})
+        check("自動起動したデーモンで実行", via.returncode == 0 and json.loads(via.stdout)["foo"] == "bar")
+        os.kill(pid, 15)
+        wait_for(lambda: not os.path.exists(sock))
+
+    print("[6] プロファイル記録")
+    analyze = load_analyzer()
+    for name, src in (("sh-hook.sh", SHELL_HOOK), ("bg-hook.sh", BG_HOOK), ("yes-hook.sh", YES_HOOK)):
+        write_hook(d, name, src)
+    os.remove(prof)
+    via = run(d, env, "sh-hook.sh", {}, event="Stop")
+    check("shell フック: stdout / 終了コード", via.stdout == "sh-out\n" and via.returncode == 4, repr(via.stdout))
+    run(d, env, "echo.py", {"code": 0}, event="Stop")
+    recs = analyze.load(prof)
+    check("1呼び出し1レコード", len(recs) == 2, len(recs))
+    r = recs[0]
+    check("event / hook / exit / stdout bytes", (r.event, r.hook, r.exit_code, r.stdout_bytes)
+          == ("Stop", "sh-hook.sh", 4, 7), (r.event, r.hook, r.exit_code, r.stdout_bytes))
+    check("Python フック (デーモン不在→直接) も stdout bytes", recs[1].stdout_bytes > 0 and recs[1].ms > 0)
+    t0 = time.monotonic()
+    via = run(d, env, "bg-hook.sh", {}, event="Stop")
+    check("stdout を握る孫を待たない", time.monotonic() - t0 < 3 and via.stdout.startswith("now"),
+          f"{time.monotonic() - t0:.1f}s")
+    pipe = subprocess.run("%s --event Stop yes-hook.sh | head -1" % os.path.join(d, "_hookd-client.py"),
+                          shell=True, capture_output=True, text=True, env=env, timeout=20)
+    check("| head で読み手が閉じても詰まらない", pipe.stdout == "y\n", repr(pipe.stdout))
+    n = len(analyze.load(prof))
+    run(d, dict(env, HOOK_PROFILE="0"), "sh-hook.sh", {})
+    check("HOOK_PROFILE=0 は記録しない", len(analyze.load(prof)) == n)
+
+    print("[7] 集計")
+    os.remove(prof)
+    now = time.time()
+    with open(prof, "wb") as f:
+        def rec(start, ms, event, hook, code=0):
+            f.write(analyze.RECORD.pack(start, int(ms * 1000), code, 10, event.encode(), hook.encode()))
+        for i in range(10):  # baseline: 3週間前。Stop 1回 = a(10ms) + b(20ms) を並列起動
+            t = now - 21 * 86400 + i * 60
+            rec(t, 10, "Stop", "a.sh")
+            rec(t + 0.01, 20, "Stop", "b.sh")
+        for i in range(10):  # 直近: b が 80ms に退行
+            t = now - 86400 + i * 60
+            rec(t, 10, "Stop", "a.sh")
+            rec(t + 0.01, 80, "Stop", "b.sh")
+        rec(now - 30, 5, "PreToolUse", "a.sh")
+        rec(now - 29.99, 5, "PreToolUse", "a.sh")  # 同じフックが続いたら別の発火
+    recs = analyze.load(prof)
+    occ = analyze.occurrences(recs)
+    check("発火単位にまとまる", len(occ["Stop"]) == 20 and all(len(o) == 2 for o in occ["Stop"])
+          and len(occ["PreToolUse"]) == 2, {k: len(v) for k, v in occ.items()})
+    rows = {r["event"]: r for r in analyze.event_rows([r for r in recs if r.start > now - 7 * 86400])}
+    check("クリティカルパス = 発火ごとの合計", abs(rows["Stop"]["sum_p50"] - 90) < 0.01, rows["Stop"])
+    found = {(k, n) for k, n, *_ in analyze.regressions(recs, now, 7, 28)}
+    check("退行検知 (hook / event)", found == {("hook", "b.sh"), ("event", "Stop")}, found)
+    out = subprocess.run([sys.executable, os.path.join(HOOKS, "_profile-analyze.py"), "--log", prof],
+                         capture_output=True, text=True)
+    check("CLI", out.returncode == 0 and "Per-event critical path" in out.stdout
+          and "b.sh" in out.stdout.split("# Regressions")[1], out.stdout[-400:])
+
+    print("[8] shell フック計測の入り切り")
+    toggle = os.path.join(HOOKS, "_profile-toggle.py")
+    settings = os.path.join(tmp, "settings.json")
+    shutil.copy(os.path.join(os.path.dirname(HOOKS), "settings.json"), settings)
+    with open(settings, encoding="utf-8") as f:
+        before = f.read()
+
+    def status():
+        return subprocess.run([sys.executable, toggle, "status", "--settings", settings],
+                              capture_output=True, text=True).stdout.strip()
+
+    check("既定: shell フックは直接登録 (shim の interpreter 起動を払わない)",
+          status().startswith("shell hooks: profiled 0 /"), status())
+    subprocess.run([sys.executable, toggle, "on", "--settings", settings], capture_output=True)
+    with open(settings, encoding="utf-8") as f:
+        hooks = json.load(f)["hooks"]
+    cmds = [(ev, h["command"]) for ev, arr in hooks.items() for m in arr for h in m.get("hooks", [])]
+    sh = [(ev, c) for ev, c in cmds if ".sh" in c and "/.claude/hooks/" in c]
+    check("on: hooks/ の .sh を全て自分のイベント付きで包む",
+          sh and all("_hookd-client.py --event %s " % ev in c for ev, c in sh),
+          [c for ev, c in sh if "_hookd-client.py --event %s " % ev not in c][:3])
+    check("on: インライン snippet の前後はそのまま",
+          any(c.startswith("(~/.claude/hooks/_hookd-client.py --event SessionStart ") and c.endswith("| head -50")
+              for ev, c in sh))
+    subprocess.run([sys.executable, toggle, "off", "--settings", settings], capture_output=True)
+    with open(settings, encoding="utf-8") as f:
+        check("off: 元の本文にバイト単位で戻る", f.read() == before)
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n%d passed, %d failed" % (PASS, FAIL))
+    sys.exit(1 if FAIL else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""test_ingest_jsonl.py — scripts/ingest-jsonl-to-sqlite.py の増分カーソル (byte_offset) テスト
+
+検証: ①伸びている transcript: 改行なしの末尾行は残し (size = 取込み済み byte)、続きが来たら取り込む
+②終わった transcript: mtime が SETTLE_SECONDS より古ければ改行なしの最終行も取り込む・2回目は skip
+③書込み中に取り込んだ後で静止したファイルも、次回実行で最終行を拾う
+④旧版のカーソル (size = ファイル全長・byte_offset < size) も次回で拾い直す
+⑤再起動後の追記 (追記分だけ・line_no は続きから) / 縮んだ / 先頭の書換え → 古い行を残さず全量
+いずれも逐次 / --workers 2 の両方で同じ行数になること。
+⑥--force --bulk: 逐次取込みと同じ行・FTS で引ける・trigger が戻る。中断 (trigger 欠落) は次回 rebuild
+⑦--tokenizer 切替: unicode61 → bigram で2字熟語が引ける・行は増減しない・以後の追記も索引される
+
+HOME を一時ディレクトリに差し替えて CLI を実行 (本物の ~/.claude/archives/index.db を触らない)。
+実行: python3 ~/.claude/hooks/tests/test_ingest_jsonl.py
+"""
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                "scripts"))
+from history_fts import match_expr  # noqa: E402
+
+INGEST = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                      "scripts", "ingest-jsonl-to-sqlite.py")
+PASS = 0
+FAIL = 0
+
+
+def check(name, cond, detail=""):
+    global PASS, FAIL
+    if cond:
+        PASS += 1
+        print("  PASS %s" % name)
+    else:
+        FAIL += 1
+        print("  FAIL %s  %s" % (name, detail))
+
+
+def line(i):
+    return json.dumps({"type": "user", "timestamp": "2026-10-01T00:00:%02dZ" % i, "sessionId": "s",
+                       "message": {"role": "user", "content": "msg %d" % i}})
+
+
+def age(path, seconds=3600):
+    t = time.time() - seconds
+    os.utime(path, (t, t))
+
+
+def bump(path, seconds=1):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 10 ** 9))
+
+
+def write(path, lines, mode="w"):
+    with open(path, mode) as f:
+        f.write("".join(l + "\n" for l in lines))
+
+
+class Env:
+    def __init__(self, tmp, label, workers):
+        self.home = os.path.join(tmp, label)
+        self.dir = os.path.join(self.home, ".claude", "projects", "proj")
+        os.makedirs(self.dir)
+        self.db = os.path.join(self.home, "index.db")
+        self.workers = workers
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def run(self, *extra):
+        cmd = [sys.executable, INGEST, "--db", self.db, *extra]
+        if self.workers:
+            cmd += ["--workers", str(self.workers)]
+        r = subprocess.run(cmd, env=dict(os.environ, HOME=self.home), capture_output=True, text=True)
+        if r.returncode != 0:
+            print(r.stderr)
+        self.stderr = r.stderr
+        return r.stdout
+
+    def query(self, sql, params=()):
+        db = sqlite3.connect(self.db)
+        try:
+            return db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+
+    def rows(self):
+        return sorted(self.query("SELECT source_file, line_no, role, ts, content, tool_name FROM messages"))
+
+    def hits(self, term, tokenizer):
+        return self.query("SELECT count(*) FROM messages_fts WHERE messages_fts MATCH ?",
+                          (match_expr(term, tokenizer),))[0][0]
+
+    def contents(self, name):
+        db = sqlite3.connect(self.db)
+        try:
+            return [c for (c,) in db.execute(
+                "SELECT content FROM messages WHERE source_file = ? ORDER BY line_no", (self.path(name),))]
+        finally:
+            db.close()
+
+    def cursor(self, name):
+        db = sqlite3.connect(self.db)
+        try:
+            return db.execute("SELECT size, byte_offset, last_line FROM ingested_files WHERE path = ?",
+                              (self.path(name),)).fetchone()
+        finally:
+            db.close()
+
+
+def scenario(tmp, label, workers):
+    print("[%s]" % label)
+    env = Env(tmp, label, workers)
+
+    grow = env.path("grow.jsonl")
+    with open(grow, "w") as f:
+        f.write(line(1) + "\n" + line(2) + "\n" + line(3)[:20])
+    env.run()
+    check("伸びている: 改行なしの末尾は取り込まない", env.contents("grow.jsonl") == ["msg 1", "msg 2"],
+          env.contents("grow.jsonl"))
+    size, offset, last = env.cursor("grow.jsonl")
+    check("size は取込み済み byte (= byte_offset)", size == offset < os.path.getsize(grow), (size, offset))
+    with open(grow, "a") as f:
+        f.write(line(3)[20:] + "\n" + line(4) + "\n")
+    env.run()
+    check("続きが来たら取り込む", env.contents("grow.jsonl") == ["msg 1", "msg 2", "msg 3", "msg 4"],
+          env.contents("grow.jsonl"))
+
+    done = env.path("done.jsonl")
+    with open(done, "w") as f:
+        f.write(line(1) + "\n" + line(2) + "\n" + line(3))
+    age(done)
+    env.run()
+    check("終わった: 改行なしの最終行も取り込む", env.contents("done.jsonl") == ["msg 1", "msg 2", "msg 3"],
+          env.contents("done.jsonl"))
+    check("カーソルはファイル末尾", env.cursor("done.jsonl") == (os.path.getsize(done),) * 2 + (3,),
+          env.cursor("done.jsonl"))
+    out = env.run()
+    check("2回目は skip", "from 0 new/modified files" in out and env.contents("done.jsonl") == ["msg 1", "msg 2", "msg 3"],
+          out)
+
+    late = env.path("late.jsonl")
+    with open(late, "w") as f:
+        f.write(line(1) + "\n" + line(2))
+    env.run()
+    check("書込み中は最終行を待つ", env.contents("late.jsonl") == ["msg 1"], env.contents("late.jsonl"))
+    age(late)
+    env.run()
+    check("静止した後の実行で最終行を拾う", env.contents("late.jsonl") == ["msg 1", "msg 2"],
+          env.contents("late.jsonl"))
+
+    old = env.path("old.jsonl")
+    with open(old, "w") as f:
+        f.write(line(1) + "\n" + line(2))
+    env.run()
+    db = sqlite3.connect(env.db)
+    db.execute("UPDATE ingested_files SET size = ? WHERE path = ?", (os.path.getsize(old), old))
+    db.commit()
+    db.close()
+    age(old)
+    env.run()
+    check("旧版のカーソル (size = 全長) も拾い直す", env.contents("old.jsonl") == ["msg 1", "msg 2"],
+          env.contents("old.jsonl"))
+
+    bad = env.path("bad.jsonl")
+    with open(bad, "w") as f:
+        f.write(line(1) + "\n" + line(2)[:15])
+    age(bad)
+    env.run()
+    check("終わっていても JSON として不完全な最終行は取り込まない", env.contents("bad.jsonl") == ["msg 1"]
+          and env.cursor("bad.jsonl")[1] < os.path.getsize(bad), env.cursor("bad.jsonl"))
+
+    # ⑤ 各 run は別プロセス = 再起動。カーソルは DB にだけある
+    cur = env.path("cursor.jsonl")
+    write(cur, [line(i) for i in range(1, 4)])
+    env.run()
+    write(cur, [line(4), line(5)], "a")
+    env.run()
+    check("再起動後の追記: 追記分だけ・重複なし", env.contents("cursor.jsonl") == ["msg %d" % i for i in range(1, 6)],
+          env.contents("cursor.jsonl"))
+    check("line_no は続きから", [n for (n,) in env.query(
+        "SELECT line_no FROM messages WHERE source_file = ? ORDER BY line_no", (cur,))] == [1, 2, 3, 4, 5])
+    write(cur, [line(7), line(8)])
+    bump(cur)
+    env.run()
+    check("縮んだ: 古い行を消して全量", env.contents("cursor.jsonl") == ["msg 7", "msg 8"], env.contents("cursor.jsonl"))
+    write(cur, [line(9), line(8), line(10)])
+    bump(cur, 2)
+    env.run()
+    check("先頭の書換え (サイズは増えた): 追記扱いにせず全量", env.contents("cursor.jsonl") == ["msg 9", "msg 8", "msg 10"],
+          env.contents("cursor.jsonl"))
+
+
+def bulk_and_tokenizer(tmp):
+    print("[bulk / tokenizer]")
+    env = Env(tmp, "bulk", 0)
+    for n in range(3):
+        write(env.path("s%d.jsonl" % n), [json.dumps({
+            "type": "assistant", "timestamp": "2026-10-0%dT00:00:%02dZ" % (n + 1, i), "sessionId": "s%d" % n,
+            "message": {"role": "assistant", "content": "hook の実装 %d-%d" % (n, i)}}) for i in range(20)])
+    env.run()
+    want = env.rows()
+    check("逐次取込み", len(want) == 60, len(want))
+    env.run("--force", "--bulk")
+    check("--bulk: 逐次と同じ行", env.rows() == want)
+    check("--bulk: FTS で引ける", env.hits("hook", "unicode61") == 60)
+    triggers = {n for (n,) in env.query("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    check("--bulk: trigger が戻る", triggers == {"messages_ai", "messages_ad"}, triggers)
+
+    db = sqlite3.connect(env.db)
+    db.executescript("DROP TRIGGER messages_ai; DROP TRIGGER messages_ad;"
+                     "INSERT INTO messages_fts(messages_fts) VALUES('delete-all');")
+    db.close()
+    write(env.path("s0.jsonl"), [json.dumps({"type": "user", "timestamp": "2026-10-09T00:00:00Z",
+                                             "message": {"role": "user", "content": "hook 追記"}})], "a")
+    env.run()
+    check("中断した --bulk (trigger 欠落) は次回 rebuild", "rebuilding messages_fts" in env.stderr
+          and env.hits("hook", "unicode61") == 61, (env.stderr, env.hits("hook", "unicode61")))
+
+    check("unicode61 では2字熟語が引けない", env.hits("実装", "unicode61") == 0)
+    env.run("--tokenizer", "bigram")
+    check("bigram へ移行", "migrating messages_fts: unicode61 -> bigram" in env.stderr, env.stderr)
+    check("移行後: 2字熟語が引ける・行は増減しない", env.hits("実装", "bigram") == 60 and len(env.rows()) == 61,
+          (env.hits("実装", "bigram"), len(env.rows())))
+    write(env.path("s1.jsonl"), [json.dumps({"type": "user", "timestamp": "2026-10-09T00:00:01Z",
+                                             "message": {"role": "user", "content": "追記した実装"}})], "a")
+    env.run()
+    check("移行後の追記も索引", env.hits("実装", "bigram") == 61 and env.hits("hook", "bigram") == 61,
+          (env.hits("実装", "bigram"), env.hits("hook", "bigram")))
+    env.run("--tokenizer", "unicode61")
+    check("unicode61 へ戻す", "bigram -> unicode61" in env.stderr and env.hits("hook", "unicode61") == 61
+          and env.query("SELECT count(*) FROM messages WHERE content_cjk IS NOT NULL")[0][0] == 0)
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="test-ingest-jsonl-")
+    try:
+        scenario(tmp, "serial", 0)
+        scenario(tmp, "workers", 2)
+        bulk_and_tokenizer(tmp)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n%d passed, %d failed" % (PASS, FAIL))
+    sys.exit(1 if FAIL else 0)
+
+
+if __name__ == "__main__":
+    main()
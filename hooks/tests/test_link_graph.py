@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""test_link_graph.py — scripts/link_graph.py (vault + repo root のリンクグラフ) テスト
+
+検証: ①dead_links: 実体なし / file:// 不在 (実体 = .trash 以外の全 *.md・隠しディレクトリ配下も含む)
+  anchors=True のときだけ #見出し・#^block の不在 (見出しは Obsidian の表記ゆれを吸収)
+②repo_dead_links: repo → vault の file:// (code 内も数える・node_modules / archive は降りない・重複は1回)
+③backlinks: wikilink / embed / deep link / file:// (vault・repo)・フォルダ付きリンクは末尾一致・code 内は数えない
+④orphans: 自己リンクだけ・.trash は数えない ⑤永続: 別インスタンスでも再解析 0 件・変更ファイルだけ読み直す
+⑥vault_dead_link_check.py がグラフ照会で従来形式の行を出す (dead-anchor: は --anchors のときだけ)
+
+HOME を一時ディレクトリに差し替えて実行 (本物の ~/.claude/state と vault を触らない)。
+file:// の抽出規則は /Users/ 始まりなので、一時 HOME でも拾えるようプロセス内で FILEURI を差し替えて検査する。
+実行: python3 ~/.claude/hooks/tests/test_link_graph.py
+"""
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import urllib.parse
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "scripts")
+PASS = 0
+FAIL = 0
+
+
+def check(name, cond, detail=""):
+    global PASS, FAIL
+    if cond:
+        PASS += 1
+        print("  PASS %s" % name)
+    else:
+        FAIL += 1
+        print("  FAIL %s  %s" % (name, detail))
+
+
+def write(root, rel, text):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def bump(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+
+def build(tmp):
+    vault = os.path.join(tmp, "Documents", "Obsidian Vault")
+    repo = os.path.join(tmp, "repo")
+    ads = "02_Ai/AI_adscrm"
+    q = urllib.parse.quote(vault)  # file:// の空白は %20 (実ノートと同じ書き方)
+    write(vault, "wiki/meta/project-registry.md", "- **root**: `~/repo`\n- **root**: `~/gone`\n")
+    write(vault, ads + "/target.md", "# Step 1: Foo\n本文 ^blk\n[[target]] 自己リンク\n")
+    write(vault, ads + "/src.md",
+          "[[target#Step 1: Foo]] [[target#step 1 foo]] [[target#^blk]] [[target#無い見出し]] [[target#^nope]]\n"
+          "![[target#Step 1: Foo]] [[無いノート]] [[画像.png]] `[[コード内]]`\n"
+          "[[other/target]] file://%s/%s/target.md file://%s/無い.md\n"
+          "[[隠しノート]] [[隠しノート#隠し見出し]] [[old]]\n" % (q, ads, q))
+    write(vault, ads + "/lonely.md", "# ひとり\n")
+    write(vault, ads + "/from-repo.md", "# repo からだけ\n")
+    write(vault, ".trash/old.md", "[[lonely]]\n")
+    write(vault, ".hidden/隠しノート.md", "# 隠し見出し\n")
+    write(repo, "README.md", "file://%s/%s/from-repo.md\n```\nfile://%s/消えた.md\nfile://%s/消えた.md\n```\n"
+          % (q, ads, q, q))
+    write(repo, "node_modules/x.md", "file://%s/無視.md\n" % q)
+    write(repo, "archive/y.md", "file://%s/無視.md\n" % q)
+    return vault, repo, ads
+
+
+def check_script(*args):
+    return subprocess.run([sys.executable, os.path.join(SCRIPTS, "vault_dead_link_check.py"), *args],
+                          capture_output=True, text=True).stdout.splitlines()
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="test-link-graph-")
+    os.environ["HOME"] = tmp
+    os.environ.pop("VAULT_INDEX_DIR", None)
+    sys.path.insert(0, SCRIPTS)
+    import vault_index as vi  # noqa: E402  (HOME 差し替え後に import = state も一時ディレクトリ)
+    import link_graph as lg  # noqa: E402
+    try:
+        vault, repo, ads = build(tmp)
+        out = check_script()
+        out_anchors = check_script("--anchors")
+
+        saved = vi.FILEURI
+        vi.FILEURI = re.compile(r'file://(/[^)\s>"\'（」・]+)')
+        os.environ["VAULT_INDEX_DIR"] = os.path.join(tmp, "graph-index")  # 上の subprocess とは別の索引
+        try:
+            graph = lg.LinkGraph(vault)
+            graph.refresh()
+
+            print("[1] dead_links")
+            def dead(**kw):
+                return [(d["problem"], d["target"] + ("#" + d["anchor"] if d["anchor"] else ""))
+                        for d in graph.dead_links({ads + "/src.md"}, **kw)]
+            check("既定: 実体なし・file:// 不在だけ (アンカー・添付・code 内・隠しディレクトリの実体は除く)",
+                  dead() == [("note", "無いノート"), ("file", "%s/無い.md" % vault), ("note", "old")], dead())
+            check("anchors=True: 見出し/block 不在も (表記ゆれ・隠しディレクトリの見出しは解決)",
+                  dead(anchors=True) == [("anchor", "target#無い見出し"), ("anchor", "target#^nope"),
+                                         ("note", "無いノート"), ("file", "%s/無い.md" % vault), ("note", "old")],
+                  dead(anchors=True))
+
+            print("[2] repo_dead_links")
+            check("code 内も数える・重複1回・node_modules / archive は降りない",
+                  list(graph.repo_dead_links()) == [(os.path.join(repo, "README.md"), "%s/消えた.md" % vault)],
+                  list(graph.repo_dead_links()))
+
+            print("[3] backlinks")
+            got = sorted((b["root"], b["src"], b["kind"], b["anchor"] or "") for b in graph.backlinks("target"))
+            want = sorted([("vault", ads + "/target.md", "wikilink", ""),
+                           ("vault", ads + "/src.md", "wikilink", "Step 1: Foo"),
+                           ("vault", ads + "/src.md", "wikilink", "step 1 foo"),
+                           ("vault", ads + "/src.md", "wikilink", "^blk"),
+                           ("vault", ads + "/src.md", "wikilink", "無い見出し"),
+                           ("vault", ads + "/src.md", "wikilink", "^nope"),
+                           ("vault", ads + "/src.md", "embed", "Step 1: Foo"),
+                           ("vault", ads + "/src.md", "file", "")])
+            check("wikilink / embed / deep link / file://・[[other/target]] は別物", got == want, got)
+            check("repo の file:// も逆引き", graph.backlinks(ads + "/from-repo.md")
+                  == [{"root": repo, "src": "README.md", "kind": "file", "anchor": None}])
+            check("存在しないノートは空", graph.backlinks("無いノート") == [])
+
+            print("[4] orphans")
+            check("自己リンクだけ・.trash からのリンクは数えない (repo の file:// は数える)",
+                  graph.orphans(ads) == [ads + "/lonely.md", ads + "/src.md"], graph.orphans(ads))
+            graph.close()
+
+            print("[5] 永続・差分")
+            graph = lg.LinkGraph(vault)
+            graph.refresh()
+            check("別インスタンスでも再解析 0 件",
+                  graph.vault.stats["parsed"] == 0 and graph.repos[repo].stats["parsed"] == 0,
+                  (graph.vault.stats, graph.repos[repo].stats))
+            bump(write(repo, "README.md", "file://%s/%s/from-repo.md\n" % (urllib.parse.quote(vault), ads)))
+            graph.refresh()
+            check("repo の変更ファイルだけ読み直し、断線が消える",
+                  graph.repos[repo].stats["parsed"] == 1 and graph.vault.stats["parsed"] == 0
+                  and list(graph.repo_dead_links()) == [], graph.repos[repo].stats)
+            graph.close()
+        finally:
+            vi.FILEURI = saved
+
+        print("[6] vault_dead_link_check.py")
+        wikilinks = ["dead-wikilink: %s/src.md → [[%s]] の実体なし"
+                     " (aliases はリンクを解決しない・rules/41 §④ 張替え必須)" % (ads, t) for t in ("無いノート", "old")]
+        check("audit (引数なし) は dead-wikilink だけ従来形式で (file:// は /Users/ 外なので対象外)",
+              out == wikilinks, out)
+        check("--anchors で dead-anchor: 行も",
+              out_anchors == ["dead-anchor: %s/src.md → [[target#無い見出し]] の見出し/ブロックなし" % ads,
+                              "dead-anchor: %s/src.md → [[target#^nope]] の見出し/ブロックなし" % ads] + wikilinks,
+              out_anchors)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n%d passed, %d failed" % (PASS, FAIL))
+    sys.exit(1 if FAIL else 0)
+
+
+if __name__ == "__main__":
+    main()
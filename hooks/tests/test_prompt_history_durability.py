@@ -126,6 +126,38 @@ def main():
     finally:
         shutil.rmtree(tmp, ignore_errors=True)
 
+    # === 系統1d: 複数の古い受領票をまとめて判定 (push 後に手元で追記された分だけ保持・git は3回) ===
+    tmp = tempfile.mkdtemp(prefix="phd1d-")
+    try:
+        env, state, vault, host, paths, cfgp, remote = make_env(tmp, with_git=True)
+        names = [old_receipt_name(d) for d in (35, 36, 37)]
+        for n in names:
+            with open(os.path.join(state, "receipts", n), "w") as f:
+                f.write(receipt("claude-env", n, ts=n[:10] + "T10:00:00+09:00"))
+        run_reflect(env)
+        git(vault, "add", "-A")
+        git(vault, "commit", "-qm", "queue")
+        git(vault, "push", "-q", "origin", "HEAD:main")
+        with open(os.path.join(vault, "03_ClaudeEnv/prompts/.queue", host, names[1]), "a") as f:
+            f.write("\n")  # push 後のローカル変更 = 未 push 分あり
+        # git 呼び出し回数を数える shim
+        bindir = os.path.join(tmp, "bin")
+        os.makedirs(bindir)
+        calls = os.path.join(tmp, "git-calls")
+        with open(os.path.join(bindir, "git"), "w") as f:
+            f.write('#!/bin/sh\necho "$*" >> "%s"\nexec "%s" "$@"\n' % (calls, shutil.which("git")))
+        os.chmod(os.path.join(bindir, "git"), 0o755)
+        env_count = dict(env, PATH=bindir + os.pathsep + env["PATH"])
+        r = run_reflect(env_count)
+        left = [n for n in names if os.path.exists(os.path.join(state, "receipts", n))]
+        with open(calls) as f:
+            n_calls = len(f.readlines())
+        check("3b batch-purge-mixed", left == [names[1]] and "purged=2" in r.stdout
+              and "held_unpushed=1" in r.stdout, "left=%s %s" % (left, r.stdout))
+        check("3c git-calls-constant", n_calls == 3, "git calls=%d" % n_calls)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
     # === 系統1b: git 不在 vault は保持側に倒す ===
     tmp = tempfile.mkdtemp(prefix="phd1b-")
     try:
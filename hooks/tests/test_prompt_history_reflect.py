@@ -9,6 +9,7 @@
 import json
 import os
 import shutil
+import sqlite3
 import subprocess
 import sys
 import tempfile
@@ -86,6 +87,26 @@ def run(env):
                           text=True, env=env, timeout=30)
 
 
+def ledger_count(state):
+    """台帳 (reflected-ledger.db) の登録件数。DB が無ければ 0。"""
+    path = os.path.join(state, "reflected-ledger.db")
+    if not os.path.exists(path):
+        return 0
+    db = sqlite3.connect(path)
+    try:
+        return db.execute("SELECT count(*) FROM reflected").fetchone()[0]
+    finally:
+        db.close()
+
+
+def drop_ledger(state):
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.unlink(os.path.join(state, "reflected-ledger.db" + suffix))
+        except FileNotFoundError:
+            pass
+
+
 def read(vault, rel):
     with open(os.path.join(vault, rel)) as f:
         return f.read()
@@ -142,12 +163,8 @@ def main():
               "size %d→%d stdout=%r" % (size1, len(ce2), r2.stdout))
 
         # --- (2b) 検証: evt アンカーが実在してから台帳記帳 ---
-        ledger = open(os.path.join(state, "reflected-ledger.jsonl")).read()
-        for eid in [l.split("<!-- evt:")[1].split(" ")[0] for l in ce.splitlines()
-                    if "<!-- evt:" in l]:
-            pass
-        check("2b ledger-count", len([l for l in ledger.splitlines() if l.strip()]) == 6,
-              "ledger lines=%d" % len(ledger.splitlines()))
+        n = ledger_count(state)
+        check("2b ledger-count", n == 6, "ledger rows=%d" % n)
 
         # --- (8) 非 writer ホストは INBOX を触らない (queue 転送のみ) ---
         tmp2 = tempfile.mkdtemp(prefix="phr-test2-")
@@ -164,13 +181,12 @@ def main():
             shutil.rmtree(tmp2, ignore_errors=True)
 
         # --- (11) クラッシュ窓修復: 台帳が消えても INBOX 既存分は再追記せず台帳修復 ---
-        os.unlink(os.path.join(state, "reflected-ledger.jsonl"))
+        drop_ledger(state)
         size_b = len(read(vault, paths["claude-env"]))
         r5 = run(env)
         ce5 = read(vault, paths["claude-env"])
-        led = open(os.path.join(state, "reflected-ledger.jsonl")).read()
         check("11 crash-repair", len(ce5) == size_b and "台帳修復" in r5.stdout
-              and len([l for l in led.splitlines() if l.strip()]) >= 6, r5.stdout)
+              and ledger_count(state) >= 6, r5.stdout)
 
         # --- (12) 外部編集 (Obsidian) を検知して中止 ---
         write_receipts(state, [receipt("claude-env", "外部編集競合テスト", ts_hm="12:00")])
@@ -222,14 +238,12 @@ def main():
               and "改ざん隣の正常レコード" in ce9, r9.stdout)
 
         # --- (10) INBOX 消滅時はスキップ・台帳に載せず次回再試行 ---
-        n_led = len([l for l in open(os.path.join(state, "reflected-ledger.jsonl"))
-                     if l.strip()])
+        n_led = ledger_count(state)
         write_receipts(state, [receipt("aiads", "消えたINBOX宛", ts_hm="15:00")])
         os.unlink(os.path.join(vault, paths["aiads"]))
         r4 = run(env)
-        ledger2 = open(os.path.join(state, "reflected-ledger.jsonl")).read()
         check("10 missing-inbox-retry", "WARN inbox missing" in r4.stdout
-              and len([l for l in ledger2.splitlines() if l.strip()]) == n_led, r4.stdout)
+              and ledger_count(state) == n_led, r4.stdout)
 
     finally:
         shutil.rmtree(tmp, ignore_errors=True)
@@ -262,6 +276,136 @@ def main():
     finally:
         shutil.rmtree(tmp3, ignore_errors=True)
 
+    # --- (16) チェックポイント: 新規 bytes だけ読む・書きかけ行は次回・書換え検知・--verify ---
+    tmp4 = tempfile.mkdtemp(prefix="phr-test4-")
+    try:
+        env4, state4, vault4, host4, paths4 = make_env(tmp4)
+        write_receipts(state4, [receipt("claude-env", "cp-1"), receipt("claude-env", "cp-2")])
+        run(env4)
+        qf = os.path.join(vault4, "03_ClaudeEnv", "prompts", ".queue", host4, TODAY + ".jsonl")
+        with open(os.path.join(state4, "reflect-checkpoint.json")) as f:
+            ent = json.load(f)["files"]["queue/%s/%s.jsonl" % (host4, TODAY)]
+        check("16 cursor-at-eof", ent["offset"] == os.path.getsize(qf) and ent["count"] == 2
+              and "ids" not in ent, json.dumps(ent)[:200])
+
+        half = receipt("claude-env", "cp-半行")
+        with open(qf, "a") as f:
+            f.write(half[:40])
+        r = run(env4)
+        check("16b partial-line-deferred", "no new events" in r.stdout
+              and "cp-半行" not in read(vault4, paths4["claude-env"]), r.stdout)
+        with open(qf, "a") as f:
+            f.write(half[40:])
+        run(env4)
+        check("16c partial-line-completed", "cp-半行" in read(vault4, paths4["claude-env"]))
+
+        # 同期の巻き戻し等でファイルが書き換わった → 先頭から読み直し (台帳で重複は弾く)
+        with open(qf) as f:
+            lines = f.readlines()
+        with open(qf, "w") as f:
+            f.writelines(lines[:1] + [receipt("claude-env", "cp-差し替え後", ts_hm="11:00")])
+        r = run(env4)
+        ce = read(vault4, paths4["claude-env"])
+        check("16d rewrite-rewinds", "先頭から再読" in r.stdout and "cp-差し替え後" in ce
+              and ce.count("cp-1") == 1, r.stdout)
+
+        r = subprocess.run([sys.executable, SCRIPT, "--verify"], capture_output=True,
+                           text=True, env=env4, timeout=30)
+        check("16e verify-clean", "取りこぼし 0 件 / 幽霊 0 件" in r.stdout, r.stdout)
+        db = sqlite3.connect(os.path.join(state4, "reflected-ledger.db"))
+        with db:
+            src = "queue/%s/%s.jsonl" % (host4, TODAY)
+            (gone,) = db.execute("SELECT id FROM captured WHERE src = ? LIMIT 1", (src,)).fetchone()
+            db.execute("DELETE FROM captured WHERE id = ? AND src = ?", (gone, src))
+        db.close()
+        r = subprocess.run([sys.executable, SCRIPT, "--verify"], capture_output=True,
+                           text=True, env=env4, timeout=30)
+        check("16f verify-detects-drift", "取りこぼし 1 件" in r.stdout, r.stdout)
+        r = subprocess.run([sys.executable, SCRIPT, "--verify"], capture_output=True,
+                           text=True, env=env4, timeout=30)
+        check("16g verify-rebuilds", "取りこぼし 0 件 / 幽霊 0 件" in r.stdout, r.stdout)
+
+        # INBOX の外部編集 (アンカー削除 → 復元) は sig の変化で読み直し、集計は差分で追従する
+        def status():
+            with open(os.path.join(state4, "reconcile-status.json")) as f:
+                return json.load(f)
+        base = status()
+        inbox = os.path.join(vault4, paths4["claude-env"])
+        text = read(vault4, paths4["claude-env"])
+        anchor = next(a for a in text.split("<!-- ")[1:] if a.startswith("evt:")).split(" -->")[0]
+        with open(inbox, "w") as f:
+            f.write(text.replace("<!-- %s -->" % anchor, ""))
+        run(env4)
+        edited = status()
+        with open(inbox, "w") as f:
+            f.write(text)
+        run(env4)
+        restored = status()
+        check("16h inbox-edit-tracked", base["unreflected"] == 0 and edited["unreflected"] == 1
+              and edited["matched_total"] == base["matched_total"] - 1
+              and restored["unreflected"] == 0 and restored["matched_total"] == base["matched_total"]
+              and restored["captured_total"] == base["captured_total"],
+              "%s / %s / %s" % (base, edited, restored))
+    finally:
+        shutil.rmtree(tmp4, ignore_errors=True)
+
+    # --- (18) 転送 cursor は byte offset: 新しい末尾だけ・書きかけ行は次回・旧形式 (行数) を換算 ---
+    tmp6 = tempfile.mkdtemp(prefix="phr-test6-")
+    try:
+        env6, state6, vault6, host6, paths6 = make_env(tmp6, writer=False)
+        rfile = os.path.join(state6, "receipts", TODAY + ".jsonl")
+        qfile = os.path.join(vault6, "03_ClaudeEnv", "prompts", ".queue", host6, TODAY + ".jsonl")
+        cpath = os.path.join(state6, "transfer-cursor.json")
+        lines = [receipt("claude-env", "tr-%d" % i) for i in range(3)]
+        write_receipts(state6, lines[:2])
+        half = receipt("claude-env", "tr-半行")
+        write_receipts(state6, [half[:30]])
+        r = run(env6)
+        with open(cpath) as f:
+            cur = json.load(f)
+        check("18 byte-cursor-skips-partial", "moved=2" in r.stdout
+              and cur == {TODAY + ".jsonl": {"offset": len("".join(lines[:2]).encode())}}
+              and open(qfile).read() == "".join(lines[:2]), r.stdout + json.dumps(cur))
+        write_receipts(state6, [half[30:]])
+        r = run(env6)
+        check("18b partial-completed", "moved=1" in r.stdout
+              and open(qfile).read() == "".join(lines[:2]) + half, r.stdout)
+
+        with open(cpath, "w") as f:
+            json.dump({TODAY + ".jsonl": 2}, f)  # 旧形式: 先頭2行が転送済み
+        r = run(env6)
+        with open(qfile) as f:
+            q = f.read()
+        check("18c legacy-line-cursor", "moved=1" in r.stdout and q.count("tr-半行") == 2
+              and q.count("tr-0") == 1, r.stdout)
+    finally:
+        shutil.rmtree(tmp6, ignore_errors=True)
+
+    # --- (17) 旧 JSONL 台帳の1回限りの移行 (移行分は再追記も台帳修復もしない) ---
+    tmp5 = tempfile.mkdtemp(prefix="phr-test5-")
+    try:
+        env5, state5, vault5, host5, paths5 = make_env(tmp5)
+        lines = [receipt("claude-env", "移行前%d" % i) for i in range(2)]
+        write_receipts(state5, lines)
+        run(env5)
+        drop_ledger(state5)
+        os.unlink(os.path.join(state5, "reflect-checkpoint.json"))
+        legacy = os.path.join(state5, "reflected-ledger.jsonl")
+        with open(legacy, "w") as f:
+            f.writelines(json.loads(l)["event_id"] + "\n" for l in lines)
+            f.write("not-a-uuid\n")
+        write_receipts(state5, [receipt("claude-env", "移行後", ts_hm="11:00")])
+        r = run(env5)
+        ce = read(vault5, paths5["claude-env"])
+        check("17 legacy-ledger-migrated", "移行: 2 件" in r.stdout and "UUID でない行 1 件" in r.stdout
+              and "台帳修復" not in r.stdout and ledger_count(state5) == 3
+              and not os.path.exists(legacy) and os.path.exists(legacy + ".migrated"), r.stdout)
+        check("17b migrated-not-reappended", ce.count("移行前0") == 1 and "移行後" in ce)
+        r = run(env5)
+        check("17c migration-once", "移行" not in r.stdout and "no new events" in r.stdout, r.stdout)
+    finally:
+        shutil.rmtree(tmp5, ignore_errors=True)
+
     print("\n%d passed, %d failed" % (PASS, FAIL))
     sys.exit(1 if FAIL else 0)
 
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""test_search_history.py — scripts/search_history.py の keyset ページング テスト
+
+検証: next_cursor を辿った全ページ = limit を大きくした1回の結果 (順序も同じ・重複/欠落なし)
+bm25 順 (同じ本文 = 同 rank が並ぶ) / --recent (同じ ts が並ぶ・ts に ":" を含む) の両方、
+絞込み (role / tool) 併用でも同じ。最終ページの next_cursor は None。
+ページ途中で行が追記されても、既に返した行を再度返さない。
+
+DB は ingest-jsonl-to-sqlite.py で一時ディレクトリに作る (HOME 差し替え・本物の index.db を触らない)。
+実行: python3 ~/.claude/hooks/tests/test_search_history.py
+"""
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "scripts")
+sys.path.insert(0, SCRIPTS)
+from search_history import search  # noqa: E402
+
+PASS = 0
+FAIL = 0
+
+
+def check(name, cond, detail=""):
+    global PASS, FAIL
+    if cond:
+        PASS += 1
+        print("  PASS %s" % name)
+    else:
+        FAIL += 1
+        print("  FAIL %s  %s" % (name, detail))
+
+
+def record(i):
+    # 5行ずつ同じ ts・本文は3種類 (同 rank が多数並ぶ)
+    ts = "2026-10-%02dT12:34:56Z" % (1 + i // 5)
+    text = ["hook を直した", "hook と hook の話", "別の hook 話題 %d" % (i % 7)][i % 3]
+    if i % 4 == 0:
+        return {"type": "assistant", "timestamp": ts, "sessionId": "s",
+                "message": {"role": "assistant", "content": [
+                    {"type": "text", "text": text},
+                    {"type": "tool_use", "name": "Bash", "input": {"command": "echo"}}]}}
+    return {"type": "user", "timestamp": ts, "sessionId": "s", "message": {"role": "user", "content": text}}
+
+
+def ingest(home, db_path, records):
+    proj = os.path.join(home, ".claude", "projects", "proj")
+    os.makedirs(proj, exist_ok=True)
+    with open(os.path.join(proj, "s.jsonl"), "a") as f:
+        f.write("".join(json.dumps(r) + "\n" for r in records))
+    subprocess.run([sys.executable, os.path.join(SCRIPTS, "ingest-jsonl-to-sqlite.py"), "--db", db_path],
+                   env=dict(os.environ, HOME=home), capture_output=True, check=True)
+
+
+def walk(db, limit, **kw):
+    ids, pages, after = [], 0, None
+    while True:
+        page = search(db, "hook", limit=limit, after=after, **kw)
+        ids += [r["id"] for r in page["results"]]
+        pages += 1
+        after = page["next_cursor"]
+        if after is None or pages > 1000:
+            return ids, pages
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="test-search-history-")
+    try:
+        db_path = os.path.join(tmp, "index.db")
+        ingest(tmp, db_path, [record(i) for i in range(53)])
+        db = sqlite3.connect(db_path)
+
+        for label, kw in [("bm25", {}), ("recent", {"recent": True}),
+                          ("bm25 + role", {"role": "user"}), ("recent + tool", {"recent": True, "tool": "Bash"})]:
+            print("[%s]" % label)
+            want = [r["id"] for r in search(db, "hook", limit=1000, **kw)["results"]]
+            check("対象が複数ページ分ある", len(want) > 7, len(want))
+            for limit in (1, 7, len(want)):
+                got, pages = walk(db, limit, **kw)
+                check("limit=%d: 全ページ = 1回の結果 (%d ページ)" % (limit, pages), got == want,
+                      (len(got), len(want)))
+            last = search(db, "hook", limit=len(want), **kw)
+            check("最終ページの next_cursor は None", last["next_cursor"] is None, last["next_cursor"])
+
+        print("[ページ途中の追記]")
+        first = search(db, "hook", limit=10, recent=True)
+        ingest(tmp, db_path, [record(i) for i in range(53, 60)])
+        seen = [r["id"] for r in first["results"]]
+        after, more = first["next_cursor"], []
+        while after:
+            page = search(db, "hook", limit=10, recent=True, after=after)
+            more += [r["id"] for r in page["results"]]
+            after = page["next_cursor"]
+        check("既に返した行を再度返さない", not set(seen) & set(more) and len(more) == len(set(more)),
+              set(seen) & set(more))
+        db.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n%d passed, %d failed" % (PASS, FAIL))
+    sys.exit(1 if FAIL else 0)
+
+
+if __name__ == "__main__":
+    main()
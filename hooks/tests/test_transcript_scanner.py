@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""test_transcript_scanner.py — transcript-scanner.py の続き読み (per-transcript cursor) テスト
+
+検証: ①初回は全量を読み cursor (offset / 直前 bytes / 直前 WINDOW_SIZE-1 件) を保存
+②追記なし → 0 件・何も書かない ③追記ぶんだけ読み、前回末尾を跨ぐ窓 (前回の1語 + 今回の1語) も拾う
+④書きかけの最終行は次回へ ⑤transcript の書換え・差し替え → cursor 破棄して先頭から
+⑥QueueIndex: 他の書き手の追記ぶんだけ取り込んで採番 / queue 書換えで数え直し / fingerprint は LRU で上限まで
+/ 旧 fingerprint txt は1回だけ取り込み原本は残す
+
+HOME を一時ディレクトリに差し替えて実行 (本物の ~/.claude/state を汚さない)。
+実行: python3 ~/.claude/hooks/tests/test_transcript_scanner.py
+"""
+import glob
+import importlib.util
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+SCANNER = os.path.join(SCRIPTS, "transcript-scanner.py")
+sys.path.insert(0, SCRIPTS)
+
+import buzz_patterns as bp  # noqa: E402
+
+# 堅牢化 (min_keywords=2) のキーワードを1語ずつ別メッセージに置く → 2件が同じ窓に入ったときだけ候補
+MSG_A = ("セキュリティの設定を全部見直して、読み込みの処理を実装し直したら、"
+         "毎回の確認が減った気がして本当に安心できるようになりました。これからも続けていきたいと思っています。")
+MSG_B = ("パスワードの保存場所も確認しておきました。環境変数から読む形にそろえてあるので、"
+         "次回以降も同じ手順で確認できます。問題がないことも確かめました。")
+FILLER = "了解です。そのまま進めます。" * 6
+PASS = 0
+FAIL = 0
+
+
+def check(name, cond, detail=""):
+    global PASS, FAIL
+    if cond:
+        PASS += 1
+        print("  PASS %s" % name)
+    else:
+        FAIL += 1
+        print("  FAIL %s  %s" % (name, detail))
+
+
+def line(role, text):
+    return json.dumps({"type": role, "message": {"content": [{"type": "text", "text": text}]}},
+                      ensure_ascii=False) + "\n"
+
+
+def scan(env, path):
+    out = subprocess.run([sys.executable, SCANNER, path, "/p/proj"], capture_output=True, text=True, env=env).stdout
+    m = re.search(r"Parsed (\d+) qualifying messages \(\+(\d+) carried over", out)
+    return (int(m.group(1)), int(m.group(2))) if m else out
+
+
+def queue(state):
+    try:
+        with open(os.path.join(state, "improvement-queue.jsonl"), encoding="utf-8") as f:
+            return [json.loads(x) for x in f]
+    except FileNotFoundError:
+        return []
+
+
+def cursor(state):
+    files = glob.glob(os.path.join(state, "transcript-scanner-cursors", "*.json"))
+    if len(files) != 1:
+        return None
+    with open(files[0], encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_scanner():
+    spec = importlib.util.spec_from_file_location("transcript_scanner", SCANNER)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def index_run(ts, tmp, queue_path, fps=()):
+    """scanner の Phase 4-5 と同じ手順で fps を登録し、(sync 後の next_id, seen の結果) を返す。"""
+    index = ts.QueueIndex(os.path.join(tmp, "idx.db"), ts.Path(tmp) / "legacy-fps.txt")
+    with open(queue_path, "a+b") as qf:
+        index.begin()
+        index.sync(qf)
+        next_id = index.next_id
+        seen = [index.seen(fp) or index.add(fp) for fp in fps]
+        index.commit()
+    index.close()
+    return next_id, seen
+
+
+def test_index(tmp):
+    ts = load_scanner()
+    qpath = os.path.join(tmp, "queue.jsonl")
+    with open(os.path.join(tmp, "legacy-fps.txt"), "w") as f:
+        f.write("00000000000000aa\nnot-a-fingerprint\n00000000000000bb\n")
+    with open(qpath, "w") as f:
+        f.write('{"id": "mat_007", "source": "project_improvement"}\n{"id": "bogus"}\nbroken\n')
+    next_id, seen = index_run(ts, tmp, qpath, ["00000000000000aa", "00000000000000cc"])
+    check("初回: queue 全量から next_id・旧 txt の fingerprint を取り込む",
+          next_id == 8 and seen == [True, None], (next_id, seen))
+    check("旧 txt は残す", os.path.exists(os.path.join(tmp, "legacy-fps.txt")))
+
+    auto = {"id": "mat_030", "source": "session_auto_capture", "buzz_pattern": "堅牢化", "content": "本文" * 80}
+    with open(qpath, "a", encoding="utf-8") as f:
+        f.write(json.dumps(auto, ensure_ascii=False) + "\n")
+    fp = ts.get_fingerprint("堅牢化", auto["content"])
+    next_id, seen = index_run(ts, tmp, qpath, [fp])
+    check("追記ぶんだけ取り込み: ID と auto-capture の fingerprint が追いつく",
+          next_id == 31 and seen == [True], (next_id, seen))
+
+    with open(qpath, "w") as f:
+        f.write('{"id": "mat_003"}\n')
+    check("queue 書換え (縮小) → next_id を数え直す", index_run(ts, tmp, qpath)[0] == 4)
+
+    ts.QueueIndex.FP_CAPACITY = 3
+    fps = ["%016x" % i for i in range(1, 5)]
+    index_run(ts, tmp, qpath, fps[:3])
+    index_run(ts, tmp, qpath, fps[:1])  # 1 を参照 → 最新に
+    index_run(ts, tmp, qpath, fps[3:])  # 4 を追加 → 最古の 2 が落ちる
+    db = ts.sqlite3.connect(os.path.join(tmp, "idx.db"))
+    kept = sorted(bytes(r[0]).hex() for r in db.execute("SELECT fp FROM fingerprints"))
+    db.close()
+    check("fingerprint は LRU で FP_CAPACITY 件まで", kept == [fps[0], fps[2], fps[3]], kept)
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="test-transcript-scanner-")
+    env = dict(os.environ, HOME=tmp)
+    state = os.path.join(tmp, ".claude", "state")
+    path = os.path.join(tmp, "session.jsonl")
+    try:
+        print("[0] 前提")
+        check("A / B は堅牢化のキーワードを1語ずつ・他カテゴリは 2語未満",
+              not bp.match_patterns(MSG_A) and not bp.match_patterns(MSG_B)
+              and [m.pattern_name for m in bp.match_patterns(MSG_A + "\n" + MSG_B)] == ["堅牢化"])
+
+        print("[1] 初回")
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(line("assistant", FILLER) for _ in range(5))
+            f.write(line("user", MSG_A))
+        check("全量を読む (prefilter 通過は A の1件)", scan(env, path) == (1, 0))
+        cur = cursor(state)
+        check("cursor = ファイル末尾・context は直前 WINDOW_SIZE-1 件以内",
+              cur and cur["offset"] == os.path.getsize(path) and cur["line"] == 6
+              and [m["text"] for m in cur["context"]][-1] == MSG_A and len(cur["context"]) <= 4, cur)
+        check("単独では候補なし", queue(state) == [])
+
+        print("[2] 追記なし")
+        check("0 件・context だけ持ち越し", scan(env, path) == (0, 1))
+        check("queue 変化なし", queue(state) == [])
+
+        print("[3] 書きかけ行 → 次回")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line("assistant", MSG_B).rstrip("\n"))
+        check("改行なしの最終行は読まない", scan(env, path) == (0, 1))
+        check("cursor は進まない", cursor(state)["offset"] == os.path.getsize(path) - len(line("assistant", MSG_B).encode()) + 1)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n")
+
+        print("[4] 追記ぶんだけ・境界を跨ぐ窓")
+        check("新着 1件 + 持ち越し 1件", scan(env, path) == (1, 1))
+        q = queue(state)
+        check("前回の A と今回の B の窓で 堅牢化 を拾う",
+              len(q) == 1 and q[0]["buzz_pattern"] == "堅牢化" and set(q[0]["tags"]) == {"セキュリティ", "パスワード"}, q)
+        check("再実行は 0 件", scan(env, path) == (0, 2) and len(queue(state)) == 1)
+
+        print("[5] 書換え・差し替え")
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data.replace("確かめました".encode(), "確認しました".encode()))  # 末尾付近だけ変わる (サイズ同じ)
+        check("直前 bytes 不一致 → 先頭から", scan(env, path) == (2, 0))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(line("user", MSG_A))
+        check("縮んだ (offset > size) → 先頭から", scan(env, path) == (1, 0))
+        with open(glob.glob(os.path.join(state, "transcript-scanner-cursors", "*.json"))[0], "w") as f:
+            f.write("{broken")
+        check("壊れた cursor → 先頭から", scan(env, path) == (1, 0) and cursor(state)["offset"] == os.path.getsize(path))
+
+        print("[6] QueueIndex (次 ID + fingerprint の sidecar)")
+        check("scanner の索引が queue に追いついている",
+              os.path.exists(os.path.join(state, "auto-capture-index.db")) and len(queue(state)) == 1)
+        idx_dir = os.path.join(tmp, "idx")
+        os.mkdir(idx_dir)
+        test_index(idx_dir)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n%d passed, %d failed" % (PASS, FAIL))
+    sys.exit(1 if FAIL else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""test_vault_index.py — scripts/vault_index.py (vault メタデータ索引) と利用側のテスト
+
+検証: ①抽出規則が従来の各スクリプトと同じ (fence / 引用 / inline code / HTML コメント / テンプレ行)
+②2回目は stat 一致で読まない・変更 / 追加 / 削除だけ反映 ③UTF-8 でない・読めないファイルは error 行で次回も読み直す
+④並列読込でも索引は逐次と同一 ⑤抽出規則の版が変わったら全部読み直す
+⑥update() が書込みの途中で割り込まれても files だけ新しい行は残らない (次の refresh で読み直す)・
+refresh() と update() を別プロセスで同時に回しても落ちず edges が正しい ⑦asa-board-gen / vault_dead_link_check / report_action_presence_gate を
+一時 vault で実行して従来どおりの結果 (2回目は前回書いたボードだけ再解析・resolve_note は近い順)
+
+HOME を一時ディレクトリに差し替えて実行 (本物の ~/.claude/state と vault を触らない)。
+実行: python3 ~/.claude/hooks/tests/test_vault_index.py
+"""
+import importlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "scripts")
+sys.path.insert(0, SCRIPTS)
+
+import vault_index as vi  # noqa: E402
+
+PASS = 0
+FAIL = 0
+
+NOTE = """---
+title: "メモ"
+tags:
+  - a
+  - b
+---
+# 見出し1
+本文 [[ノートA]] と ![[画像.png]] と `[[コード内]]` ^blk-1
+> 引用の ✅待ち は数えない [[引用内リンク]]
+✅待ち 本文の行
+```
+[[fence内]] ✅待ち
+## fence 内の見出し
+```
+[[ノートB#節|別名]] file:///Users/x/repo/README.md#top
+"""
+INBOX = """# 📥 prompts
+
+## 🔵 やってほしいこと
+
+やってほしいことを 🔵 に貼り、INBOX見て と頼む
+<!-- 例: 投函の書き方
+- これは例示
+-->
+- 実案件その1
+> 引用は除く
+
+## 📒 記録
+
+- 記録は数えない
+"""
+LEDGER = "# 台帳\n\n## 🔴 要裁定\n\n| 項目 | 裁定 |\n|---|---|\n\n## 🟡 保留\n\n## 🟢 済\n"
+
+
+def check(name, cond, detail=""):
+    global PASS, FAIL
+    if cond:
+        PASS += 1
+        print("  PASS %s" % name)
+    else:
+        FAIL += 1
+        print("  FAIL %s  %s" % (name, detail))
+
+
+def write(root, rel, text, mode="w"):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, mode) as f:
+        f.write(text)
+    return path
+
+
+def bump(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+
+def run(script, env, *args):
+    return subprocess.run([sys.executable, os.path.join(SCRIPTS, script), *args],
+                          capture_output=True, text=True, env=env)
+
+
+def board_lines(vault, marker):
+    with open(os.path.join(vault, "03_ClaudeEnv", "asa-board.md"), encoding="utf-8") as f:
+        return [l for l in f.read().splitlines() if marker in l]
+
+
+def test_parse():
+    print("[1] 抽出規則")
+    _, cols = vi.parse_file("n.md", NOTE.encode())
+    check("frontmatter (スカラー・リスト)", cols["frontmatter"] == {"title": "メモ", "tags": ["a", "b"]},
+          cols["frontmatter"])
+    check("見出し・block-id は fence 内も拾う (従来の link_targets)",
+          cols["headings"] == ["見出し1", "fence 内の見出し"] and cols["blocks"] == ["blk-1"],
+          (cols["headings"], cols["blocks"]))
+    check("links: 出現順・fence / inline code 内は in_code=1・引用行は残す・#anchor と file:// の #フラグメントを分ける",
+          cols["links"] == [["wikilink", "ノートA", "ノートA", None, 0], ["embed", "画像.png", "画像.png", None, 0],
+                            ["wikilink", "コード内", "コード内", None, 1], ["wikilink", "引用内リンク", "引用内リンク", None, 0],
+                            ["wikilink", "fence内", "fence内", None, 1], ["wikilink", "ノートB", "ノートB", "節", 0],
+                            ["file", "/Users/x/repo/README.md", "README", "top", 0]], cols["links"])
+    _, tbl = vi.parse_file("n.md", "| [[dir/ノート.md\\|別名]] | file:///Users/x/a%20b/ file:///Users/x/c`\n".encode())
+    check("links: 表セル内 \\| の \\ を除去・フォルダ付きは stem に basename・file:// は unquote して末尾 / ` を落とす",
+          tbl["links"] == [["wikilink", "dir/ノート.md", "ノート", None, 0], ["file", "/Users/x/a b", "a b", None, 0],
+                           ["file", "/Users/x/c", "c", None, 0]], tbl["links"])
+    check("✅待ち: fence・引用行を除く", cols["check_wait"] == ["✅待ち 本文の行"], cols["check_wait"])
+    check("blue は *_INBOX.md だけ", cols["blue"] == [] and vi.parse_file("x/A_INBOX.md", NOTE.encode())[1]["blue"] == [])
+    _, cols = vi.parse_file("p/A_INBOX.md", INBOX.encode())
+    check("INBOX 🔵: テンプレ行・HTML コメント・引用・他の節を除く", cols["blue"] == ["- 実案件その1"], cols["blue"])
+    _, crlf = vi.parse_file("n.md", NOTE.replace("\n", "\r\n").encode())
+    check("CRLF は LF と同じ結果", crlf == vi.parse_file("n.md", NOTE.encode())[1])
+
+
+def test_incremental(tmp):
+    print("[2] 差分更新")
+    vault = os.path.join(tmp, "v")
+    db = os.path.join(tmp, "idx.db")
+    write(vault, "a.md", NOTE)
+    b = write(vault, "sub/b.md", "# B\n✅待ち b\n")
+    write(vault, "sub/.git/x.md", "# 降りない\n")
+    write(vault, "c.txt", "md 以外\n")
+    os.symlink(os.path.join(vault, "sub"), os.path.join(vault, "link"))
+    idx = vi.VaultIndex(vault, db)
+    check("初回は全部読む (.git・md 以外・symlink dir には降りない)",
+          idx.refresh() == {"walked": 2, "parsed": 2, "removed": 0}, idx.stats)
+    idx.close()
+
+    idx = vi.VaultIndex(vault, db)
+    check("2回目: stat 一致 → 0 件", idx.refresh() == {"walked": 2, "parsed": 0, "removed": 0}, idx.stats)
+    write(vault, "sub/b.md", "# B\n✅待ち b2\n")
+    bump(b)
+    write(vault, "d.md", "# D\n")
+    os.remove(os.path.join(vault, "a.md"))
+    check("変更1・追加1・削除1 だけ反映", idx.refresh() == {"walked": 2, "parsed": 2, "removed": 1}, idx.stats)
+    check("変更後の抽出結果", next(idx.rows("check_wait", where="path = ?", params=("sub/b.md",)))["check_wait"]
+          == ["✅待ち b2"])
+    check("消えたファイルの edges も消える", list(idx.edges("src = 'a.md'")) == [])
+    check("by_stem / stems", idx.by_stem("b") == ["sub/b.md"] and idx.stems() == {"b", "d"})
+
+    print("[3] 読めないファイル")
+    write(vault, "bad.md", b"# \xff\xfe\n[[X]]\n", "wb")
+    idx.refresh()
+    row = idx.entry("bad.md")
+    check("UTF-8 でない → error を立てつつ errors=ignore で抽出",
+          row["error"] == "UnicodeDecodeError" and [e["target"] for e in idx.edges("src = 'bad.md'")] == ["X"], row)
+    os.symlink(os.path.join(vault, "nowhere.md"), os.path.join(vault, "dangling.md"))
+    idx.refresh()
+    row = next(idx.rows(where="path = ?", params=("dangling.md",)))
+    check("壊れた symlink → error 行・次回も読み直す",
+          row["error"] == "FileNotFoundError" and row["symlink"] == 1 and idx.refresh()["parsed"] == 1, row)
+    check("entry: 消えたファイルは None・行も消す",
+          idx.entry("nowhere.md") is None and idx.entry("d.md")["headings"] == ["D"])
+    idx.close()
+
+    print("[4] 並列読込")
+    for i in range(40):
+        write(vault, "many/m%02d.md" % i, "# m%02d\n✅待ち %d\n[[b]] ^id-%d\n" % (i, i, i))
+    dumps = []
+    for workers in (1, 8):
+        vi.READ_WORKERS, saved = workers, vi.READ_WORKERS
+        try:
+            par = vi.VaultIndex(vault, os.path.join(tmp, "w%d.db" % workers))
+            par.refresh()
+            dumps.append(list(par.rows("*")))
+            par.close()
+        finally:
+            vi.READ_WORKERS = saved
+    check("逐次と並列で索引の中身が同一 (path 順)", dumps[0] == dumps[1] and len(dumps[0]) == 44, len(dumps[0]))
+
+    print("[5] 抽出規則の版")
+    vi.PARSER_VERSION, saved = "test", vi.PARSER_VERSION
+    try:
+        idx = vi.VaultIndex(vault, db)
+        check("版が変わったら全部読み直す", idx.refresh()["parsed"] == idx.stats["walked"], idx.stats)
+        idx.close()
+    finally:
+        vi.PARSER_VERSION = saved
+
+    print("[6] 書込みの中断・同時実行")
+
+    class Interrupting:
+        """edges の INSERT で KeyboardInterrupt を起こす接続 (それ以外は本物へ)。"""
+
+        def __init__(self, db):
+            self.db = db
+
+        def __getattr__(self, name):
+            return getattr(self.db, name)
+
+        def executemany(self, sql, rows):
+            if sql.startswith("INSERT INTO edges"):
+                raise KeyboardInterrupt
+            return self.db.executemany(sql, rows)
+
+    idx = vi.VaultIndex(vault, db)
+    idx.refresh()
+    bump(write(vault, "sub/b.md", "# B\n[[d]] [[many/m00]]\n"))
+    real, idx.db = idx.db, Interrupting(idx.db)
+    try:
+        idx.update(["sub/b.md"])
+        interrupted = False
+    except KeyboardInterrupt:
+        interrupted = True
+    finally:
+        idx.db = real
+    check("update の途中で割り込み → ROLLBACK", interrupted and not real.in_transaction)
+    idx.refresh()
+    check("次の refresh で読み直し、edges が揃う", "sub/b.md" in idx.changed
+          and [e["target"] for e in idx.edges("src = 'sub/b.md'")] == ["d", "many/m00"], idx.changed)
+    idx.close()
+
+    code = (
+        "import os, sys\n"
+        "sys.path.insert(0, %r)\n"
+        "import vault_index as vi\n"
+        "idx = vi.VaultIndex(%r, %r)\n"
+        "rels = ['many/m%%02d.md' %% i for i in range(40)]\n"
+        "for n in range(15):\n"
+        "    for rel in rels:\n"
+        "        p = os.path.join(%r, rel)\n"
+        "        st = os.stat(p)\n"
+        "        os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))\n"
+        "    idx.refresh() if sys.argv[1] == 'refresh' else idx.update(rels)\n"
+        "idx.close()\n" % (SCRIPTS, vault, db, vault))
+    procs = [subprocess.Popen([sys.executable, "-c", code, mode], stderr=subprocess.PIPE)
+             for mode in ("refresh", "update", "update")]
+    errs = [p.communicate()[1].decode() for p in procs]
+    check("refresh と update を同時に回しても落ちない", all(p.returncode == 0 for p in procs),
+          [e.strip().splitlines()[-1:] for e in errs])
+    idx = vi.VaultIndex(vault, db)
+    idx.refresh()
+    bad = [rel for rel in ("many/m%02d.md" % i for i in range(40))
+           if [e["target"] for e in idx.edges("src = ?", (rel,))] != ["b"]]
+    check("edges は各ファイル1本ずつ", not bad, bad[:3])
+    idx.close()
+
+
+def test_scripts(tmp):
+    print("[7] 利用側 (一時 vault で実行)")
+    vault = os.path.join(tmp, "Documents", "Obsidian Vault")
+    env = dict(os.environ, HOME=tmp, OBSIDIAN_VAULT=vault)
+    env.pop("VAULT_INDEX_DIR", None)
+    write(vault, "03_ClaudeEnv/asa-items.md", LEDGER)
+    write(vault, "03_ClaudeEnv/prompts/ClaudeEnv_INBOX.md", INBOX)
+    write(vault, "02_Ai/AI_adscrm/note.md", NOTE.replace("ノートB#節", "target#^blk-1"))
+    write(vault, "02_Ai/AI_adscrm/prompts/p.md", "[[無視される]]\n")
+    write(vault, "02_Ai/x-buzz/sub/target.md", "# T\n本文 ^blk-1\n")
+    write(vault, "02_Ai/x-buzz/sub/ノートA.md", "✅待ち A\n")
+    write(vault, "templates/t.md", "✅待ち テンプレ\n")
+    write(vault, ".trash/画像.png.md", "")
+
+    out = run("asa-board-gen.py", env)
+    check("asa-board-gen: 成功", out.returncode == 0, out.stderr)
+    check("🔵 / ✅待ち は従来どおり (引用・fence・templates 除外)",
+          board_lines(vault, "実案件その1") and board_lines(vault, "✅待ち A") and board_lines(vault, "✅待ち 本文の行")
+          and not board_lines(vault, "テンプレ") and not board_lines(vault, "数えない"), board_lines(vault, "✅待ち"))
+    check("🩺 に索引の再解析件数", board_lines(vault, "vault 索引") ==
+          ["- vault 索引: 8 件中 8 件を再解析（削除 0 件・他は stat 一致で前回の抽出結果を再利用）"],
+          board_lines(vault, "vault 索引"))
+    check("🩺 にスキャン所要と files/s", len(board_lines(vault, "スキャン所要")) == 1
+          and "files/s" in board_lines(vault, "スキャン所要")[0], board_lines(vault, "スキャン所要"))
+    run("asa-board-gen.py", env)
+    check("2回目は前回書いた asa-board.md だけ再解析", board_lines(vault, "vault 索引")[0].startswith("- vault 索引: 9 件中 1 件"),
+          board_lines(vault, "vault 索引"))
+
+    out = run("vault_dead_link_check.py", env).stdout.splitlines()
+    # file:///Users/x/... は HOME (一時ディレクトリ) 外なので検査対象外
+    check("dead link: 実体なしだけ (.trash の同名・prompts 配下・添付拡張子は除外)",
+          out == ["dead-wikilink: 02_Ai/AI_adscrm/note.md → [[引用内リンク]] の実体なし"
+                  " (aliases はリンクを解決しない・rules/41 §④ 張替え必須)"], out)
+
+    gate = importlib.import_module("report_action_presence_gate")
+    gate.VAULT = vault
+    gate._index = vi.VaultIndex(vault, os.path.join(tmp, "gate.db"))
+    note_dir = os.path.join(vault, "03_ClaudeEnv")
+    found = gate.resolve_note("target", note_dir)
+    check("resolve_note: 近傍に無ければ索引の stem で vault 全域 (.trash は除く)",
+          found == os.path.join(vault, "02_Ai/x-buzz/sub/target.md") and gate.resolve_note("画像.png", note_dir) is None,
+          found)
+    check("link_targets: vault 内は索引の見出し・block-id", gate.link_targets(found) == ({"T"}, {"blk-1"}))
+
+    ads = os.path.join(vault, "02_Ai/AI_adscrm")
+    write(vault, "02_Ai/AI_adscrm/sub/near.md", "")
+    write(vault, "02_Ai/AI_adscrm/prompts/deep/near.md", "")
+    write(vault, "00_General/near.md", "")
+    gate._note_map = None
+    gate._index.refreshed = False
+    check("resolve_note: 近い順 (同dir とその1段下 > 親とその1段下 > vault 全域の path 順)",
+          gate.resolve_note("near", os.path.join(ads, "prompts")) == os.path.join(ads, "prompts/deep/near.md")
+          and gate.resolve_note("near", os.path.join(ads, "other")) == os.path.join(ads, "sub/near.md")
+          and gate.resolve_note("near", note_dir) == os.path.join(vault, "00_General/near.md"))
+    check("resolve_note: フォルダ付きの名前も末尾一致で解決",
+          gate.resolve_note("sub/near", note_dir) == os.path.join(ads, "sub/near.md")
+          and gate.resolve_note("x-buzz/sub/target", note_dir) == found)
+
+    # Obsidian のリンク解決 (と macOS APFS の isfile) は大文字小文字を区別しない・同じ近さなら完全一致が先
+    write(vault, "01_Other/Near.md", "")
+    write(vault, "02_Ai/AI_adscrm/sub/NEAR.md", "")
+    gate._note_map = None
+    gate._index.refreshed = False
+    check("resolve_note: 大文字小文字を区別しない (同じ近さなら表記の完全一致が先)",
+          gate.resolve_note("TARGET", note_dir) == found
+          and gate.resolve_note("X-Buzz/Sub/Target", note_dir) == found
+          and gate.resolve_note("Near", note_dir) == os.path.join(vault, "01_Other/Near.md")
+          and gate.resolve_note("nEaR", note_dir) == os.path.join(vault, "00_General/near.md")
+          and gate.resolve_note("NEAR", os.path.join(ads, "other")) == os.path.join(ads, "sub/NEAR.md")
+          and gate.resolve_note("near", os.path.join(ads, "other")) == os.path.join(ads, "sub/near.md")
+          and gate.resolve_note("Near", os.path.join(ads, "prompts")) == os.path.join(ads, "prompts/deep/near.md"))
+    gate._index.close()
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="test-vault-index-")
+    try:
+        test_parse()
+        test_incremental(tmp)
+        test_scripts(tmp)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n%d passed, %d failed" % (PASS, FAIL))
+    sys.exit(1 if FAIL else 0)
+
+
+if __name__ == "__main__":
+    main()
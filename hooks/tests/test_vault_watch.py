@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""test_vault_watch.py — scripts/vault_watch.py (vault 監視 → asa-board.md 差分再生成) テスト
+
+inotify / ポーリングの両方で: ①起動時に1回書く ②✅待ちの追記が 1秒以内にボードへ出る (読み直しは1件だけ)
+③ファイル削除・新しいディレクトリ配下の追加も拾う ④自分の書いたボードで再生成が回らない ⑤二重起動しない
+⑥ inotify の watch 上限 (ENOSPC) は起動時ならポーリング・監視中なら degraded (→ ポーリング) に落ちる
+
+HOME を一時ディレクトリに差し替えて実行 (本物の ~/.claude/state と vault を触らない)。
+実行: python3 ~/.claude/hooks/tests/test_vault_watch.py
+"""
+import ctypes
+import errno
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "scripts")
+WATCH = os.path.join(SCRIPTS, "vault_watch.py")
+LEDGER = "# 台帳\n\n## 🔴 要裁定\n\n| 項目 | 裁定 |\n|---|---|\n\n## 🟡 保留\n\n## 🟢 済\n"
+PASS = 0
+FAIL = 0
+
+
+def check(name, cond, detail=""):
+    global PASS, FAIL
+    if cond:
+        PASS += 1
+        print("  PASS %s" % name)
+    else:
+        FAIL += 1
+        print("  FAIL %s  %s" % (name, detail))
+
+
+def write(root, rel, text, mode="w"):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, mode, encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def board(vault):
+    try:
+        with open(os.path.join(vault, "03_ClaudeEnv", "asa-board.md"), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return ""
+
+
+def wait_for(cond, timeout):
+    """cond() が真になるまでの秒数 (timeout 超えは None)。"""
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < timeout:
+        if cond():
+            return time.monotonic() - t0
+        time.sleep(0.02)
+    return None
+
+
+def index_line(vault):
+    return next((l for l in board(vault).splitlines() if "vault 索引" in l), "")
+
+
+def scenario(tmp, label, args):
+    print("[%s]" % label)
+    home = os.path.join(tmp, label)
+    vault = os.path.join(home, "vault")
+    env = dict(os.environ, HOME=home, OBSIDIAN_VAULT=vault)
+    env.pop("VAULT_INDEX_DIR", None)
+    write(vault, "03_ClaudeEnv/asa-items.md", LEDGER)
+    for i in range(50):
+        write(vault, "notes/n%02d.md" % i, "# n%02d\n本文\n" % i)
+    proc = subprocess.Popen([sys.executable, WATCH, *args], env=env, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, text=True)
+    try:
+        check("起動時に1回書く", wait_for(lambda: "vault 索引: 51 件中 51 件" in board(vault), 10) is not None,
+              index_line(vault))
+        log = proc.stdout.readline()
+        check("backend: %s" % label, label in log, log)
+
+        write(vault, "notes/n07.md", "✅待ち 追記した行\n", "a")
+        dt = wait_for(lambda: "追記した行" in board(vault), 5)
+        check("✅待ちの追記が 1秒以内に出る", dt is not None and dt < 1.0, dt)
+        check("読み直しは変更1件だけ", "52 件中 1 件を再解析（削除 0 件" in index_line(vault), index_line(vault))
+
+        os.remove(os.path.join(vault, "notes/n07.md"))
+        check("削除で消える", wait_for(lambda: "追記した行" not in board(vault), 5) is not None)
+        check("削除1件", "削除 1 件" in index_line(vault), index_line(vault))
+
+        write(vault, "new/dir/x.md", "✅待ち 新ディレクトリ\n")
+        check("新しいディレクトリ配下も拾う", wait_for(lambda: "新ディレクトリ" in board(vault), 5) is not None)
+
+        before = os.stat(os.path.join(vault, "03_ClaudeEnv", "asa-board.md")).st_mtime_ns
+        time.sleep(1.5)
+        check("変更が無ければ書かない (自分の書込みで回らない)",
+              os.stat(os.path.join(vault, "03_ClaudeEnv", "asa-board.md")).st_mtime_ns == before)
+
+        out = subprocess.run([sys.executable, WATCH, *args], env=env, capture_output=True, text=True, timeout=10)
+        check("二重起動しない", "already running" in out.stdout, out.stdout + out.stderr)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    err = proc.stderr.read()
+    check("stderr に例外なし", "Traceback" not in err, err[-500:])
+
+
+class LimitedLibc:
+    """inotify_add_watch を limit 回だけ通し、以後は ENOSPC (max_user_watches 超過) で失敗させる。"""
+
+    def __init__(self, real, limit):
+        self.real = real
+        self.left = limit
+
+    def __getattr__(self, name):
+        return getattr(self.real, name)
+
+    def inotify_add_watch(self, fd, path, mask):
+        if self.left <= 0:
+            ctypes.set_errno(errno.ENOSPC)
+            return -1
+        self.left -= 1
+        return self.real.inotify_add_watch(fd, path, mask)
+
+
+def watch_limit(tmp):
+    print("[watch 上限]")
+    sys.path.insert(0, SCRIPTS)
+    import vault_watch
+    root = os.path.join(tmp, "limit")
+    for rel in ("a/x.md", "b/y.md", "c/z.md"):
+        write(root, rel, "# x\n")
+    real_cdll = vault_watch.ctypes.CDLL
+    vault_watch.ctypes.CDLL = lambda *a, **k: LimitedLibc(real_cdll(*a, **k), 2)
+    try:
+        w = vault_watch.open_watcher(root)
+        check("起動時の上限超過 → ポーリング", w.name == "poll", w.name)
+        w.close()
+    finally:
+        vault_watch.ctypes.CDLL = real_cdll
+
+    w = vault_watch.open_watcher(root)
+    try:
+        check("上限内なら inotify", w.name == "inotify" and not w.degraded, w.name)
+        w.libc = LimitedLibc(w.libc, 0)
+        write(root, "d/new.md", "# new\n")
+        rels, rescan = w.wait()
+        check("監視中の上限超過 → degraded + 全体 stat", w.degraded and rescan, (rels, rescan, w.degraded))
+    finally:
+        w.close()
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="test-vault-watch-")
+    try:
+        if sys.platform.startswith("linux"):
+            watch_limit(tmp)
+            scenario(tmp, "inotify", [])
+        scenario(tmp, "poll", ["--poll", "0.3"])
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n%d passed, %d failed" % (PASS, FAIL))
+    sys.exit(1 if FAIL else 0)
+
+
+if __name__ == "__main__":
+    main()
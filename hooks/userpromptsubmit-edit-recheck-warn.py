@@ -12,32 +12,53 @@
 設計理由 (wiki/meta/mistakes.md「自編集ファイルの記憶過信」再発防止 (b) 改修):
 - Phase 1 (a) mistakes.md 注入 + (c) CLAUDE.md ルール追記 では LLM 確率的判定で再発可能
 - Phase 2 で機械検出 → stdout warning 注入で「Read してから回答」を強制
+
+履歴は _file_history.py (SQLite・session × file の最後の Edit/Read) を引く (毎 prompt で走るため
+jsonl 全行の parse を避ける)。ストアが無い/壊れているときだけ jsonl を1パスで集計する。
+判定は「最後の Edit より後に Read があるか」(Edit→Read→再Edit は再 Read 必須)。
 """
 
 import json
 import os
+import sqlite3
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import _file_history  # noqa: E402
+from _history_jsonl import load_jsonl  # noqa: E402
+
 STATE_DIR = Path.home() / ".claude" / "state"
 EDIT_LOG = STATE_DIR / "edit-history.jsonl"
 READ_LOG = STATE_DIR / "read-history.jsonl"
 
 
-def load_jsonl(path: Path) -> list[dict]:
-    if not path.exists():
-        return []
-    entries = []
-    with path.open() as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                entries.append(json.loads(line))
-            except json.JSONDecodeError:
-                continue
-    return entries
+def edited_from_store(session_id: str):
+    """[(file, last_edit_tool, last_edit_ts, last_read_ts)]。ストア未作成なら None。"""
+    db = _file_history.connect(create=False)
+    if db is None:
+        return None
+    try:
+        if not db.execute("SELECT 1 FROM sqlite_master WHERE name = 'touches'").fetchone():
+            return None
+        return _file_history.edited_files(db, session_id)
+    finally:
+        db.close()
+
+
+def edited_from_jsonl(session_id: str):
+    """ストアが使えないときの互換経路。edited_from_store と同じ形を jsonl 1パスで作る。"""
+    last_edit = {}
+    last_read = {}
+    for e in load_jsonl(EDIT_LOG):
+        if e.get("session") == session_id and e.get("file"):
+            last_edit[e["file"]] = (e.get("tool", ""), e.get("ts", ""))
+    for r in load_jsonl(READ_LOG):
+        if r.get("session") == session_id and r.get("file"):
+            last_read[r["file"]] = max(last_read.get(r["file"], ""), r.get("ts", ""))
+    rows = [(f, tool, ts, last_read.get(f)) for f, (tool, ts) in last_edit.items()]
+    rows.sort(key=lambda row: row[2])
+    return rows
 
 
 def main() -> int:
@@ -53,32 +74,17 @@ def main() -> int:
     if not session_id or not prompt:
         return 0
 
-    all_edits = load_jsonl(EDIT_LOG)
-    all_reads = load_jsonl(READ_LOG)
-
-    # 同 session の edit/read のみ
-    edits = [e for e in all_edits if e.get("session") == session_id]
-    reads = [r for r in all_reads if r.get("session") == session_id]
-
-    if not edits:
-        return 0
+    try:
+        edited = edited_from_store(session_id)
+    except sqlite3.Error:
+        edited = None
+    if edited is None:
+        edited = edited_from_jsonl(session_id)
 
-    # 各 edit について、edit 後の read 有無 + prompt 言及を確認
     warnings = []
-    seen_files = set()
-    for e in edits:
-        f = e.get("file", "")
-        e_ts = e.get("ts", "")
-        tool = e.get("tool", "")
-        if not f or f in seen_files:
-            continue
-        seen_files.add(f)
-
-        # edit 後の read を探す (timestamp 比較は文字列 ISO 8601 なので辞書順 OK)
-        has_post_read = any(
-            r.get("file") == f and r.get("ts", "") > e_ts for r in reads
-        )
-        if has_post_read:
+    for f, tool, e_ts, r_ts in edited:
+        # 最後の edit 後に read があれば OK (timestamp 比較は文字列 ISO 8601 なので辞書順 OK)
+        if not f or (r_ts and r_ts > e_ts):
             continue
 
         # ユーザー prompt にファイルパス or basename が含まれているか
@@ -13,111 +13,136 @@
 # - 排他は hook-development-guide ⑥: 専用 .lock を flock(LOCK_EX)。日別ファイルなので rotate 不要
 # - host 識別は hostname でなく初回生成の host_uuid (state/prompt-history/host-uuid)
 
+import math
+import re
 import sys
+from collections import Counter
 
 REDACTED = "[REDACTED:%s]"
 
+# マスカーは送信のたびに同期で走る (ユーザーが待つ) ので正規表現はすべて import 時に1回だけ compile。
+# 計測: ~/.claude/tests/bench/bench_prompt_masker.py
+
+# --- 層1: 既知形式 ---
+# PEM ブロック全体 (BEGIN...END を貪欲でなく最短で)
+PEM_RE = re.compile(r"-----BEGIN [A-Z0-9 ]+-----.*?(-----END [A-Z0-9 ]+-----|\Z)", re.S)
+# JWT (3 セグメント) + 既知プレフィクスのキー (Anthropic/OpenAI/AWS/GitHub/Slack/Google)。
+# (key, 伏字種別, pattern)。置換は従来どおりこの順に逐次 (重なり時の結果を変えない)
+KNOWN_PREFIX = [(key, kind, re.compile(pat)) for key, kind, pat in (
+    ("JWT", "JWT", r"\beyJ[A-Za-z0-9_-]{8,}\.[A-Za-z0-9_-]{8,}\.[A-Za-z0-9_-]{8,}\b"),
+    ("API_KEY", "API_KEY", r"\bsk-[A-Za-z0-9_-]{16,}\b"),
+    ("AWS_KEY", "AWS_KEY", r"\b(AKIA|ASIA)[A-Z0-9]{16}\b"),
+    ("GITHUB_TOKEN", "GITHUB_TOKEN", r"\b(ghp|gho|ghu|ghs|ghr)_[A-Za-z0-9]{20,}\b"),
+    ("GITHUB_PAT", "GITHUB_TOKEN", r"\bgithub_pat_[A-Za-z0-9_]{20,}\b"),
+    ("SLACK_TOKEN", "SLACK_TOKEN", r"\bxox[baprs]-[A-Za-z0-9-]{10,}\b"),
+    ("GOOGLE_KEY", "GOOGLE_KEY", r"\bAIza[A-Za-z0-9_-]{30,}\b"),
+    ("GOOGLE_TOKEN", "GOOGLE_TOKEN", r"\bya29\.[A-Za-z0-9_-]{30,}\b"),
+)]
+# 全形式の頭の literal を1本の alternation にまとめ、1パスでどの形式が出現しうるかだけ判定する。
+# 出現しない形式の pattern は走らせない (大半のプロンプトはこの1パスで層1が終わる)。
+# \b 始まりの pattern は re の頭文字スキャンが効かず全位置で試行するので、それを避けるのが主目的
+KNOWN_PREFIX_HINT_RE = re.compile(
+    r"(?P<JWT>eyJ)|(?P<API_KEY>sk-)|(?P<AWS_KEY>AKIA|ASIA)|(?P<GITHUB_PAT>github_pat_)"
+    r"|(?P<GITHUB_TOKEN>gh[pousr]_)|(?P<SLACK_TOKEN>xox[baprs]-)|(?P<GOOGLE_KEY>AIza)|(?P<GOOGLE_TOKEN>ya29\.)")
+# URL 埋込認証 scheme://user:pass@ (lookbehind 始まりだと頭出しが効かないので "://" ごと match して戻す)
+URL_CRED_RE = re.compile(r"(://)[^\s/:@]{1,64}:[^\s/@]{1,256}(?=@)")
+# Authorization / Cookie / X-Api-Key ヘッダ行 (値部のみ伏字)
+AUTH_HEADER_RE = re.compile(r"(?im)^([ \t>]*(?:authorization|cookie|set-cookie|x-api-key)\s*[:=][ \t]*).+$")
+
+# --- 層2: 汎用 key=value / .env 形式 (値部のみ伏字・キーは残す) ---
+# 値は引用符囲み (空白含む全体) or 非空白連。長さ下限なし (短い秘密も伏字・Codex NO-GO 対応)
+# 先頭 (?=[…]) はキー名の頭文字集合: \b 始まりのままだと頭文字スキャンが効かない (39KB で 4ms → 1.2ms)
+CREDENTIAL_RE = re.compile(
+    r"(?i)(?=[pstacパ認秘])((?:\b(?:password|passwd|pwd|secret|token|api[_-]?key|apikey|"
+    r"access[_-]?key|client[_-]?secret|private[_-]?key|credentials?)"
+    r"[A-Za-z0-9_-]*|パスワード|APIキー|認証トークン|秘密鍵)"
+    r"[ \t]*[:=：][ \t]*)(\"[^\"\n]+\"|'[^'\n]+'|[^\s\"',;、。]+)")
+# .env 形式行 (大文字 KEY=値)。非秘密キー (許可リスト) の bool/数値のみ残す。
+# 長さ下限なし: PIN_PASSWORD=123456 等の短い秘密も伏字 (Codex NO-GO 対応)
+ENV_LINE_RE = re.compile(r"(?m)^([A-Z][A-Z0-9_]{2,}=)(\S+)$")
+NONSECRET_KEY_RE = re.compile(
+    r"(?:PORT|DEBUG|TIMEOUT|RETRY|RETRIES|WORKERS|VERBOSE|LOG_LEVEL|LANG|LC_ALL|TZ|NODE_ENV|ENV|MODE|VERSION|LIMIT|MAX|MIN)[A-Z0-9_]*=")
+
+# --- 層3: 高エントロピー token (20字以上・英数字混在・entropy>3.7) ---
+TOKEN_RE = re.compile(r"[A-Za-z0-9+/=_-]{20,}")
+ALPHA_RE = re.compile(r"[A-Za-z]")
+DIGIT_RE = re.compile(r"[0-9]")
+HEX_RE = re.compile(r"[0-9a-fA-F]{1,40}")
+UUID_RE = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+ENTROPY_THRESHOLD = 3.7
+# 異なり文字数 k の文字列の entropy 上限は log2(k)。k <= 12 なら log2(12)=3.58 で 3.7 を超えない → 計算不要
+MIN_DISTINCT = 13
+
+# --- マーカー無害化 ---
+MARKER_COMMENT_RE = re.compile(r"<!--(\s*(?:prompt-history|evt:))")
+MARKER_EVENT_RE = re.compile(r"(?m)^(\s*event_id\s*:)")
 
-def shannon_entropy(s):
-    import math
 
+def shannon_entropy(s):
     if not s:
         return 0.0
-    freq = {}
-    for c in s:
-        freq[c] = freq.get(c, 0) + 1
     n = len(s)
-    return -sum((v / n) * math.log2(v / n) for v in freq.values())
+    return -sum((v / n) * math.log2(v / n) for v in Counter(s).values())
 
 
 def mask_secrets(text):
     """3層マスキング。返り値 (masked_text, hits:list[str])。過剰伏字は許容。"""
-    import re
-
-    hits = []
+    hits = set()
 
-    def sub(pattern, kind, repl=None, flags=0):
+    def sub(rx, kind, repl=None):
         nonlocal text
-        new = re.sub(pattern, repl or REDACTED % kind, text, flags=flags)
+        new = rx.sub(repl or REDACTED % kind, text)
         if new != text:
-            hits.append(kind)
+            hits.add(kind)
             text = new
 
-    # --- 層1: 既知形式 ---
-    # PEM ブロック全体 (BEGIN...END を貪欲でなく最短で)
-    sub(r"-----BEGIN [A-Z0-9 ]+-----.*?(-----END [A-Z0-9 ]+-----|\Z)", "PEM", flags=re.S)
-    # JWT (3 セグメント)
-    sub(r"\beyJ[A-Za-z0-9_-]{8,}\.[A-Za-z0-9_-]{8,}\.[A-Za-z0-9_-]{8,}\b", "JWT")
-    # 既知プレフィクスのキー (Anthropic/OpenAI/AWS/GitHub/Slack/Google)
-    sub(r"\bsk-[A-Za-z0-9_-]{16,}\b", "API_KEY")
-    sub(r"\b(AKIA|ASIA)[A-Z0-9]{16}\b", "AWS_KEY")
-    sub(r"\b(ghp|gho|ghu|ghs|ghr)_[A-Za-z0-9]{20,}\b", "GITHUB_TOKEN")
-    sub(r"\bgithub_pat_[A-Za-z0-9_]{20,}\b", "GITHUB_TOKEN")
-    sub(r"\bxox[baprs]-[A-Za-z0-9-]{10,}\b", "SLACK_TOKEN")
-    sub(r"\bAIza[A-Za-z0-9_-]{30,}\b", "GOOGLE_KEY")
-    sub(r"\bya29\.[A-Za-z0-9_-]{30,}\b", "GOOGLE_TOKEN")
-    # URL 埋込認証 scheme://user:pass@
-    sub(r"(?<=://)[^\s/:@]{1,64}:[^\s/@]{1,256}(?=@)", "URL_CRED")
-    # Authorization / Cookie / X-Api-Key ヘッダ行 (値部のみ伏字)
-    sub(
-        r"(?im)^([ \t>]*(?:authorization|cookie|set-cookie|x-api-key)\s*[:=][ \t]*).+$",
-        "AUTH_HEADER",
-        repl=r"\1" + REDACTED % "AUTH_HEADER",
-    )
-
-    # --- 層2: 汎用 key=value / .env 形式 (値部のみ伏字・キーは残す) ---
-    # 値は引用符囲み (空白含む全体) or 非空白連。長さ下限なし (短い秘密も伏字・Codex NO-GO 対応)
-    sub(
-        r"(?i)((?:\b(?:password|passwd|pwd|secret|token|api[_-]?key|apikey|"
-        r"access[_-]?key|client[_-]?secret|private[_-]?key|credentials?)"
-        r"[A-Za-z0-9_-]*|パスワード|APIキー|認証トークン|秘密鍵)"
-        r"[ \t]*[:=：][ \t]*)(\"[^\"\n]+\"|'[^'\n]+'|[^\s\"',;、。]+)",
-        "CREDENTIAL",
-        repl=r"\1" + REDACTED % "CREDENTIAL",
-    )
-    # .env 形式行 (大文字 KEY=値)。非秘密キー (許可リスト) の bool/数値のみ残す。
-    # 長さ下限なし: PIN_PASSWORD=123456 等の短い秘密も伏字 (Codex NO-GO 対応)
-    NONSECRET_KEY = r"(?:PORT|DEBUG|TIMEOUT|RETRY|RETRIES|WORKERS|VERBOSE|LOG_LEVEL|LANG|LC_ALL|TZ|NODE_ENV|ENV|MODE|VERSION|LIMIT|MAX|MIN)[A-Z0-9_]*"
+    # --- 層1 ---
+    sub(PEM_RE, "PEM")
+    present = {m.lastgroup for m in KNOWN_PREFIX_HINT_RE.finditer(text)}
+    for key, kind, rx in KNOWN_PREFIX:
+        if key in present:
+            sub(rx, kind)
+    sub(URL_CRED_RE, "URL_CRED", repl=r"\1" + REDACTED % "URL_CRED")
+    sub(AUTH_HEADER_RE, "AUTH_HEADER", repl=r"\1" + REDACTED % "AUTH_HEADER")
+
+    # --- 層2 ---
+    sub(CREDENTIAL_RE, "CREDENTIAL", repl=r"\1" + REDACTED % "CREDENTIAL")
 
     def env_repl(m):
         key, val = m.group(1), m.group(2)
         if val.lower() in ("true", "false") or (
-            val.isdigit() and _re.fullmatch(NONSECRET_KEY + "=", key)
+            val.isdigit() and NONSECRET_KEY_RE.fullmatch(key)
         ):
             return m.group(0)
-        hits.append("ENV_VALUE")
+        hits.add("ENV_VALUE")
         return key + REDACTED % "ENV_VALUE"
 
-    import re as _re
-
-    new = _re.sub(r"(?m)^([A-Z][A-Z0-9_]{2,}=)(\S+)$", env_repl, text)
-    text = new
+    text = ENV_LINE_RE.sub(env_repl, text)
 
-    # --- 層3: 高エントロピー token (20字以上・英数字混在・entropy>3.7) ---
+    # --- 層3 ---
+    # 安い判定 (英字+数字混在 → 異なり文字数) を先に通ったものだけ例外判定と entropy 計算
     # 例外: 純 16 進 40 字以下 (git SHA) と UUID は識別子として残す (設計判断)
     def entropy_repl(m):
         tok = m.group(0)
-        if _re.fullmatch(r"[0-9a-fA-F]{1,40}", tok):
+        if not (ALPHA_RE.search(tok) and DIGIT_RE.search(tok)):
             return tok
-        if _re.fullmatch(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}", tok):
+        if len(set(tok)) < MIN_DISTINCT:
             return tok
-        if "[REDACTED" in tok:
+        if HEX_RE.fullmatch(tok) or UUID_RE.fullmatch(tok):
             return tok
-        has_alpha = any(c.isalpha() for c in tok)
-        has_digit = any(c.isdigit() for c in tok)
-        if has_alpha and has_digit and shannon_entropy(tok) > 3.7:
-            hits.append("HIGH_ENTROPY")
+        if shannon_entropy(tok) > ENTROPY_THRESHOLD:
+            hits.add("HIGH_ENTROPY")
             return REDACTED % "HIGH_ENTROPY"
         return tok
 
-    text = _re.sub(r"[A-Za-z0-9+/=_-]{20,}", entropy_repl, text)
+    text = TOKEN_RE.sub(entropy_repl, text)
 
     # --- マーカー無害化 (Phase 2 writer の行頭マーカー探索を本文が偽装できないように) ---
     # zero-width space (U+200B) を挿入。可視性は変わらない
-    text = _re.sub(r"<!--(\s*(?:prompt-history|evt:))", "<!--​\\1", text)
-    text = _re.sub(r"(?m)^(\s*event_id\s*:)", "​\\1", text)
+    text = MARKER_COMMENT_RE.sub("<!--​\\1", text)
+    text = MARKER_EVENT_RE.sub("​\\1", text)
 
-    return text, sorted(set(hits))
+    return text, sorted(hits)
 
 
 def resolve_route(cwd, home, config_path):
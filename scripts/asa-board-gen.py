@@ -15,14 +15,20 @@ vault の 03_ClaudeEnv/asa-board.md を「状態を持たない再生成ビュ
 fail-loud: 台帳 (a) が読めない場合は更新せず stderr にエラーを出して exit 1。
 (b)〜(e) の個別失敗は続行し「🩺 スキャン健全性」節に計上する。
 
+(b)(c) の行抽出は vault_index.py の索引から引く（stat が変わったファイルだけ読み直す）。
+
 2026-07-13 新設。
 """
 import os
 import re
 import sys
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from vault_index import READ_WORKERS, VaultIndex  # noqa: E402
+
 VAULT = Path(os.environ.get("OBSIDIAN_VAULT", "/Users/masaaki/Documents/Obsidian Vault"))
 LEDGER = VAULT / "03_ClaudeEnv" / "asa-items.md"
 BOARD = VAULT / "03_ClaudeEnv" / "asa-board.md"
@@ -174,29 +180,20 @@ def load_ledger():
 
 
 # ---------------------------------------------------------------------------
-# fenced code block / quote 行を除いてスキャンする共通ヘルパ
+# (b) プロジェクト INBOX の 🔵 行
 # ---------------------------------------------------------------------------
 
-def iter_content_lines(text: str):
-    """fenced code block（``` 内）と引用行（> 開始）を除いた行を yield する。"""
-    in_fence = False
-    for line in text.splitlines():
-        stripped = line.strip()
-        if stripped.startswith("```"):
-            in_fence = not in_fence
-            continue
-        if in_fence:
-            continue
-        if stripped.startswith(">"):
-            continue
-        yield line
-
+def indexed(index: VaultIndex, f: Path):
+    """索引の1行 (抽出済み)。読めなければ read_failures に積んで None。"""
+    row = index.entry(rel(f))
+    error = "FileNotFoundError" if row is None else row["error"]
+    if error:  # UTF-8 でない (UnicodeDecodeError) も従来の read_text(encoding="utf-8") どおり読込失敗扱い
+        read_failures.append(f"{rel(f)} ({error})")
+        return None
+    return row
 
-# ---------------------------------------------------------------------------
-# (b) プロジェクト INBOX の 🔵 行
-# ---------------------------------------------------------------------------
 
-def scan_inboxes():
+def scan_inboxes(index: VaultIndex):
     global scanned_file_count
     files = sorted(set(VAULT.glob("02_Ai/*/prompts/*_INBOX.md")) | set(VAULT.glob("02_Ai/*/*/prompts/*_INBOX.md")))  # 2026-07-18: 群配下（x-buzz/AI_adscrm サブ）も拾う
     claude_env_inbox = VAULT / "03_ClaudeEnv" / "prompts" / "ClaudeEnv_INBOX.md"
@@ -205,31 +202,14 @@ def scan_inboxes():
 
     results = []
     for f in files:
-        text, err = read_text_safe(f)
+        row = indexed(index, f)
         scanned_file_count += 1
-        if text is None:
+        if row is None:
             continue
-        # 実案件のみ数える: 全 INBOX 共通のテンプレ行（セクション見出し・使い方説明）は除外。
-        # 「🔵 セクション内の行」に限定し、さらに定型文パターンを弾く（2026-07-13 偽陽性修正:
-        # 旧実装は見出し+説明文で 28 件と過大計上。実案件は数件だった）。
-        TEMPLATE_PATTERNS = ("投函🔵 → 記録📒", "INBOX見て", "やってほしいことを 🔵 に貼り")
-        # HTML コメント（<!-- 例: ... --> の投函例示）は案件ではないので丸ごと除去
-        import re as _re
-        text = _re.sub(r"<!--.*?-->", "", text, flags=_re.S)
-        matched = []
-        in_blue_section = False
-        for l in iter_content_lines(text):
-            s = l.strip()
-            if s.startswith("#"):
-                in_blue_section = "🔵" in s
-                continue
-            if not in_blue_section or not s:
-                continue
-            if s.startswith(">") or s in ("---", "***"):
-                continue
-            if any(pat in s for pat in TEMPLATE_PATTERNS):
-                continue
-            matched.append(s[:60])
+        # 実案件のみ数える: 「🔵 セクション内の行」に限定し、テンプレ行・HTML コメント（投函例示）を除く
+        # （2026-07-13 偽陽性修正: 旧実装は見出し+説明文で 28 件と過大計上。実案件は数件だった）。
+        # 抽出規則は vault_index.parse_inbox_blue。
+        matched = row["blue"]
         if matched:
             results.append({"file": f, "count": len(matched), "lines": matched})
     return results
@@ -239,22 +219,25 @@ def scan_inboxes():
 # (c) vault 全体の "✅待ち" マーカー
 # ---------------------------------------------------------------------------
 
-def scan_check_wait():
+def scan_check_wait(index: VaultIndex):
+    """✅待ち行を持つファイルを path 順に返す (index は refresh 済み = vault 全体に追従済み)。"""
     global scanned_file_count
     results = []
-    for f in VAULT.rglob("*.md"):
+    for row in index.rows("check_wait"):
+        f = VAULT / row["path"]
         if f == BOARD or f == LEDGER:
             continue
-        parts = set(f.relative_to(VAULT).parts)
+        parts = set(row["path"].split("/"))
         if parts & EXCLUDE_DIR_NAMES:
             continue
-        text, err = read_text_safe(f)
         scanned_file_count += 1
-        if text is None:
+        if row["error"]:
+            read_failures.append(f"{row['path']} ({row['error']})")
             continue
-        matched = [l.strip()[:60] for l in iter_content_lines(text) if "✅待ち" in l]
+        matched = row["check_wait"]
         if matched:
             results.append({"file": f, "count": len(matched), "lines": matched})
+    results.sort(key=lambda r: r["file"])
     return results
 
 
@@ -262,11 +245,11 @@ def scan_check_wait():
 # (d) wiki 取り込みキュー
 # ---------------------------------------------------------------------------
 
-def scan_wiki_queue():
+def scan_wiki_queue(index: VaultIndex):
     global scanned_file_count
     candidate = VAULT / "wiki" / "wiki-ingest-queue.md"
     if not candidate.exists():
-        found = sorted(VAULT.glob("**/wiki-ingest-queue.md"))
+        found = sorted(VAULT / p for p in index.by_stem("wiki-ingest-queue"))
         candidate = found[0] if found else None
     if candidate is None:
         return None  # 見つからない = 個別失敗として健全性に計上
@@ -345,7 +328,8 @@ def render_table(header, rows):
     return "\n".join(out) + "\n"
 
 
-def build_board(ledger, inbox_results, check_wait_results, wiki_queue, anomalies, now):
+def build_board(ledger, inbox_results, check_wait_results, wiki_queue, anomalies, now, index_stats=None,
+                scan_seconds=None):
     red_total = len(ledger["red_pending"])
     yellow_total = len(ledger["yellow_pending"])
     anomaly_total = len(anomalies["items"])
@@ -475,6 +459,13 @@ def build_board(ledger, inbox_results, check_wait_results, wiki_queue, anomalies
     else:
         lines.append("- 読込失敗: 0 件")
     lines.append(f"- パース警告: {parse_warnings} 件")
+    if index_stats:
+        lines.append(f"- vault 索引: {index_stats['walked']} 件中 {index_stats['parsed']} 件を再解析"
+                     f"（削除 {index_stats['removed']} 件・他は stat 一致で前回の抽出結果を再利用）")
+        if scan_seconds is not None:
+            rate = index_stats["walked"] / scan_seconds if scan_seconds > 0 else 0
+            lines.append(f"- スキャン所要: {scan_seconds:.2f} 秒・{rate:,.0f} files/s"
+                         f"（索引の追従〜各スキャン・再解析は {READ_WORKERS} 並列で読込）")
     if wiki_queue is None:
         lines.append("- wiki 取り込みキュー: 見つからず（スキップ）")
     lines.append("- このボードが拾えない面: 会話内バックログ・repo 側 tasks/*.md（従来どおり手動）")
@@ -485,28 +476,49 @@ def build_board(ledger, inbox_results, check_wait_results, wiki_queue, anomalies
     return "\n".join(lines) + "\n", summary_line
 
 
-def main():
+def render(index: VaultIndex, index_stats=None, started=None):
+    """追従済みの索引からボードを書き出す。戻り値: SUMMARY 行 (台帳が読めなければ None・旧版を保持)。
+
+    vault_watch.py (常駐) からも呼ばれるので、健全性の集計は呼び出しごとに数え直す。
+    started (time.perf_counter) を渡すと、そこから各スキャン完了までを 🩺 にスキャン所要として出す。
+    """
+    global read_failures, parse_warnings, scanned_file_count
+    read_failures, parse_warnings, scanned_file_count = [], 0, 0
     now = datetime.now()
 
     ledger = load_ledger()
     if ledger is None:
-        sys.stderr.write(f"[asa-board-gen] 台帳が読めません: {LEDGER}\n")
-        sys.stderr.write("ボードは更新しません（旧版を保持）。\n")
-        return 1
+        return None
 
-    inbox_results = scan_inboxes()
-    check_wait_results = scan_check_wait()
-    wiki_queue = scan_wiki_queue()
+    inbox_results = scan_inboxes(index)
+    check_wait_results = scan_check_wait(index)
+    wiki_queue = scan_wiki_queue(index)
     anomalies = scan_anomalies()
+    scan_seconds = time.perf_counter() - started if started is not None else None
 
     board_text, summary_line = build_board(
-        ledger, inbox_results, check_wait_results, wiki_queue, anomalies, now
+        ledger, inbox_results, check_wait_results, wiki_queue, anomalies, now, index_stats, scan_seconds
     )
 
     tmp_path = BOARD.with_suffix(".md.tmp")
     tmp_path.write_text(board_text, encoding="utf-8")
     os.replace(tmp_path, BOARD)
+    return summary_line
 
+
+def main():
+    started = time.perf_counter()
+    index = VaultIndex(VAULT)
+    try:
+        index.refresh()  # vault 全体を stat し、変わったファイルだけ読み直す (READ_WORKERS 並列)
+        summary_line = render(index, index.stats, started)
+    finally:
+        index.close()
+
+    if summary_line is None:
+        sys.stderr.write(f"[asa-board-gen] 台帳が読めません: {LEDGER}\n")
+        sys.stderr.write("ボードは更新しません（旧版を保持）。\n")
+        return 1
     print(summary_line)
     return 0
 
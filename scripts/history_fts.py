@@ -0,0 +1,122 @@
+"""history_fts.py — index.db の FTS5 tokenizer 定義（ingest-jsonl-to-sqlite.py と search_history.py で共有）
+
+tokenizer:
+  unicode61 — 既定。日本語の連続文字列は1トークン扱い（文中の語でヒットしない）
+  trigram   — 3文字部分一致。2文字以下の語はヒットしない（「実装」等の2字熟語が引けない）
+  bigram    — unicode61 + messages.content_cjk 影列。CJK 連続文字を重なり2-gramに展開して索引
+              （2字語は1トークン・3字以上はフレーズ・1字は prefix で引ける）
+"""
+import re
+
+TOKENIZERS = ("unicode61", "trigram", "bigram")
+DEFAULT_TOKENIZER = "unicode61"
+
+# ひらがな / カタカナ(ー含む) / CJK 統合漢字(拡張A含む) / 互換漢字 / 半角カナ
+CJK_RUN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f]+")
+# unicode61 のトークン境界の近似（英数字・CJK の連続）
+WORD = re.compile(r"[^\W_]+")
+
+
+def run_bigrams(run):
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def cjk_bigrams(text):
+    """content → content_cjk。CJK を含む語だけを空白区切りの2-gram列に。CJK が無ければ None。
+
+    unicode61 は「hookの実装」を1トークンにするので、CJK に接した英数字片もここに出す
+    （content 列では引けない分を content_cjk 側で拾う）。
+    """
+    if not text:
+        return None
+    grams = []
+    for word in WORD.findall(text):
+        if not CJK_RUN.search(word):
+            continue
+        pos = 0
+        for m in CJK_RUN.finditer(word):
+            if m.start() > pos:
+                grams.append(word[pos:m.start()])
+            grams.extend(run_bigrams(m.group(0)))
+            pos = m.end()
+        if pos < len(word):
+            grams.append(word[pos:])
+    return " ".join(grams) if grams else None
+
+
+def fts_schema(tokenizer):
+    """messages_fts + 同期 trigger の DDL。bigram は content_cjk を第2列に持つ。"""
+    if tokenizer not in TOKENIZERS:
+        raise ValueError(f"unknown tokenizer: {tokenizer}")
+    if tokenizer == "bigram":
+        cols, new_vals, old_vals = "content, content_cjk", "new.content, new.content_cjk", "old.content, old.content_cjk"
+        tok = "unicode61"
+    else:
+        cols, new_vals, old_vals = "content", "new.content", "old.content"
+        tok = tokenizer
+    return f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts
+    USING fts5({cols}, content='messages', content_rowid='id', tokenize='{tok}');
+
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, {cols}) VALUES (new.id, {new_vals});
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, {cols}) VALUES('delete', old.id, {old_vals});
+END;
+"""
+
+
+def current_tokenizer(db):
+    """既存 messages_fts の DDL から tokenizer を判定。テーブルが無ければ None。"""
+    row = db.execute("SELECT sql FROM sqlite_master WHERE name = 'messages_fts'").fetchone()
+    if not row:
+        return None
+    sql = row[0]
+    if "content_cjk" in sql:
+        return "bigram"
+    if "trigram" in sql:
+        return "trigram"
+    return "unicode61"
+
+
+def _phrase(s):
+    return '"' + s.replace('"', '""') + '"'
+
+
+def _either(s):
+    return f"(content : {_phrase(s)} OR content_cjk : {_phrase(s)})"
+
+
+def match_expr(query, tokenizer):
+    """空白区切りの各語を tokenizer に合わせた FTS5 式に変換（AND 結合）。
+
+    bigram: 語を CJK 部分と非 CJK 部分に分け、CJK は content_cjk の2-gramフレーズ
+    (1字は prefix)、残りは content か content_cjk(CJK に接した英数字片)のフレーズに。
+    trigram: 3文字未満の語は索引で引けないので ValueError。
+    """
+    parts = []
+    for term in query.split():
+        if tokenizer == "trigram" and len(term) < 3:
+            raise ValueError(f"trigram tokenizer cannot match terms shorter than 3 chars: {term!r}"
+                             " (rebuild with --tokenizer bigram)")
+        if tokenizer != "bigram":
+            parts.append(_phrase(term))
+            continue
+        pos = 0
+        for m in CJK_RUN.finditer(term):
+            rest = term[pos:m.start()].strip()
+            if rest:
+                parts.append(_either(rest))
+            run = m.group(0)
+            if len(run) == 1:
+                parts.append("content_cjk : " + _phrase(run) + " *")
+            else:
+                parts.append("content_cjk : " + _phrase(" ".join(run_bigrams(run))))
+            pos = m.end()
+        rest = term[pos:].strip()
+        if rest:
+            parts.append(_either(rest))
+    return " AND ".join(parts)
@@ -3,27 +3,55 @@
 ingest-jsonl-to-sqlite.py — Ingest ~/.claude/projects/ + ~/.claude/archives/jsonl/ into SQLite FTS5 index.
 
 Schema:
-  messages(id, date, project, session_id, role, ts, content, tool_name, source_file)
-  messages_fts(content) — FTS5 virtual table, kept in sync via triggers
-  ingested_files(path, mtime) — dedup tracking
+  messages(id, date, project, session_id, role, ts, content, tool_name, source_file, line_no, content_cjk)
+  messages_fts(content[, content_cjk]) — FTS5 virtual table, kept in sync via triggers
+  ingested_files(path, mtime, size, byte_offset, last_line, head_hash) — 増分取込みカーソル
 
 Idempotent: re-running only processes new/modified files.
+追記のみのファイル(live transcript)は byte_offset から seek して新規行だけ INSERT する。
+ファイルが縮んだ / 先頭 HEAD_BYTES の hash が変わった時だけ全量再取込み。
+改行で終わらない末尾行は書き込み途中とみなして残す（size には取り込んだ所までを記録するので次回また読む）。
+mtime から SETTLE_SECONDS 経ったファイル（終わった transcript）では、JSON として完結していれば取り込む。
+
+--bulk: 全量再構築用の高速経路。FTS trigger と副 index を外し、WAL + synchronous=OFF で
+BATCH_SIZE 行ずつ executemany → 最後に messages_fts を 'rebuild' 1回 + index 再作成。
+途中で落ちても次回起動時に trigger 欠落を検知して FTS を rebuild する。
+
+--workers N: JSON parse / extract_content を N プロセスに分散。書込みは親の1接続だけで、
+ファイル単位に「messages 行 + ingested_files カーソル」を1トランザクションで commit する。
+
+--tokenizer unicode61|trigram|bigram: 日本語向け tokenizer 切替（定義は history_fts.py）。
+既存 DB と異なる指定なら messages_fts を DROP → 新 DDL で作成 → 'rebuild' でその場移行。
+未指定なら既存 DB の tokenizer を維持。
 
 Usage:
-  python3 ~/.claude/scripts/ingest-jsonl-to-sqlite.py [--db PATH] [--force]
+  python3 ~/.claude/scripts/ingest-jsonl-to-sqlite.py [--db PATH] [--force] [--bulk] [--workers N]
+      [--tokenizer unicode61|trigram|bigram]
 """
 import argparse
+import hashlib
 import json
 import os
 import sqlite3
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from history_fts import DEFAULT_TOKENIZER, TOKENIZERS, cjk_bigrams, current_tokenizer, fts_schema
+
 DEFAULT_DB = Path.home() / ".claude" / "archives" / "index.db"
 SOURCES = [
     Path.home() / ".claude" / "projects",
     Path.home() / ".claude" / "archives" / "jsonl",
 ]
+# 先頭同一性判定に使うバイト数（rewrite / 別ファイル差し替えの検出用）
+HEAD_BYTES = 4096
+# executemany 1回あたりの行数
+BATCH_SIZE = 5000
+# 改行なしの最終行を「書き込み途中」ではなく完結行とみなすまでの静止時間（mtime からの秒数）
+SETTLE_SECONDS = 300
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS messages (
@@ -36,30 +64,91 @@ CREATE TABLE IF NOT EXISTS messages (
     content TEXT,
     tool_name TEXT,
     source_file TEXT,
-    line_no INTEGER
+    line_no INTEGER,
+    content_cjk TEXT
 );
 CREATE INDEX IF NOT EXISTS idx_messages_date ON messages(date);
 CREATE INDEX IF NOT EXISTS idx_messages_project ON messages(project);
 CREATE INDEX IF NOT EXISTS idx_messages_tool ON messages(tool_name);
 CREATE INDEX IF NOT EXISTS idx_messages_role ON messages(role);
 
-CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts
-    USING fts5(content, content='messages', content_rowid='id', tokenize='unicode61');
-
-CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
-    INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
-END;
-CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
-    INSERT INTO messages_fts(messages_fts, rowid, content) VALUES('delete', old.id, old.content);
-END;
-
 CREATE TABLE IF NOT EXISTS ingested_files (
     path TEXT PRIMARY KEY,
     mtime REAL NOT NULL,
     line_count INTEGER,
-    ingested_at TEXT DEFAULT CURRENT_TIMESTAMP
+    ingested_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    size INTEGER,
+    byte_offset INTEGER,
+    last_line INTEGER,
+    head_hash TEXT
 );
 """
+# messages_fts + trigger は tokenizer 依存なので history_fts.fts_schema() で別途作る
+
+# 旧 DB(path, mtime, line_count のみ)に後付けする増分カーソル列
+CURSOR_COLUMNS = (
+    ("size", "INTEGER"),
+    ("byte_offset", "INTEGER"),
+    ("last_line", "INTEGER"),
+    ("head_hash", "TEXT"),
+)
+
+# --bulk 中は外す。再作成は ensure_schema（IF NOT EXISTS）で行う
+BULK_DROP = """
+DROP TRIGGER IF EXISTS messages_ai;
+DROP TRIGGER IF EXISTS messages_ad;
+DROP INDEX IF EXISTS idx_messages_date;
+DROP INDEX IF EXISTS idx_messages_project;
+DROP INDEX IF EXISTS idx_messages_tool;
+DROP INDEX IF EXISTS idx_messages_role;
+"""
+
+# content_cjk は接続に登録した cjk_bigrams()（bigram 以外では常に NULL を返す）で埋める
+INSERT_SQL = (
+    "INSERT INTO messages(date, project, session_id, role, ts, content, tool_name, source_file, line_no, content_cjk)"
+    " VALUES (?1,?2,?3,?4,?5,?6,?7,?8,?9, cjk_bigrams(?6))"
+)
+
+def ensure_schema(db, tokenizer):
+    db.executescript(SCHEMA + fts_schema(tokenizer))
+
+def register_functions(db, tokenizer):
+    fn = cjk_bigrams if tokenizer == "bigram" else (lambda text: None)
+    db.create_function("cjk_bigrams", 1, fn, deterministic=True)
+
+def migrate(db):
+    """ingested_files にカーソル列が無ければ追加。既存行は byte_offset=NULL → 次に更新された時だけ全量再取込み。"""
+    cols = {r[1] for r in db.execute("PRAGMA table_info(ingested_files)")}
+    for name, decl in CURSOR_COLUMNS:
+        if name not in cols:
+            db.execute(f"ALTER TABLE ingested_files ADD COLUMN {name} {decl}")
+    if "content_cjk" not in {r[1] for r in db.execute("PRAGMA table_info(messages)")}:
+        db.execute("ALTER TABLE messages ADD COLUMN content_cjk TEXT")
+    db.commit()
+
+def migrate_tokenizer(db, tokenizer):
+    """messages_fts を指定 tokenizer で作り直す（messages 本体はそのまま・'rebuild' で索引再生成）。"""
+    print(f"migrating messages_fts: {current_tokenizer(db)} -> {tokenizer}", file=sys.stderr)
+    db.executescript("""
+DROP TRIGGER IF EXISTS messages_ai;
+DROP TRIGGER IF EXISTS messages_ad;
+DROP TABLE IF EXISTS messages_fts;
+""")
+    if tokenizer == "bigram":
+        db.execute("UPDATE messages SET content_cjk = cjk_bigrams(content)")
+    else:
+        db.execute("UPDATE messages SET content_cjk = NULL WHERE content_cjk IS NOT NULL")
+    db.commit()
+    db.executescript(fts_schema(tokenizer))
+    db.execute("INSERT INTO messages_fts(messages_fts) VALUES('rebuild')")
+    db.commit()
+
+def fts_triggers_missing(db):
+    """messages はあるのに同期 trigger が無い = 前回 --bulk が rebuild 前に中断した。"""
+    names = {r[0] for r in db.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+        " AND name IN ('messages', 'messages_ai', 'messages_ad')")}
+    return "messages" in names and not {"messages_ai", "messages_ad"} <= names
 
 def extract_content(msg_content):
     """message.content が str or list-of-blocks。文字列に正規化。"""
@@ -85,93 +174,241 @@ def extract_content(msg_content):
         return "\n".join(parts)
     return ""
 
-def process_jsonl(db, path, project):
-    """1ファイルを読み込んで INSERT。既に ingest 済みかつ mtime 変化なしならスキップ。"""
-    mtime = path.stat().st_mtime
-    cur = db.execute("SELECT mtime FROM ingested_files WHERE path = ?", (str(path),))
+def head_hash(f, length):
+    """先頭 length バイトの sha1。length は前回 offset と HEAD_BYTES の小さい方（取込み済み範囲だけを比較）。"""
+    f.seek(0)
+    return hashlib.sha1(f.read(length)).hexdigest()
+
+def record_rows(rec, project, source_file, line_no):
+    """1 JSONL レコード → messages 行タプルのリスト。user/assistant 以外は空。"""
+    rtype = rec.get("type", "")
+    if rtype not in ("user", "assistant"):
+        return []
+
+    msg = rec.get("message", {})
+    role = msg.get("role", rtype)
+    content_raw = msg.get("content", "")
+    content = extract_content(content_raw)
+    ts = rec.get("timestamp", "")
+    date = ts[:10] if ts else ""
+    session_id = rec.get("sessionId", "") or rec.get("session_id", "")
+
+    # tool_use rows — 1 record per tool_use block
+    tool_names = []
+    if isinstance(content_raw, list):
+        for b in content_raw:
+            if isinstance(b, dict) and b.get("type") == "tool_use":
+                tool_names.append(b.get("name", ""))
+
+    if tool_names:
+        return [(date, project, session_id, role, ts, content, tn, source_file, line_no)
+                for tn in tool_names]
+    if content:
+        return [(date, project, session_id, role, ts, content, None, source_file, line_no)]
+    return []
+
+def plan_file(db, path):
+    """ingested_files のカーソルから取込み計画を決める。変化なしなら None。
+
+    返り値: {mtime, size, offset, line_no, prev_count, reset, settled}
+    reset=True は追記継続できない(縮んだ / 先頭が変わった / 旧形式カーソル)ので既存行を消して全量。
+    記録済み size は取り込み済みの byte 数なので、未取込みの末尾が残っている間は毎回ここを通る。
+    settled=True は mtime から SETTLE_SECONDS 経過（改行なしの最終行も取り込んでよい）。
+    """
+    st = path.stat()
+    mtime, size = st.st_mtime, st.st_size
+    cur = db.execute(
+        "SELECT mtime, size, byte_offset, last_line, head_hash, line_count FROM ingested_files WHERE path = ?",
+        (str(path),),
+    )
     row = cur.fetchone()
-    if row and row[0] >= mtime:
-        return 0, True  # skipped
+    # byte_offset < size は未取込みの末尾あり（旧版は size にファイル全長を記録していた分もここで拾い直す）
+    if row and row[0] >= mtime and (row[1] is None or row[1] == size) and (row[2] is None or row[2] == size):
+        return None
 
-    # 再取り込み時は既存行を削除
-    if row:
-        db.execute("DELETE FROM messages WHERE source_file = ?", (str(path),))
+    plan = {"mtime": mtime, "size": size, "offset": 0, "line_no": 0, "prev_count": 0, "reset": bool(row),
+            "settled": time.time() - mtime >= SETTLE_SECONDS}
+    if row and row[2] is not None and size >= row[2]:
+        with open(path, "rb") as f:
+            if head_hash(f, min(HEAD_BYTES, row[2])) == row[4]:
+                plan.update(offset=row[2], line_no=row[3] or 0, prev_count=row[5] or 0, reset=False)
+    return plan
 
-    inserted = 0
-    with open(path, "r", encoding="utf-8") as f:
-        for i, line in enumerate(f, 1):
-            try:
-                rec = json.loads(line)
-            except json.JSONDecodeError:
-                continue
+def iter_new_rows(f, project, source_file, cursor, settled=False):
+    """cursor["offset"] から完結行だけを読んで messages 行を yield。cursor は読んだ分だけ進める。
 
-            rtype = rec.get("type", "")
-            if rtype not in ("user", "assistant"):
+    settled=True なら改行なしの最終行も、JSON として完結していれば完結行として扱う。
+    """
+    f.seek(cursor["offset"])
+    for raw in f:
+        rec = None
+        if not raw.endswith(b"\n"):
+            # 書き込み途中の末尾行は取り込まない（次回この offset から読み直す）
+            if not settled:
+                break
+            try:
+                rec = json.loads(raw)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                break
+        cursor["offset"] += len(raw)
+        cursor["line_no"] += 1
+        if rec is None:
+            try:
+                rec = json.loads(raw)
+            except (json.JSONDecodeError, UnicodeDecodeError):
                 continue
+        yield from record_rows(rec, project, source_file, cursor["line_no"])
 
-            msg = rec.get("message", {})
-            role = msg.get("role", rtype)
-            content_raw = msg.get("content", "")
-            content = extract_content(content_raw)
-            ts = rec.get("timestamp", "")
-            date = ts[:10] if ts else ""
-            session_id = rec.get("sessionId", "") or rec.get("session_id", "")
-
-            # tool_use rows — 1 record per tool_use block
-            tool_names = []
-            if isinstance(content_raw, list):
-                for b in content_raw:
-                    if isinstance(b, dict) and b.get("type") == "tool_use":
-                        tool_names.append(b.get("name", ""))
-
-            if tool_names:
-                for tn in tool_names:
-                    db.execute(
-                        "INSERT INTO messages(date, project, session_id, role, ts, content, tool_name, source_file, line_no) VALUES (?,?,?,?,?,?,?,?,?)",
-                        (date, project, session_id, role, ts, content, tn, str(path), i),
-                    )
-                    inserted += 1
-            elif content:
-                db.execute(
-                    "INSERT INTO messages(date, project, session_id, role, ts, content, tool_name, source_file, line_no) VALUES (?,?,?,?,?,?,?,?,?)",
-                    (date, project, session_id, role, ts, content, None, str(path), i),
-                )
-                inserted += 1
-
+def record_file(db, path, plan, cursor, inserted, hh):
+    """size は取り込んだ所まで (= byte_offset)。未取込みの末尾があれば次回 plan_file が size 不一致で拾う。"""
     db.execute(
-        "INSERT OR REPLACE INTO ingested_files(path, mtime, line_count) VALUES (?, ?, ?)",
-        (str(path), mtime, inserted),
+        "INSERT OR REPLACE INTO ingested_files(path, mtime, line_count, size, byte_offset, last_line, head_hash)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (str(path), plan["mtime"], plan["prev_count"] + inserted, cursor["offset"],
+         cursor["offset"], cursor["line_no"], hh),
     )
+
+def process_jsonl(db, path, project):
+    """1ファイルを読み込んで INSERT。mtime/size 変化なしならスキップ、追記のみなら末尾だけ取込む。"""
+    plan = plan_file(db, path)
+    if plan is None:
+        return 0, True  # skipped
+    if plan["reset"]:
+        db.execute("DELETE FROM messages WHERE source_file = ?", (str(path),))
+
+    cursor = {"offset": plan["offset"], "line_no": plan["line_no"]}
+    inserted = 0
+    batch = []
+    with open(path, "rb") as f:
+        for r in iter_new_rows(f, project, str(path), cursor, plan["settled"]):
+            batch.append(r)
+            if len(batch) >= BATCH_SIZE:
+                db.executemany(INSERT_SQL, batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            db.executemany(INSERT_SQL, batch)
+            inserted += len(batch)
+        hh = head_hash(f, min(HEAD_BYTES, cursor["offset"]))
+
+    record_file(db, path, plan, cursor, inserted, hh)
     return inserted, False
 
+def parse_file(path, project, offset, line_no, settled=False):
+    """--workers の子プロセス側。DB には触らず、行タプルと進めたカーソルを返す。"""
+    cursor = {"offset": offset, "line_no": line_no}
+    with open(path, "rb") as f:
+        rows = list(iter_new_rows(f, project, str(path), cursor, settled))
+        hh = head_hash(f, min(HEAD_BYTES, cursor["offset"]))
+    return rows, cursor, hh
+
+def write_parsed(db, path, plan, rows, cursor, hh):
+    """writer 側。1ファイル分の行と ingested_files 更新を1トランザクションで commit。"""
+    try:
+        if plan["reset"]:
+            db.execute("DELETE FROM messages WHERE source_file = ?", (str(path),))
+        for i in range(0, len(rows), BATCH_SIZE):
+            db.executemany(INSERT_SQL, rows[i:i + BATCH_SIZE])
+        record_file(db, path, plan, cursor, len(rows), hh)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(rows)
+
+def iter_sources():
+    for src in SOURCES:
+        if not src.is_dir():
+            continue
+        for path in sorted(src.glob("**/*.jsonl")):
+            # プロジェクト名はパスから推定
+            rel = path.relative_to(src)
+            yield path, (str(rel.parts[0]) if rel.parts else "unknown")
+
+def run_parallel(db, files, workers):
+    """parse は ProcessPool、書込みは呼び出し元の1接続だけ。in-flight は workers*2 件で頭打ち。
+
+    返り値: (inserted, skipped, files)
+    """
+    total_ins = total_skip = total_files = 0
+    pending = {}
+    it = iter(files)
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        while True:
+            while len(pending) < workers * 2:
+                nxt = next(it, None)
+                if nxt is None:
+                    break
+                path, project = nxt
+                try:
+                    plan = plan_file(db, path)
+                except OSError as e:
+                    print(f"ERROR {path}: {e}", file=sys.stderr)
+                    continue
+                total_files += 1
+                if plan is None:
+                    total_skip += 1
+                    continue
+                fut = ex.submit(parse_file, path, project, plan["offset"], plan["line_no"], plan["settled"])
+                pending[fut] = (path, plan)
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                path, plan = pending.pop(fut)
+                try:
+                    rows, cursor, hh = fut.result()
+                    total_ins += write_parsed(db, path, plan, rows, cursor, hh)
+                except Exception as e:
+                    print(f"ERROR {path}: {e}", file=sys.stderr)
+    return total_ins, total_skip, total_files
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--db", default=str(DEFAULT_DB))
     ap.add_argument("--force", action="store_true", help="Re-ingest all files")
+    ap.add_argument("--bulk", action="store_true",
+                    help="Drop FTS triggers/indexes during load, rebuild once at the end (use with --force)")
+    ap.add_argument("--workers", type=int, default=0,
+                    help="Parse files in N processes; a single writer commits each file atomically")
+    ap.add_argument("--tokenizer", choices=TOKENIZERS,
+                    help="FTS tokenizer (default: keep the existing one, else unicode61); a change rebuilds messages_fts")
     args = ap.parse_args()
 
     db_path = Path(args.db)
     db_path.parent.mkdir(parents=True, exist_ok=True)
 
     db = sqlite3.connect(db_path)
-    db.executescript(SCHEMA)
+    existing = current_tokenizer(db)
+    tokenizer = args.tokenizer or existing or DEFAULT_TOKENIZER
+    register_functions(db, tokenizer)
+    needs_rebuild = fts_triggers_missing(db)
+    if existing and existing != tokenizer:
+        db.executescript(SCHEMA)
+        migrate(db)
+        migrate_tokenizer(db, tokenizer)
+    ensure_schema(db, tokenizer)
+    migrate(db)
+
+    if args.bulk:
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=OFF")
+        db.executescript(BULK_DROP)
 
     if args.force:
         db.execute("DELETE FROM ingested_files")
         db.execute("DELETE FROM messages")
         db.commit()
 
-    total_ins = 0
-    total_skip = 0
-    total_files = 0
+    t0 = time.perf_counter()
 
-    for src in SOURCES:
-        if not src.is_dir():
-            continue
-        for path in sorted(src.glob("**/*.jsonl")):
-            # プロジェクト名はパスから推定
-            rel = path.relative_to(src)
-            project = str(rel.parts[0]) if rel.parts else "unknown"
+    if args.workers > 1:
+        total_ins, total_skip, total_files = run_parallel(db, iter_sources(), args.workers)
+    else:
+        total_ins = 0
+        total_skip = 0
+        total_files = 0
+        for path, project in iter_sources():
             try:
                 ins, skipped = process_jsonl(db, path, project)
             except Exception as e:
@@ -186,11 +423,22 @@ def main():
                     db.commit()
 
     db.commit()
+    t_load = time.perf_counter() - t0
+
+    if args.bulk or needs_rebuild:
+        if needs_rebuild and not args.bulk:
+            print("FTS triggers were missing (interrupted --bulk?) — rebuilding messages_fts", file=sys.stderr)
+        ensure_schema(db, tokenizer)
+        db.execute("INSERT INTO messages_fts(messages_fts) VALUES('rebuild')")
     db.execute("INSERT INTO messages_fts(messages_fts) VALUES('optimize')")
     db.commit()
     db.close()
+    t_total = time.perf_counter() - t0
 
     print(f"ingested: {total_ins} messages from {total_files - total_skip} new/modified files")
+    if total_ins:
+        print(f"timing: load {t_load:.2f}s ({total_ins / max(t_load, 1e-9):,.0f} rows/s), "
+              f"total incl. index/FTS {t_total:.2f}s ({total_ins / max(t_total, 1e-9):,.0f} rows/s)")
     print(f"skipped (already up-to-date): {total_skip}")
     print(f"db: {db_path} ({db_path.stat().st_size / 1024 / 1024:.1f} MB)")
 
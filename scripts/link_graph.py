@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""link_graph.py — vault と repo root を跨ぐリンクグラフ (双方向・永続・mtime 差分更新)
+
+辺は vault_index.py の edges 表 (wikilink / embed / #anchor 付き deep link / file://)。
+vault と各 repo root をそれぞれ VaultIndex として持ち (stat が変わったファイルだけ読み直す)、照会時に束ねる:
+  dead_links(srcs)   vault ノートから: 実体のない wikilink/embed・不在の file://
+                     (anchors=True で見出し/block の無い #anchor も。anchor_key は近似なので既定は切)
+  repo_dead_links()  repo → vault の file:// 先が不在
+  backlinks(note)    note へのリンク (vault の wikilink/embed/file://・repo の file://)
+  orphans(prefix)    どこからもリンクされていない vault ノート
+repo root は wiki/meta/project-registry.md の **root** 行。vault 側は code fence / inline code 内の例示を辺に
+数えない。repo 側は従来の逆参照検査どおり本文全体の file:// を数える。
+
+使い方: python3 ~/.claude/scripts/link_graph.py backlinks <ノート名 | vault 相対パス>
+        python3 ~/.claude/scripts/link_graph.py orphans [vault 相対 PREFIX]
+        python3 ~/.claude/scripts/link_graph.py dead [--anchors]
+"""
+import os
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from vault_index import PRUNE_DIRS, VaultIndex  # noqa: E402
+
+HOME = Path.home()
+VAULT = HOME / "Documents/Obsidian Vault"
+REGISTRY = "wiki/meta/project-registry.md"
+REPO_PRUNE = PRUNE_DIRS | {"node_modules", "archive"}
+ATTACH_EXT = re.compile(r'\.(png|jpe?g|gif|pdf|csv|svg|base|canvas|webp)$', re.I)
+NOTE_KINDS = ("wikilink", "embed")
+
+
+def registry_roots(vault=VAULT):
+    """project-registry.md の **root**: `…` のうち実在するディレクトリ。"""
+    reg = Path(vault) / REGISTRY
+    roots = []
+    if reg.exists():
+        for m in re.finditer(r'\*\*root\*\*: `([^`]+)`', reg.read_text(encoding="utf-8", errors="ignore")):
+            r = m.group(1)
+            if r.startswith("~"):
+                r = str(HOME) + r[1:]
+            if os.path.isdir(r):
+                roots.append(r)
+    return roots
+
+
+def anchor_key(text):
+    """見出しアンカーの照合キー (Obsidian はリンク化で # | ^ : などを落とし、大文字小文字も区別しない)。"""
+    return " ".join(re.sub(r"[#|^:%\[\]*_`]", " ", text).split()).casefold()
+
+
+def _in_trash(path):
+    return ".trash" in path.split("/")
+
+
+def _live(path):
+    """vault の実ノートか (.trash・隠しディレクトリ配下を除く = 従来の glob("**") と同じ範囲)。"""
+    parts = path.split("/")
+    return ".trash" not in parts and not any(p.startswith(".") for p in parts[:-1])
+
+
+class LinkGraph:
+    def __init__(self, vault=VAULT, repo_roots=None):
+        self.root = Path(vault)
+        self.vault = VaultIndex(vault)
+        roots = registry_roots(vault) if repo_roots is None else repo_roots
+        self.repos = {str(r): VaultIndex(r, prune=REPO_PRUNE) for r in roots}
+        self._notes = None
+        self._basenames = None
+        self._anchors = {}
+
+    def refresh(self):
+        """vault と全 repo root を stat し、変わったファイルだけ読み直す。"""
+        self.vault.refresh()
+        for index in self.repos.values():
+            index.refresh()
+        self._notes = None
+        self._basenames = None
+        self._anchors = {}
+
+    def close(self):
+        self.vault.close()
+        for index in self.repos.values():
+            index.close()
+
+    def notes(self):
+        """stem → [実ノートの vault 相対パス] (path 順)。"""
+        if self._notes is None:
+            self._notes = {}
+            for row in self.vault.rows():
+                if _live(row["path"]):
+                    self._notes.setdefault(row["stem"], []).append(row["path"])
+        return self._notes
+
+    def basenames(self):
+        """stem → [vault 相対パス]: 断線判定の実体の範囲。従来の VAULT.rglob("*.md") から .trash を除いた集合と同じ
+        (notes() と違い隠しディレクトリ配下も実体に数える)。"""
+        if self._basenames is None:
+            self._basenames = {}
+            for row in self.vault.rows():
+                if not _in_trash(row["path"]):
+                    self._basenames.setdefault(row["stem"], []).append(row["path"])
+        return self._basenames
+
+    def _has_anchor(self, stem, anchor):
+        """同名ノートのどれかに見出し / block-id があるか。"""
+        if stem not in self._anchors:
+            hs, blocks = set(), set()
+            for rel in self.basenames().get(stem, ()):
+                row = next(self.vault.rows("headings", "blocks", where="path = ?", params=(rel,)))
+                hs.update(anchor_key(h) for h in row["headings"])
+                blocks.update(row["blocks"])
+            self._anchors[stem] = (hs, blocks)
+        hs, blocks = self._anchors[stem]
+        if anchor.startswith("^"):
+            return anchor[1:] in blocks
+        return anchor_key(anchor.split("#")[-1]) in hs  # [[note#h1#h2]] は末尾の見出し
+
+    # --- 照会 ---
+
+    def dead_links(self, srcs=None, anchors=False):
+        """vault ノートの断線を (src, seq) 順に yield: dict(src, kind, target, anchor, problem)。
+
+        problem: note (basename の実体なし・添付拡張子は除く) / file (HOME 配下の file:// 先が無い)
+                 / anchor (#見出し・#^block が無い。anchors=True のときだけ)。srcs で検査するノートを絞る。
+        見出しの照合は anchor_key (Obsidian の正規化の近似) なので anchor は参考扱い。
+        """
+        notes = self.basenames()
+        for e in self.vault.edges("in_code = 0"):
+            if not _live(e["src"]) or (srcs is not None and e["src"] not in srcs):
+                continue
+            if e["kind"] == "file":
+                if e["target"].startswith(str(HOME) + "/") and not os.path.exists(e["target"]):
+                    yield dict(e, problem="file")
+            elif not ATTACH_EXT.search(e["target"]):
+                if e["stem"] not in notes:
+                    yield dict(e, problem="note")
+                elif anchors and e["anchor"] and not self._has_anchor(e["stem"], e["anchor"]):
+                    yield dict(e, problem="anchor")
+
+    def repo_dead_links(self):
+        """repo → vault の file:// で先が無いもの: (repo 内の絶対パス, リンク先) を root・path 順に。"""
+        for root, index in self.repos.items():
+            seen = set()
+            for e in index.edges("kind = 'file'"):
+                target = e["target"]
+                if "Obsidian Vault" not in target or not target.startswith(str(HOME) + "/"):
+                    continue
+                key = (e["src"], target)
+                if key in seen:
+                    continue
+                seen.add(key)
+                if not os.path.exists(target):
+                    yield os.path.join(root, e["src"]), target
+
+    def resolve(self, note):
+        """ノート名 (stem) か vault 相対パスを実ノートの相対パスのリストに。"""
+        if note.endswith(".md"):
+            return [note] if note in self.notes().get(note.rsplit("/", 1)[-1][:-3], ()) else []
+        return list(self.notes().get(note, ()))
+
+    def backlinks(self, note):
+        """note へのリンク: dict(root, src, kind, anchor) を root・src 順に (root は "vault" か repo root)。"""
+        out = []
+        for rel in self.resolve(note):
+            stem = rel.rsplit("/", 1)[-1][:-3]
+            path = str(self.root / rel)
+            for e in self.vault.edges("in_code = 0 AND (stem = ? OR target = ?)", (stem, path)):
+                if not _live(e["src"]):
+                    continue
+                if e["kind"] in NOTE_KINDS:
+                    # フォルダ付き [[dir/note]] は末尾一致するノートだけ
+                    t = e["target"][:-3] if e["target"].endswith(".md") else e["target"]
+                    if "/" in t and not (rel[:-3] == t or rel[:-3].endswith("/" + t)):
+                        continue
+                elif e["target"] != path:
+                    continue
+                out.append({"root": "vault", "src": e["src"], "kind": e["kind"], "anchor": e["anchor"]})
+            for root, index in self.repos.items():
+                for e in index.edges("kind = 'file' AND target = ?", (path,)):
+                    out.append({"root": root, "src": e["src"], "kind": "file", "anchor": e["anchor"]})
+        return out
+
+    def orphans(self, prefix=""):
+        """どこからもリンクされていない実ノート (自分自身へのリンクは数えない)。path 順。"""
+        linked = {}
+        targets = set()
+        for e in self.vault.edges("in_code = 0"):
+            if not _live(e["src"]):
+                continue  # .trash からのリンクは数えない
+            if e["kind"] == "file":
+                targets.add(e["target"])
+            else:
+                linked.setdefault(e["stem"], set()).add(e["src"])
+        for index in self.repos.values():
+            targets.update(e["target"] for e in index.edges("kind = 'file'"))
+        out = []
+        for stem, paths in self.notes().items():
+            for rel in paths:
+                if not rel.startswith(prefix):
+                    continue
+                if linked.get(stem, set()) - {rel} or str(self.root / rel) in targets:
+                    continue
+                out.append(rel)
+        return sorted(out)
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("backlinks", "orphans", "dead") \
+            or (sys.argv[1] == "backlinks" and len(sys.argv) < 3):
+        sys.stderr.write(__doc__.split("使い方:", 1)[1])
+        return 2
+    cmd = sys.argv[1]
+    graph = LinkGraph()
+    try:
+        graph.refresh()
+        if cmd == "backlinks":
+            for b in graph.backlinks(sys.argv[2]):
+                anchor = "#" + b["anchor"] if b["anchor"] else ""
+                print(f"{b['root']}\t{b['src']}\t{b['kind']}{anchor}")
+        elif cmd == "orphans":
+            for rel in graph.orphans(sys.argv[2] if len(sys.argv) > 2 else ""):
+                print(rel)
+        else:
+            for d in graph.dead_links(anchors="--anchors" in sys.argv[2:]):
+                anchor = "#" + d["anchor"] if d["anchor"] else ""
+                print(f"{d['problem']}\t{d['src']}\t{d['target']}{anchor}")
+            for src, target in graph.repo_dead_links():
+                print(f"file\t{src}\t{target}")
+    finally:
+        graph.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,14 +10,24 @@
 # - 冪等台帳 (reflected-ledger) の更新は INBOX 書込→fsync→再読検証の後 (台帳先行禁止)
 # - git 操作はしない (同期は既存 Obsidian Git に相乗り)
 # - 自前 stdout は要約のみ (hook からバックグラウンド起動されログに落ちる)
+#
+# 読取りは per-file の byte offset チェックポイント (reflect-checkpoint.json) から新規分だけ。
+# reflect / reconcile は同じ cursor を共有し、1 run で各ファイルの新規 bytes を1回だけ読む。
+# reconcile の id 集合 (捕捉・INBOX アンカー) は台帳 DB の CaptureIndex に持ち、件数は trigger で
+# 差分更新する (チェックポイントは cursor と件数だけ・毎回の run が全履歴に比例しない)。
+# --verify: チェックポイントを使わず全ファイルを全量再走査し、保存済みチェックポイントとの差分を報告
 
+import argparse
 import fcntl
 import json
 import os
 import re
+import sqlite3
 import subprocess
 import sys
 import tempfile
+import uuid
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
 HOME = os.path.expanduser("~")
@@ -27,11 +37,17 @@ BASE = os.environ.get("PROMPT_HISTORY_STATE") or os.path.join(
     HOME, ".claude", "state", "prompt-history")
 CONFIG = os.environ.get("PROMPT_HISTORY_CONFIG") or os.path.join(
     HOME, ".claude", "config", "prompt-history-routing.json")
+LEDGER_DB = os.path.join(BASE, "reflected-ledger.db")
+LEGACY_LEDGER = os.path.join(BASE, "reflected-ledger.jsonl")  # 旧形式 (1行1 UUID)。初回に DB へ移行
 BEGIN = "<!-- prompt-history:begin -->"
 END = "<!-- prompt-history:end -->"
 SECTION_HEADER = "## 🧾 Claude Code 実行履歴（自動・秘密値伏字）"
 RECEIPT_RETENTION_DAYS = 30
 INBOX_SIZE_WARN = 2 * 1024 * 1024
+CHECKPOINT_VERSION = 2  # 2: id 集合を CaptureIndex へ移した (1 は読み捨てて全量再走査)
+TAIL_BYTES = 32  # cursor 直前の bytes を控え、ファイル書換え (同期の巻き戻し等) を検知する
+DAY_FILE_RE = re.compile(r"\d{4}-\d{2}-\d{2}\.jsonl")
+ANCHOR_RE = re.compile(r"<!-- evt:([0-9a-f-]{36}) -->")
 
 
 def load_config():
@@ -53,13 +69,13 @@ def read_host_uuid():
         return f.read().strip()
 
 
-def locked_append(path, lines):
-    """専用 .lock を flock して append (posttooluse-edit-history.py の型)。"""
+def locked_append(path, data):
+    """専用 .lock を flock して bytes を append (posttooluse-edit-history.py の型)。"""
     lock_fd = os.open(path + ".lock", os.O_CREAT | os.O_RDWR, 0o600)
     try:
         fcntl.flock(lock_fd, fcntl.LOCK_EX)
-        with open(path, "a") as f:
-            f.writelines(lines)
+        with open(path, "ab") as f:
+            f.write(data)
             f.flush()
             os.fsync(f.fileno())
     finally:
@@ -72,33 +88,68 @@ def locked_append(path, lines):
 
 # ---------- Step A: 受領票 → vault queue 転送 (全ホスト) ----------
 
+def load_transfer_cursor(path, receipts_dir):
+    """transfer-cursor.json → {name: 転送済み byte offset}。
+    旧形式 (値が行数の int) は、その行数ぶんの byte 位置に1回だけ換算する。"""
+    try:
+        with open(path) as f:
+            raw = json.load(f)
+    except Exception:
+        return {}
+    cursor = {}
+    for name, v in raw.items() if isinstance(raw, dict) else ():
+        if isinstance(v, dict) and isinstance(v.get("offset"), int):
+            cursor[name] = v["offset"]
+        elif isinstance(v, int):
+            try:
+                with open(os.path.join(receipts_dir, name), "rb") as f:
+                    off = 0
+                    for _, line in zip(range(v), f):
+                        if not line.endswith(b"\n"):
+                            break
+                        off += len(line)
+            except FileNotFoundError:
+                continue  # purge 済み: 転送も purge も対象外なので持たない
+            cursor[name] = off
+    return cursor
+
+
+def transfer_tail(src, dst, offset):
+    """src の offset 以降の完結行 (最後の改行まで) を dst へ追記し、(新 offset, 行数) を返す。
+    書きかけの最終行は次回へ。offset が行頭でない・ファイルより先 (作り直し等) なら先頭から
+    (queue 側の重複は reflect の台帳で弾かれる)。"""
+    with open(src, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if offset > size or (offset and os.pread(f.fileno(), 1, offset - 1) != b"\n"):
+            offset = 0
+        if offset == size:
+            return offset, 0
+        f.seek(offset)
+        data = f.read(size - offset)
+    end = data.rfind(b"\n") + 1
+    if end:
+        locked_append(dst, data[:end])
+    return offset + end, data.count(b"\n", 0, end)
+
+
 def transfer(cfg, host_uuid):
     receipts_dir = os.path.join(BASE, "receipts")
     qdir = os.path.join(queue_root(cfg), host_uuid)
     os.makedirs(qdir, exist_ok=True)
     cursor_path = os.path.join(BASE, "transfer-cursor.json")
-    try:
-        with open(cursor_path) as f:
-            cursor = json.load(f)
-    except Exception:
-        cursor = {}
+    # 受領票ごとの転送済み byte offset。新しい末尾だけ seek して読む (既転送分は読まない)
+    cursor = load_transfer_cursor(cursor_path, receipts_dir)
 
     moved = 0
     for name in sorted(os.listdir(receipts_dir)) if os.path.isdir(receipts_dir) else []:
-        if not re.fullmatch(r"\d{4}-\d{2}-\d{2}\.jsonl", name):
+        if not DAY_FILE_RE.fullmatch(name):
             continue
-        src = os.path.join(receipts_dir, name)
-        with open(src) as f:
-            lines = f.readlines()
-        done = cursor.get(name, 0)
-        new = lines[done:]
-        if new:
-            locked_append(os.path.join(qdir, name), new)
-            cursor[name] = len(lines)
-            moved += len(new)
+        cursor[name], n = transfer_tail(os.path.join(receipts_dir, name),
+                                        os.path.join(qdir, name), cursor.get(name, 0))
+        moved += n
 
     tmp = tempfile.NamedTemporaryFile(mode="w", dir=BASE, delete=False)
-    json.dump(cursor, tmp)
+    json.dump({name: {"offset": off} for name, off in cursor.items()}, tmp)
     tmp.flush()
     os.fsync(tmp.fileno())
     tmp.close()
@@ -114,15 +165,16 @@ def transfer(cfg, host_uuid):
     cutoff = (datetime.now() - timedelta(days=RECEIPT_RETENTION_DAYS)).strftime("%Y-%m-%d")
     purged = 0
     held_unpushed = 0
+    pushed = None  # push 済み queue ファイル (vault 相対)。purge 候補があるときだけ1回引く
     for name in list(cursor.keys()):
         if name[:10] < cutoff:
             src = os.path.join(receipts_dir, name)
             if os.path.exists(src):
-                with open(src) as f:
-                    n_lines = len(f.readlines())
-                if cursor.get(name, 0) >= n_lines:
-                    qfile = os.path.join(qdir, name)
-                    if queue_file_pushed(cfg, qfile):
+                # 全量転送済み = cursor が末尾 (書きかけ行が残っていれば未転送扱いで保持)
+                if cursor[name] >= os.path.getsize(src):
+                    if pushed is None:
+                        pushed = pushed_queue_files(cfg, qdir)
+                    if os.path.relpath(os.path.join(qdir, name), vault_root(cfg)) in pushed:
                         os.unlink(src)
                         try:
                             os.unlink(src + ".lock")
@@ -136,30 +188,485 @@ def transfer(cfg, host_uuid):
     return moved
 
 
-def queue_file_pushed(cfg, qfile):
-    """qfile が vault の git remote に push 済みか。確認できない時は False (=保持=安全側)。"""
+def pushed_queue_files(cfg, qdir):
+    """qdir 配下で vault の git remote に push 済みの queue ファイル (vault root 相対パスの集合)。
+    push 済み = upstream (@{u}) のツリーにあり、かつ作業ツリーとの差分が無い
+    (push 後にローカルで追記されていれば未 push 分があるので保持)。
+    受領票の数によらず git は3回 (rev-parse / ls-tree / diff)。確認できない時は空集合 (=全保持=安全側)。"""
     vroot = vault_root(cfg)
+    qrel = os.path.relpath(qdir, vroot)
+
+    def git(*args):
+        r = subprocess.run(["git", "-C", vroot, *args], capture_output=True, text=True, timeout=10)
+        return r.stdout if r.returncode == 0 else None
+
     try:
-        inside = subprocess.run(
-            ["git", "-C", vroot, "rev-parse", "--is-inside-work-tree"],
-            capture_output=True, text=True, timeout=10)
-        if inside.returncode != 0 or inside.stdout.strip() != "true":
-            return False  # 非 git vault (worktree/.git ファイル含む): 消さない
-        rel = os.path.relpath(qfile, vroot)
-        # 追跡されていて、かつ upstream に到達済みのコミットに含まれるか
-        r = subprocess.run(
-            ["git", "-C", vroot, "log", "-1", "--format=%H", "@{u}", "--", rel],
-            capture_output=True, text=True, timeout=10)
-        if r.returncode != 0 or not r.stdout.strip():
-            return False  # upstream 未設定 or push 済みコミットに未登場
-        # ローカル作業ツリーの現在内容が、その push 済みコミットと一致するか
-        # (push 後にローカルで追記されていれば未 push 分があるので保持)
-        diff = subprocess.run(
-            ["git", "-C", vroot, "diff", "--quiet", "@{u}", "--", rel],
-            capture_output=True, timeout=10)
-        return diff.returncode == 0
+        if (git("rev-parse", "--is-inside-work-tree") or "").strip() != "true":
+            return set()  # 非 git vault (worktree/.git ファイル含む): 消さない
+        # ls-tree / diff --relative とも -C の位置 (vault root) からの相対パスを返す
+        tree = git("ls-tree", "-r", "-z", "--name-only", "@{u}", "--", qrel)
+        changed = git("diff", "-z", "--name-only", "--relative", "@{u}", "--", qrel)
+        if tree is None or changed is None:
+            return set()  # upstream 未設定等
+        return set(tree.split("\0")) - set(changed.split("\0")) - {""}
     except Exception:
-        return False
+        return set()
+
+
+# ---------- 冪等台帳 (writer のみ) ----------
+
+class Ledger:
+    """INBOX 反映済み event_id の台帳 (SQLite・UUID を 16 byte の BLOB キーで1行)。
+
+    全件をメモリに載せず、照会は今回の候補 ID だけを主キーで引く。追記は1トランザクションで
+    synchronous=FULL (commit が返った時点で fsync 済み)。meta には
+      token  DB 作成時の乱数 (台帳の消失・差し替え検知。Checkpoint が stamp として保持)
+      count  登録件数 (追記のたびに更新。縮小検知用)
+    旧 reflected-ledger.jsonl があれば初回 open 時に取り込み、.migrated へ改名する (1回限り)。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS reflected (id BLOB PRIMARY KEY) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+    """
+    CHUNK = 500  # IN (...) 1回あたりの bind 数
+
+    def __init__(self, path=LEDGER_DB, legacy=LEGACY_LEDGER):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=10, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.executescript(self.SCHEMA)
+        if self._meta("token") is None:
+            self.db.execute("INSERT OR IGNORE INTO meta VALUES ('token', ?)", (os.urandom(8).hex(),))
+        if os.path.exists(legacy):
+            self._migrate(legacy)
+
+    @staticmethod
+    def key(event_id):
+        return bytes.fromhex(event_id.replace("-", ""))
+
+    def _meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _migrate(self, legacy):
+        """旧 JSONL → DB。挿入を commit してから改名するので、途中で落ちても次回やり直せる。"""
+        ids, bad = [], 0
+        with open(legacy) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if UUID_RE.fullmatch(line):
+                    ids.append(line)
+                else:
+                    bad += 1
+        added = self.add(ids)
+        os.replace(legacy, legacy + ".migrated")
+        print(f"[reflect] 台帳を {os.path.basename(self.path)} へ移行: {added} 件"
+              + (f" (UUID でない行 {bad} 件は破棄)" if bad else ""))
+
+    def known(self, event_ids):
+        """event_ids のうち台帳にあるもの。"""
+        ids = list(event_ids)
+        out = set()
+        for i in range(0, len(ids), self.CHUNK):
+            chunk = ids[i:i + self.CHUNK]
+            rows = self.db.execute(
+                "SELECT id FROM reflected WHERE id IN (%s)" % ",".join("?" * len(chunk)),
+                [self.key(e) for e in chunk])
+            hit = {bytes(r[0]) for r in rows}
+            out.update(e for e in chunk if self.key(e) in hit)
+        return out
+
+    def add(self, event_ids):
+        """追記 (既存は無視)。新規に載った件数を返す。"""
+        before = self.db.total_changes
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self.db.executemany("INSERT OR IGNORE INTO reflected VALUES (?)",
+                                [(self.key(e),) for e in event_ids])
+            added = self.db.total_changes - before
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('count', ?)",
+                            (str(int(self._meta("count") or 0) + added),))
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        return added
+
+    def stamp(self):
+        return [self._meta("token"), int(self._meta("count") or 0)]
+
+    def size(self):
+        return sum(os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p))
+
+    def close(self):
+        self.db.close()
+
+
+class CaptureIndex:
+    """reconcile の id 集合 (台帳と同じ DB・UUID は Ledger.key の 16 byte BLOB)。
+
+      captured(id, src, route)   queue / receipts の各ファイル (Checkpoint の key) に載っている event_id
+      anchors(id, inbox)         各 INBOX (vault 相対) の <!-- evt:ID -->
+      events(id, nsrc, nanchor)  id ごとの出現ファイル数 / INBOX 数 (trigger で維持)
+      totals                     unique な captured / reflected / matched 件数。trigger が 0↔1 の変わり目で増減
+    reconcile は totals と未反映 (部分 index: nsrc > 0 AND nanchor = 0) だけを引き、全 id を歩かない。
+    書込みは Checkpoint 経由で1回の読取りにつき1トランザクション。チェックポイント保存前に落ちても
+    次回は前回の cursor から読み直し、(id, src) の主キーで重複は入らない。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS captured (id BLOB, src TEXT, route TEXT, PRIMARY KEY (id, src)) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS captured_src ON captured(src);
+    CREATE TABLE IF NOT EXISTS anchors (id BLOB, inbox TEXT, PRIMARY KEY (id, inbox)) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS anchors_inbox ON anchors(inbox);
+    CREATE TABLE IF NOT EXISTS events (id BLOB PRIMARY KEY, nsrc INTEGER NOT NULL DEFAULT 0,
+                                       nanchor INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS events_unreflected ON events(id) WHERE nsrc > 0 AND nanchor = 0;
+    CREATE TABLE IF NOT EXISTS totals (key TEXT PRIMARY KEY, n INTEGER NOT NULL) WITHOUT ROWID;
+    INSERT OR IGNORE INTO totals VALUES ('captured', 0), ('reflected', 0), ('matched', 0);
+
+    CREATE TRIGGER IF NOT EXISTS captured_ai AFTER INSERT ON captured BEGIN
+        INSERT OR IGNORE INTO events(id) VALUES (NEW.id);
+        UPDATE totals SET n = n + 1 WHERE key = 'captured'
+            AND (SELECT nsrc = 0 FROM events WHERE id = NEW.id);
+        UPDATE totals SET n = n + 1 WHERE key = 'matched'
+            AND (SELECT nsrc = 0 AND nanchor > 0 FROM events WHERE id = NEW.id);
+        UPDATE events SET nsrc = nsrc + 1 WHERE id = NEW.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS captured_ad AFTER DELETE ON captured BEGIN
+        UPDATE events SET nsrc = nsrc - 1 WHERE id = OLD.id;
+        UPDATE totals SET n = n - 1 WHERE key = 'captured'
+            AND (SELECT nsrc = 0 FROM events WHERE id = OLD.id);
+        UPDATE totals SET n = n - 1 WHERE key = 'matched'
+            AND (SELECT nsrc = 0 AND nanchor > 0 FROM events WHERE id = OLD.id);
+        DELETE FROM events WHERE id = OLD.id AND nsrc = 0 AND nanchor = 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS anchors_ai AFTER INSERT ON anchors BEGIN
+        INSERT OR IGNORE INTO events(id) VALUES (NEW.id);
+        UPDATE totals SET n = n + 1 WHERE key = 'reflected'
+            AND (SELECT nanchor = 0 FROM events WHERE id = NEW.id);
+        UPDATE totals SET n = n + 1 WHERE key = 'matched'
+            AND (SELECT nanchor = 0 AND nsrc > 0 FROM events WHERE id = NEW.id);
+        UPDATE events SET nanchor = nanchor + 1 WHERE id = NEW.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS anchors_ad AFTER DELETE ON anchors BEGIN
+        UPDATE events SET nanchor = nanchor - 1 WHERE id = OLD.id;
+        UPDATE totals SET n = n - 1 WHERE key = 'reflected'
+            AND (SELECT nanchor = 0 FROM events WHERE id = OLD.id);
+        UPDATE totals SET n = n - 1 WHERE key = 'matched'
+            AND (SELECT nanchor = 0 AND nsrc > 0 FROM events WHERE id = OLD.id);
+        DELETE FROM events WHERE id = OLD.id AND nsrc = 0 AND nanchor = 0;
+    END;
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.db.executescript(self.SCHEMA)
+
+    @classmethod
+    def memory(cls):
+        """--verify の全量再走査用 (永続 DB とは別に数え直して突き合わせる)。"""
+        return cls(sqlite3.connect(":memory:", isolation_level=None))
+
+    @staticmethod
+    def event_id(key):
+        return str(uuid.UUID(bytes=bytes(key)))
+
+    @contextmanager
+    def transaction(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def reset(self):
+        """全消去 (チェックポイントを捨てて全量再走査するとき)。"""
+        with self.transaction():
+            self.db.execute("DELETE FROM events")  # 先に消すと trigger の更新は空振りで済む
+            self.db.execute("DELETE FROM captured")
+            self.db.execute("DELETE FROM anchors")
+            self.db.execute("UPDATE totals SET n = 0")
+
+    def capture(self, forget=(), rows=()):
+        """forget の src の行を消し、rows [(src, event_id, route)] を足す (既存は無視)。"""
+        with self.transaction():
+            self.db.executemany("DELETE FROM captured WHERE src = ?", [(src,) for src in forget])
+            self.db.executemany("INSERT OR IGNORE INTO captured VALUES (?, ?, ?)",
+                                [(Ledger.key(eid), src, route) for src, eid, route in rows])
+
+    def set_anchors(self, inbox, event_ids):
+        """inbox のアンカーを event_ids に揃える (差分だけ書く)。"""
+        have = {bytes(r[0]) for r in self.db.execute("SELECT id FROM anchors WHERE inbox = ?", (inbox,))}
+        want = {Ledger.key(e) for e in event_ids}
+        with self.transaction():
+            self.db.executemany("DELETE FROM anchors WHERE id = ? AND inbox = ?",
+                                [(k, inbox) for k in have - want])
+            self.db.executemany("INSERT INTO anchors VALUES (?, ?)", [(k, inbox) for k in want - have])
+
+    def add_anchors(self, inbox, event_ids):
+        with self.transaction():
+            self.db.executemany("INSERT OR IGNORE INTO anchors VALUES (?, ?)",
+                                [(Ledger.key(e), inbox) for e in event_ids])
+
+    def forget_inboxes(self, inboxes):
+        with self.transaction():
+            self.db.executemany("DELETE FROM anchors WHERE inbox = ?", [(i,) for i in inboxes])
+
+    def totals(self):
+        return dict(self.db.execute("SELECT key, n FROM totals"))
+
+    def unreflected(self):
+        """INBOX に載っていない捕捉 id → route (queue 優先・queue 同士は key の大きい方・receipts は小さい方)。"""
+        out = {}
+        for (key,) in self.db.execute("SELECT id FROM events WHERE nsrc > 0 AND nanchor = 0").fetchall():
+            rows = self.db.execute("SELECT src, route FROM captured WHERE id = ? ORDER BY src", (key,)).fetchall()
+            queue = [route for src, route in rows if src.startswith("queue/")]
+            out[self.event_id(key)] = queue[-1] if queue else rows[0][1]
+        return out
+
+    def sources(self):
+        return {src for (src,) in self.db.execute("SELECT DISTINCT src FROM captured")}
+
+    def ids(self, src):
+        return {self.event_id(k) for (k,) in self.db.execute("SELECT id FROM captured WHERE src = ?", (src,))}
+
+    def copy_from(self, other):
+        """other (--verify で数え直した索引) の中身で置き換える。"""
+        captured = other.db.execute("SELECT id, src, route FROM captured").fetchall()
+        anchors = other.db.execute("SELECT id, inbox FROM anchors").fetchall()
+        self.reset()
+        with self.transaction():
+            self.db.executemany("INSERT INTO captured VALUES (?, ?, ?)", captured)
+            self.db.executemany("INSERT INTO anchors VALUES (?, ?)", anchors)
+
+
+# ---------- 読取りチェックポイント (writer のみ) ----------
+
+def file_sig(st):
+    """無変更判定。chmod 等でも ctime が動くので、読めなくなったファイルは必ず開き直す。"""
+    return [st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino]
+
+
+def parse_record(line):
+    """1 行 → 構造検証済みレコード。壊れ/不正は None。"""
+    try:
+        r = json.loads(line)
+    except Exception:
+        return None
+    return r if valid_record(r) else None
+
+
+class Checkpoint:
+    """queue (全ホスト) / receipts の per-file 読取り位置と、INBOX ごとの読取り済み sig。
+
+    files["queue/<host>/<name>" | "receipts/<name>"] =
+        sig     最後に読んだ時の file_sig (一致なら開かない)
+        offset  読了 byte 位置 (完結した行の末尾まで)
+        tail    offset 直前 TAIL_BYTES の hex (不一致 = 書換え → 先頭から読み直す)
+        count   読んだ (構造検証を通った) レコード数
+        pending reflect がまだ INBOX に載せていないレコードの行頭 offset (次回も再読)
+    inboxes[rel] = {sig, count}  index に載せた時の INBOX の sig とアンカー数
+    id 集合そのものは index (CaptureIndex) に持つ。チェックポイントはファイル数に比例するだけ。
+    ledger = Ledger.stamp()  保存時の台帳。縮小・差し替えならチェックポイント全体 (と index) を捨てる
+    (台帳の消失は「台帳修復」経路で直す前提なので、cursor もその台帳と一緒に巻き戻す)。
+    保存は main の最後に1回だけ。途中で落ちたら前回の cursor から読み直し、台帳で重複を弾く。
+    """
+
+    def __init__(self, data=None, index=None):
+        self.data = data or {"version": CHECKPOINT_VERSION, "files": {}, "inboxes": {}}
+        self.index = index
+        self.failures = []  # 開けなかったファイル (reconcile の scan_ok)
+        self.rewound = 0    # 書換え検知で先頭から読み直したファイル数
+        self.invalid = 0    # 今回新たに読んだ構造不正レコード数
+        self._new = {}      # prefix -> [(key, offset, record)] (1 run で1回だけ読む)
+
+    @staticmethod
+    def path():
+        return os.path.join(BASE, "reflect-checkpoint.json")
+
+    @classmethod
+    def load(cls, ledger, index):
+        """保存済みチェックポイント。使えなければ index も空にして全量再走査から。"""
+        try:
+            with open(cls.path()) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if not isinstance(data, dict) or data.get("version") != CHECKPOINT_VERSION:
+            data = None
+        elif data.get("ledger") is not None:
+            saved, now = data["ledger"], ledger.stamp()
+            if now[0] != saved[0] or now[1] < saved[1]:
+                print("[reflect] 台帳が縮小/差し替え — チェックポイントを破棄して全量再走査")
+                data = None
+        if data is None:
+            index.reset()
+        return cls(data, index)
+
+    def save(self, ledger):
+        self.data["ledger"] = ledger.stamp()
+        tmp = tempfile.NamedTemporaryFile(mode="w", dir=BASE, delete=False)
+        tmp.write(json.dumps(self.data, ensure_ascii=False, separators=(",", ":")))  # dump は細切れ write で遅い
+        tmp.flush()
+        os.fsync(tmp.fileno())
+        tmp.close()
+        os.replace(tmp.name, self.path())
+
+    def day_files(self, cfg, prefix):
+        """prefix ("queue" / "receipts") 配下の (key, path)。"""
+        if prefix == "receipts":
+            rdir = os.path.join(BASE, "receipts")
+            names = sorted(os.listdir(rdir)) if os.path.isdir(rdir) else []
+            return [("receipts/" + name, os.path.join(rdir, name))
+                    for name in names if DAY_FILE_RE.fullmatch(name)]
+        out = []
+        qroot = queue_root(cfg)
+        for host in sorted(os.listdir(qroot)) if os.path.isdir(qroot) else []:
+            hdir = os.path.join(qroot, host)
+            if not os.path.isdir(hdir):
+                continue
+            out.extend((f"queue/{host}/{name}", os.path.join(hdir, name))
+                       for name in sorted(os.listdir(hdir)) if DAY_FILE_RE.fullmatch(name))
+        return out
+
+    def new_records(self, cfg, prefix):
+        """prefix 配下の全ファイルから前回 cursor 以降の完結行を読み、cursor を進める。
+        返り値: [(key, 行頭 offset, record)] (構造不正は self.invalid に数えて捨てる)。"""
+        if prefix in self._new:
+            return self._new[prefix]
+        files = self.data["files"]
+        seen = set()
+        out = []
+        forget = []  # 書換え・消失で index から外す src
+        rows = []    # index に足す (src, event_id, route)
+        for key, fp in self.day_files(cfg, prefix):
+            seen.add(key)
+            ent = files.get(key)
+            try:
+                st = os.stat(fp)
+                if ent and ent["sig"] == file_sig(st):
+                    continue
+                with open(fp, "rb") as f:
+                    old, ent = ent, self._rewind_if_rewritten(key, f, ent)
+                    if old is not None and ent is not old:
+                        forget.append(key)
+                    f.seek(ent["offset"])
+                    data = f.read()
+                    st = os.fstat(f.fileno())
+            except OSError:
+                self.failures.append(fp)
+                continue
+            end = data.rfind(b"\n") + 1  # 書きかけの最終行は次回へ
+            pos = ent["offset"]
+            for line in data[:end].splitlines(keepends=True):
+                if line.strip():
+                    r = parse_record(line)
+                    if r is None:
+                        self.invalid += 1
+                    else:
+                        rows.append((key, r["event_id"], r.get("route", "")))
+                        ent["count"] += 1
+                        out.append((key, pos, r))
+                pos += len(line)
+            ent["offset"] = pos
+            ent["tail"] = (bytes.fromhex(ent["tail"]) + data[:end])[-TAIL_BYTES:].hex()
+            # 書きかけ行が残っているときは sig を合わせない (次回必ず開く)
+            ent["sig"] = file_sig(st) if pos == st.st_size else None
+            files[key] = ent
+        for key in [k for k in files if k.startswith(prefix + "/") and k not in seen]:
+            del files[key]  # 消えたファイル (purge 済み receipts 等) は母集団からも外す
+            forget.append(key)
+        if forget or rows:
+            self.index.capture(forget, rows)
+        self._new[prefix] = out
+        return out
+
+    def _rewind_if_rewritten(self, key, f, ent):
+        """前回の cursor が今のファイル内容と噛み合うか (offset が範囲内・直前 bytes 一致)。"""
+        if ent:
+            tail = bytes.fromhex(ent["tail"])
+            off = ent["offset"]
+            size = os.fstat(f.fileno()).st_size
+            if off <= size and os.pread(f.fileno(), len(tail), off - len(tail)) == tail:
+                return ent
+            self.rewound += 1
+        return {"sig": None, "offset": 0, "tail": "", "count": 0, "pending": []}
+
+    def pending_records(self, cfg):
+        """前回 INBOX に載らなかった (inbox 消失・外部編集で中止等) queue レコードを再読。"""
+        out = []
+        for key, ent in self.data["files"].items():
+            if not key.startswith("queue/") or not ent.get("pending"):
+                continue
+            fp = os.path.join(queue_root(cfg), key[len("queue/"):])
+            try:
+                with open(fp, "rb") as f:
+                    for off in ent["pending"]:
+                        f.seek(off)
+                        r = parse_record(f.readline())
+                        if r is not None:
+                            out.append((key, off, r))
+            except OSError:
+                self.failures.append(fp)
+        return out
+
+    def set_pending(self, records, done):
+        """records のうち done (台帳済み + 今回反映) 以外を次回の再読対象に。"""
+        pending = {}
+        for key, off, r in records:
+            if r["event_id"] not in done:
+                pending.setdefault(key, set()).add(off)
+        for key, ent in self.data["files"].items():
+            if key.startswith("queue/"):
+                ent["pending"] = sorted(pending.get(key, ()))
+
+    def read_all(self, cfg):
+        """reconcile の母集団 (queue 全ホスト + ローカル receipts) の新規分を index へ。"""
+        self.new_records(cfg, "queue")
+        self.new_records(cfg, "receipts")
+
+    def sync_inboxes(self, vroot, rels):
+        """INBOX 群の <!-- evt:ID --> を index に揃える。sig が前回のままの INBOX は開かない
+        (reflect 自身の追記は inbox_written で index に足してあるので、開くのは外部編集の後だけ)。"""
+        cache = self.data["inboxes"]
+        live = set()
+        for rel in rels:
+            inbox = os.path.join(vroot, rel)
+            if not os.path.exists(inbox):
+                continue
+            live.add(rel)
+            try:
+                sig = file_sig(os.stat(inbox))
+                ent = cache.get(rel)
+                if not ent or ent["sig"] != sig:
+                    with open(inbox, encoding="utf-8") as f:
+                        ids = set(ANCHOR_RE.findall(f.read()))
+                    self.index.set_anchors(rel, ids)
+                    cache[rel] = {"sig": sig, "count": len(ids)}
+            except Exception:
+                self.failures.append(inbox)
+                continue
+        gone = [r for r in cache if r not in live]
+        if gone:
+            self.index.forget_inboxes(gone)
+            for rel in gone:
+                del cache[rel]
+
+    def inbox_written(self, rel, before, after, event_ids):
+        """reflect が INBOX (sig before → after) にアンカー event_ids を足した。
+        index が before の内容と揃っていた時だけ差分で追従する (でなければ次の sync で読み直す)。"""
+        ent = self.data["inboxes"].get(rel)
+        if not ent or ent["sig"] != before:
+            return
+        self.index.add_anchors(rel, event_ids)
+        self.data["inboxes"][rel] = {"sig": after, "count": ent["count"] + len(set(event_ids))}
 
 
 # ---------- Step B: queue → INBOX 反映 (writer のみ) ----------
@@ -247,56 +754,29 @@ def valid_record(r):
     return True
 
 
-def reflect(cfg, host_uuid):
+def reflect(cfg, host_uuid, cp, ledger):
     if cfg.get("writer_host_uuid") != host_uuid:
         print("[reflect] not writer — skip Step B")
         return
 
     qroot = queue_root(cfg)
-    ledger_path = os.path.join(BASE, "reflected-ledger.jsonl")
-    ledger = set()
-    try:
-        with open(ledger_path) as f:
-            ledger = {l.strip() for l in f if l.strip()}
-    except FileNotFoundError:
-        pass
+    # 全ホストの queue の前回 cursor 以降 + 前回反映できなかった分。
+    # 1 ファイルが読めなくても (権限/破損) 全体を止めない
+    records = cp.new_records(cfg, "queue")
+    records = records + cp.pending_records(cfg)
+    if cp.rewound:
+        print(f"[reflect] 書換えを検知した queue {cp.rewound} ファイルを先頭から再読")
+    if cp.invalid:
+        print(f"[reflect] WARN 構造不正の queue レコード {cp.invalid} 件を隔離 (未処理)")
+    if cp.failures:
+        print(f"[reflect] WARN 読めない queue ファイル {len(cp.failures)} 件をスキップ (権限/破損)")
+    if not records:
+        print("[reflect] no new events")
+        _stamp_success(cfg)
+        return
 
-    # 全ホストの queue を読む。1 ファイルが読めなくても (権限/破損) 全体を止めない
-    events = []
-    invalid = 0
-    unreadable = 0
-    for host in sorted(os.listdir(qroot)) if os.path.isdir(qroot) else []:
-        hdir = os.path.join(qroot, host)
-        if not os.path.isdir(hdir):
-            continue
-        for name in sorted(os.listdir(hdir)):
-            if not re.fullmatch(r"\d{4}-\d{2}-\d{2}\.jsonl", name):
-                continue
-            try:
-                fh = open(os.path.join(hdir, name))
-            except Exception:
-                unreadable += 1
-                continue
-            with fh as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        r = json.loads(line)
-                    except Exception:
-                        invalid += 1
-                        continue
-                    if not valid_record(r):
-                        invalid += 1
-                        continue
-                    if r["event_id"] not in ledger:
-                        events.append(r)
-
-    if invalid:
-        print(f"[reflect] WARN 構造不正の queue レコード {invalid} 件を隔離 (未処理)")
-    if unreadable:
-        print(f"[reflect] WARN 読めない queue ファイル {unreadable} 件をスキップ (権限/破損)")
+    done = ledger.known({r["event_id"] for _, _, r in records})
+    events = [r for _, _, r in records if r["event_id"] not in done]
 
     # dedupe (queue 二重転送耐性) + 時刻順
     seen = set()
@@ -307,6 +787,7 @@ def reflect(cfg, host_uuid):
         seen.add(r["event_id"])
         uniq.append(r)
     if not uniq:
+        cp.set_pending(records, done)
         print("[reflect] no new events")
         _stamp_success(cfg)
         return
@@ -314,6 +795,7 @@ def reflect(cfg, host_uuid):
     routes = cfg.get("routes", {})
     prefixes = cfg.get("cwd_prefixes", {})
     vroot = vault_root(cfg)
+    rel_of = {os.path.join(vroot, rel): rel for rel in routes.values()}  # INBOX → sync_inboxes の key
 
     def re_resolve(route):
         """unrouted:<cwd> を現在の住所録で再解決 (捕捉後に住所録へ追記した分を過去にも効かせる)。"""
@@ -407,6 +889,9 @@ def reflect(cfg, host_uuid):
         # 再読検証 → 合格分のみ台帳へ (Codex 条件6: 台帳先行禁止)
         with open(inbox, encoding="utf-8") as f:
             back = f.read()
+            st2 = os.fstat(f.fileno())
+        if back == text and inbox in rel_of:  # 書いたとおり = アンカーは前の内容 + ids_here だけ
+            cp.inbox_written(rel_of[inbox], file_sig(st0), file_sig(st2), ids_here)
         ok = [i for i in ids_here if f"<!-- evt:{i} -->" in back]
         missing = set(ids_here) - set(ok)
         if missing:
@@ -419,14 +904,15 @@ def reflect(cfg, host_uuid):
             print(f"[reflect] ⚠️ {os.path.basename(inbox)} が {size//1024}KB — 肥大の運用変更をユーザーに相談すること (無断処理禁止)")
 
     if reflected_ids:
-        locked_append(ledger_path, [i + "\n" for i in reflected_ids])
+        ledger.add(reflected_ids)
+    cp.set_pending(records, done.union(reflected_ids))
     print(f"[reflect] total reflected={len(reflected_ids)}")
 
     # queue/ledger の肥大監視 (削除はユーザー承認制・警告のみ)
     try:
         qsize = sum(os.path.getsize(os.path.join(dp, fn))
                     for dp, _, fns in os.walk(qroot) for fn in fns)
-        lsize = os.path.getsize(ledger_path) if os.path.exists(ledger_path) else 0
+        lsize = ledger.size()
         if qsize > 5 * 1024 * 1024 or lsize > 5 * 1024 * 1024:
             print(f"[reflect] ⚠️ queue={qsize//1024}KB ledger={lsize//1024}KB — 圧縮/整理をユーザーに相談すること")
     except Exception:
@@ -452,7 +938,7 @@ def _stamp_local_success():
         pass
 
 
-def reconcile(cfg, host_uuid):
+def reconcile(cfg, host_uuid, cp):
     """end-to-end 照合: 捕捉した全 event_id (queue 全ホスト + ローカル receipts) が
     INBOX に反映されたかを突き合わせ、未反映の内訳を reconcile-status.json に書く。
     拾えるサイレント欠落: queue→INBOX 反映失敗・1枚停止・パス改名・receipt→queue 転送失敗。
@@ -467,72 +953,30 @@ def reconcile(cfg, host_uuid):
         resolved = re_resolve_route(cfg, route)
         return resolved if resolved in routes else "general"
 
-    scan_failures = []
-
-    def scan_events(fp):
-        """1 jsonl から (event_id, dest_key) を yield。ファイル open 失敗は scan_failures に記録
-        (照合の母集団が欠けた状態を scan_ok=False として surface する・Codex 指摘)。"""
-        try:
-            fh = open(fp)
-        except Exception:
-            scan_failures.append(fp)
-            return
-        with fh as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    r = json.loads(line)
-                except Exception:
-                    continue
-                if valid_record(r):
-                    yield r["event_id"], dest_key(r.get("route", ""))
-
-    qroot = queue_root(cfg)
-    captured = {}  # event_id -> dest_key (queue 全ホスト + ローカル未転送 receipts)
-    for host in sorted(os.listdir(qroot)) if os.path.isdir(qroot) else []:
-        hdir = os.path.join(qroot, host)
-        if not os.path.isdir(hdir):
-            continue
-        for name in sorted(os.listdir(hdir)):
-            if re.fullmatch(r"\d{4}-\d{2}-\d{2}\.jsonl", name):
-                for eid, k in scan_events(os.path.join(hdir, name)):
-                    captured[eid] = k
-    # ローカル未転送 receipts も母集団へ (receipt→queue の欠落=転送失敗も検知・Codex 指摘)
-    rdir = os.path.join(BASE, "receipts")
-    for name in sorted(os.listdir(rdir)) if os.path.isdir(rdir) else []:
-        if re.fullmatch(r"\d{4}-\d{2}-\d{2}\.jsonl", name):
-            for eid, k in scan_events(os.path.join(rdir, name)):
-                captured.setdefault(eid, k)
-
-    # 反映済み = 全 INBOX の <!-- evt:ID --> 実数
-    reflected = set()
+    # 母集団 = 捕捉した全 event_id (queue 全ホスト + ローカル未転送 receipts = receipt→queue の
+    # 欠落も検知)。reflect と同じ cursor から新規分だけ読み、既読分は index の集計を使う
+    cp.read_all(cfg)
+    # 反映済み = 全 INBOX の <!-- evt:ID --> 実数 (sig が変わった INBOX だけ読み直す)
     vroot = vault_root(cfg)
-    for rel in routes.values():
-        inbox = os.path.join(vroot, rel)
-        if os.path.exists(inbox):
-            try:
-                with open(inbox, encoding="utf-8") as f:
-                    for m in re.finditer(r"<!-- evt:([0-9a-f-]{36}) -->", f.read()):
-                        reflected.add(m.group(1))
-            except Exception:
-                scan_failures.append(inbox)
+    cp.sync_inboxes(vroot, routes.values())
+    # 開けなかったファイルがあれば照合の母集団が欠けている (scan_ok=False で surface・Codex 指摘)
+    scan_failures = cp.failures
 
-    missing = [eid for eid in captured if eid not in reflected]
-    matched = sum(1 for eid in captured if eid in reflected)
+    totals = cp.index.totals()
+    missing = cp.index.unreflected()  # {event_id: route} (未反映ぶんだけ)
     # route 別の未反映内訳 + INBOX の実在チェック (パス改名検知)
     by_route = {}
-    for eid in missing:
-        by_route[captured[eid]] = by_route.get(captured[eid], 0) + 1
+    for route in missing.values():
+        k = dest_key(route)
+        by_route[k] = by_route.get(k, 0) + 1
     missing_inboxes = [k for k in by_route
                        if k not in routes or not os.path.exists(os.path.join(vroot, routes[k]))]
 
     status = {
         "ts": datetime.now().astimezone().isoformat(timespec="seconds"),
-        "captured_total": len(captured),      # queue + ローカル receipts の unique event_id
-        "matched_total": matched,             # captured のうち INBOX に載っている数
-        "reflected_total": len(reflected),    # INBOX の全アンカー (過去分含む・比較には matched を使う)
+        "captured_total": totals["captured"],    # queue + ローカル receipts の unique event_id
+        "matched_total": totals["matched"],      # captured のうち INBOX に載っている数
+        "reflected_total": totals["reflected"],  # INBOX の全アンカー (過去分含む・比較には matched を使う)
         "unreflected": len(missing),
         "scan_ok": not scan_failures,
         "by_route": dict(sorted(by_route.items(), key=lambda x: -x[1])),
@@ -549,10 +993,10 @@ def reconcile(cfg, host_uuid):
     except Exception:
         pass
     if missing:
-        print(f"[reconcile] 未反映 {len(missing)} 件 / 捕捉 {len(captured)} · 反映 {len(reflected)}"
+        print(f"[reconcile] 未反映 {len(missing)} 件 / 捕捉 {totals['captured']} · 反映 {totals['reflected']}"
               + (f" · INBOX不明 {missing_inboxes}" if missing_inboxes else ""))
     else:
-        print(f"[reconcile] 全 {len(captured)} 件 反映済み")
+        print(f"[reconcile] 全 {totals['captured']} 件 反映済み")
 
 
 def re_resolve_route(cfg, route):
@@ -568,7 +1012,34 @@ def re_resolve_route(cfg, route):
     return best[1] if best else "general"
 
 
+def verify_report(cfg, saved, fresh):
+    """--verify: 全量再走査の結果 (fresh・メモリ上の index) と保存済みチェックポイント + index (saved) の食い違い。
+    取りこぼし = saved の cursor より手前にあるのに saved の index に無い event_id
+    (cursor 以降は前回以後の新着なので数えない)。幽霊 = saved の index にあって実ファイルに無い event_id。
+    全量再走査なので全 id を歩く (監査用・SessionStart では走らない)。"""
+    files = saved.data["files"]
+    saved_ids = {}
+    missed = 0
+    for key, off, r in fresh.new_records(cfg, "queue") + fresh.new_records(cfg, "receipts"):
+        ent = files.get(key)
+        if ent and off < ent["offset"]:
+            if key not in saved_ids:
+                saved_ids[key] = saved.index.ids(key)
+            if r["event_id"] not in saved_ids[key]:
+                missed += 1
+    ghosts = sum(len(saved.index.ids(src) - fresh.index.ids(src)) for src in saved.index.sources())
+    print(f"[verify] 全量再走査 {len(fresh.data['files'])} ファイル — チェックポイントとの差:"
+          f" 取りこぼし {missed} 件 / 幽霊 {ghosts} 件"
+          + (" (チェックポイントを再構築)" if missed or ghosts else ""))
+    return missed + ghosts
+
+
 def main():
+    ap = argparse.ArgumentParser(description="受領票の queue 転送 + INBOX 反映 + reconcile")
+    ap.add_argument("--verify", action="store_true",
+                    help="チェックポイントを使わず全量再走査し、保存済みチェックポイントとの差を報告して作り直す")
+    args = ap.parse_args()
+
     os.umask(0o077)
     os.makedirs(BASE, exist_ok=True)
     # 単一インスタンス (非ブロッキング)
@@ -585,8 +1056,21 @@ def main():
         print(f"[reflect] ERROR vault not found: {vault_root(cfg)}")
         return 1
     transfer(cfg, host_uuid)
-    reflect(cfg, host_uuid)
-    reconcile(cfg, host_uuid)
+    writer = cfg.get("writer_host_uuid") == host_uuid
+    # writer は毎回台帳 DB を開く (接続と meta の stamp だけ・id は読み込まない)。
+    # reconcile の集計 (CaptureIndex) も同じ DB にあり、新着が無い run でも totals を引く
+    ledger = Ledger() if writer else None
+    saved = Checkpoint.load(ledger, CaptureIndex(ledger.db)) if writer else Checkpoint()
+    cp = Checkpoint(index=CaptureIndex.memory()) if args.verify and writer else saved
+    reflect(cfg, host_uuid, cp, ledger)
+    reconcile(cfg, host_uuid, cp)
+    if writer:
+        if args.verify:
+            verify_report(cfg, saved, cp)
+            saved.index.copy_from(cp.index)
+            cp.index = saved.index
+        cp.save(ledger)
+        ledger.close()
     _stamp_local_success()
     return 0
 
@@ -22,6 +22,9 @@ fail-open: 解析例外は exit 0 だが stdout に {"gate_status":"error"} を
 """
 import sys, os, re, json, glob
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from vault_index import VaultIndex  # noqa: E402
+
 VAULT = os.path.expanduser("~/Documents/Obsidian Vault")
 
 # 承認導線の節だけを対象にする (汎用語 アクション/打ち手 は非承認文書を踏むため不採用・2026-07-08 在庫scanで較正)
@@ -50,12 +53,28 @@ def strip_noise(text):
     return "\n".join(out)
 
 
+_index = None
+
+def vault_index():
+    """vault 索引 (vault_index.py) を1プロセス1回だけ開く。"""
+    global _index
+    if _index is None:
+        _index = VaultIndex(VAULT)
+    return _index
+
+
 _target_cache = {}
 
 def link_targets(path):
-    """note の見出し集合と block-id 集合。"""
+    """note の見出し集合と block-id 集合。vault 内は索引の抽出結果 (stat 一致なら読まない)。"""
     if path in _target_cache:
         return _target_cache[path]
+    rel = os.path.relpath(path, VAULT)
+    if not rel.startswith(".." + os.sep) and rel != "..":
+        row = vault_index().entry(rel)
+        hs, blocks = (set(row["headings"]), set(row["blocks"])) if row else (set(), set())
+        _target_cache[path] = (hs, blocks)
+        return hs, blocks
     hs, blocks = set(), set()
     try:
         with open(path, encoding="utf-8") as f:
@@ -73,18 +92,61 @@ def link_targets(path):
     return hs, blocks
 
 
+_note_map = None
+
+def note_map():
+    """basename (casefold) → vault 内の実パス (path 順)。1プロセス1回、索引 (stat 一致なら読まない) から作る。
+    Obsidian のリンク解決と従来の isfile/glob (macOS APFS) は大文字小文字を区別しないのでキーも畳む。"""
+    global _note_map
+    if _note_map is None:
+        index = vault_index()
+        if not index.refreshed:
+            index.refresh()
+        _note_map = {}
+        for row in index.rows():
+            parts = row["path"].split("/")
+            if ".trash" in parts or any(p.startswith(".") for p in parts[:-1]):
+                continue  # 従来の glob("**") は隠しディレクトリに降りない
+            _note_map.setdefault(row["stem"].casefold(), []).append(os.path.join(VAULT, row["path"]))
+    return _note_map
+
+
+def _in_vault(d):
+    return d == VAULT or d.startswith(VAULT + os.sep)
+
+
 def resolve_note(name, near_dir):
-    """basename → 実ファイル。近傍(同dir/親/親の親) → vault 全域の順で解決。"""
+    """basename → 実ファイル。近傍(同dir/親/親の親とその直下) → vault 全域の順で解決。
+
+    vault 内は note_map() の候補を近さで順位付けする (候補はふつう数件なのでディレクトリを探らない)。
+    名前の大文字小文字は区別せず、同じ近さなら表記が完全一致する候補を先にする。
+    vault 外の近傍 (repo 側のレポート等) だけ従来どおり glob で探る。
+    """
     fname = name + ".md"
+    folded = (os.sep + fname).casefold()
+    cands = [p for p in note_map().get(fname.rsplit("/", 1)[-1][:-3].casefold(), ())
+             if p.casefold().endswith(folded)]
+    cands.sort(key=lambda p: not p.endswith(os.sep + fname))  # 安定ソート: 各表記の中は path 順のまま
     d = near_dir
     for _ in range(3):
-        for cand in (os.path.join(d, fname), *glob.glob(os.path.join(d, "*", fname))):
-            if os.path.isfile(cand):
-                return cand
+        if _in_vault(d):
+            dk = d.casefold()
+            near = [p for p in cands if p[:-len(fname) - 1].casefold() == dk
+                    or os.path.dirname(p[:-len(fname) - 1]).casefold() == dk]
+            # 同dir 直下を優先・次に1段下 (従来の d/fname → glob(d/*/fname) の順)・同じ段は完全一致が先
+            for cand in sorted(near, key=lambda p: (p[:-len(fname) - 1].casefold() != dk,
+                                                    not p.endswith(os.sep + fname), p)):
+                if os.path.isfile(cand):
+                    return cand
+        else:
+            for cand in (os.path.join(d, fname), *sorted(glob.glob(os.path.join(d, "*", fname)))):
+                if os.path.isfile(cand):
+                    return cand
         d = os.path.dirname(d)
-    hits = glob.glob(os.path.join(VAULT, "**", fname), recursive=True)
-    hits = [h for h in hits if os.path.isfile(h) and "/.trash/" not in h]
-    return hits[0] if hits else None
+    for cand in cands:
+        if os.path.isfile(cand):
+            return cand
+    return None
 
 
 def check_file(path):
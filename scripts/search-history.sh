@@ -6,6 +6,8 @@
 #   search-history.sh --tool <name>              # tool_use frequency
 #   search-history.sh --stats                    # daily message stats
 #   search-history.sh --project <proj> <query>   # project-scoped
+#
+# bm25 順位・snippet・日付/role/tool 絞込み・ページング・JSON 出力は search_history.py を使う。
 
 set -euo pipefail
 DB="${HOME}/.claude/archives/index.db"
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""search_history.py — ~/.claude/archives/index.db (ingest-jsonl-to-sqlite.py 生成) の検索 API + CLI
+
+messages_fts を bm25 順で引き、snippet() でヒット箇所を強調して返す。
+絞込み: 日付範囲 / project(部分一致) / role / tool_name。
+ページング: keyset (--after に前ページの next_cursor を渡す。OFFSET を使わないので深いページでも一定コスト)。
+
+既定ではクエリ語をフレーズとして quote する（"-" や ":" を含む語で FTS5 構文エラーにしない）。
+DB の tokenizer (history_fts.py) に合わせて式を組む: bigram なら日本語部分は content_cjk の2-gram照合。
+FTS5 の演算子 (OR / NEAR / prefix*) を使うときは --raw。
+
+Usage:
+  python3 ~/.claude/scripts/search_history.py "query" [--since YYYY-MM-DD] [--until YYYY-MM-DD]
+      [--project P] [--role user|assistant] [--tool NAME] [--limit N] [--after CURSOR]
+      [--recent] [--raw] [--json] [--db PATH]
+
+API:
+  from search_history import search
+  page = search(db, "hook", project="claude", limit=20)
+  page["results"], page["next_cursor"]
+"""
+import argparse
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from history_fts import DEFAULT_TOKENIZER, current_tokenizer, match_expr
+
+DEFAULT_DB = Path.home() / ".claude" / "archives" / "index.db"
+DEFAULT_LIMIT = 20
+SNIPPET_TOKENS = 16
+HL_OPEN, HL_CLOSE = "[", "]"
+
+
+def encode_cursor(key, rowid):
+    return f"{key}:{rowid}"
+
+
+def decode_cursor(cursor):
+    # ts にも ":" が含まれるので末尾の ":" で分ける
+    key, _, rowid = cursor.rpartition(":")
+    return key, int(rowid)
+
+
+def search(db, query, *, since=None, until=None, project=None, role=None, tool=None,
+           limit=DEFAULT_LIMIT, after=None, recent=False, raw=False):
+    """FTS 検索 1ページ分。
+
+    返り値: {"results": [dict, ...], "next_cursor": str | None}
+    並び順: 既定は bm25 昇順(良い順)→id、recent=True は ts 降順→id 降順。
+    """
+    match = query if raw else match_expr(query, current_tokenizer(db) or DEFAULT_TOKENIZER)
+    where = ["messages_fts MATCH ?"]
+    params = [match]
+    if since:
+        where.append("m.date >= ?")
+        params.append(since)
+    if until:
+        where.append("m.date <= ?")
+        params.append(until)
+    if project:
+        where.append("m.project LIKE ?")
+        params.append(f"%{project}%")
+    if role:
+        where.append("m.role = ?")
+        params.append(role)
+    if tool:
+        where.append("m.tool_name = ?")
+        params.append(tool)
+
+    if recent:
+        key_col, order = "ts", "ts DESC, id DESC"
+        keyset = "(ts < ? OR (ts = ? AND id < ?))"
+    else:
+        key_col, order = "rank", "rank, id"
+        keyset = "(rank > ? OR (rank = ? AND id > ?))"
+
+    outer_where = ""
+    outer_params = []
+    if after:
+        key, rowid = decode_cursor(after)
+        if not recent:
+            key = float(key)
+        outer_where = "WHERE " + keyset
+        outer_params = [key, key, rowid]
+
+    sql = f"""
+        SELECT * FROM (
+            SELECT m.id AS id, m.date AS date, m.project AS project, m.session_id AS session_id,
+                   m.role AS role, COALESCE(m.ts, '') AS ts, m.tool_name AS tool_name,
+                   m.source_file AS source_file, m.line_no AS line_no,
+                   bm25(messages_fts) AS rank,
+                   snippet(messages_fts, 0, ?, ?, '…', {SNIPPET_TOKENS}) AS snippet
+            FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid
+            WHERE {' AND '.join(where)}
+        ) {outer_where}
+        ORDER BY {order}
+        LIMIT ?
+    """
+    cur = db.execute(sql, [HL_OPEN, HL_CLOSE] + params + outer_params + [limit + 1])
+    cols = [d[0] for d in cur.description]
+    rows = [dict(zip(cols, r)) for r in cur.fetchall()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        key = last[key_col] if recent else repr(last[key_col])
+        next_cursor = encode_cursor(key, last["id"])
+    return {"results": rows, "next_cursor": next_cursor}
+
+
+def print_human(page):
+    for r in page["results"]:
+        tool = f" [{r['tool_name']}]" if r["tool_name"] else ""
+        snip = " ".join((r["snippet"] or "").split())
+        print(f"{r['date']}  {r['project']}  {r['role']}{tool}  ({r['rank']:.2f})")
+        print(f"    {snip}")
+        print(f"    {r['source_file']}:{r['line_no']}")
+    if page["next_cursor"]:
+        print(f"next: --after '{page['next_cursor']}'", file=sys.stderr)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Search Claude Code history (index.db FTS5)")
+    ap.add_argument("query", nargs="+")
+    ap.add_argument("--db", default=str(DEFAULT_DB))
+    ap.add_argument("--since", help="date >= YYYY-MM-DD")
+    ap.add_argument("--until", help="date <= YYYY-MM-DD")
+    ap.add_argument("--project", help="project substring")
+    ap.add_argument("--role", choices=["user", "assistant"])
+    ap.add_argument("--tool", help="exact tool_name (e.g. Bash, Edit)")
+    ap.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    ap.add_argument("--after", help="next_cursor from the previous page")
+    ap.add_argument("--recent", action="store_true", help="newest first instead of bm25")
+    ap.add_argument("--raw", action="store_true", help="pass the query to FTS5 MATCH unquoted")
+    ap.add_argument("--json", action="store_true", help="JSON output")
+    args = ap.parse_args()
+
+    db_path = Path(args.db)
+    if not db_path.exists():
+        print(f"DB not found: {db_path}", file=sys.stderr)
+        print("Run: python3 ~/.claude/scripts/ingest-jsonl-to-sqlite.py", file=sys.stderr)
+        sys.exit(1)
+
+    db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        page = search(db, " ".join(args.query), since=args.since, until=args.until,
+                      project=args.project, role=args.role, tool=args.tool,
+                      limit=args.limit, after=args.after, recent=args.recent, raw=args.raw)
+    except (sqlite3.OperationalError, ValueError) as e:
+        print(f"query error: {e}", file=sys.stderr)
+        sys.exit(2)
+    finally:
+        db.close()
+
+    if args.json:
+        print(json.dumps(page, ensure_ascii=False, indent=2))
+    else:
+        print_human(page)
+
+
+if __name__ == "__main__":
+    main()
@@ -30,6 +30,9 @@ import re
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "hooks"))
+from _history_jsonl import load_jsonl  # noqa: E402
+
 SECTION_TITLE = "## 🔁 最新更新ログ (自動生成・β)"
 SECTION_OPEN_ISSUES = "## 📋 Open Issues"
 SECTION_LIFECYCLE = "## 施策サマリ一覧 (自動生成・β)"
@@ -61,14 +64,8 @@ HEURISTIC_MAP = [
 
 def cmd_list(session_id: str) -> int:
     log = Path.home() / ".claude" / "state" / "edit-history.jsonl"
-    if not log.exists():
-        return 0
     seen = {}
-    for line in log.read_text().splitlines():
-        try:
-            d = json.loads(line)
-        except Exception:
-            continue
+    for d in load_jsonl(log):  # .1 → 現行 (rotate 直後も同 session の前半を落とさない)
         if d.get("session") != session_id:
             continue
         f = d.get("file", "")
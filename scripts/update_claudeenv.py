@@ -719,11 +719,16 @@ FRESHNESS_TARGETS = [
 ]
 
 
-def stamp_freshness() -> list[str]:
-    """「この数字は何日前の窓か」を毎朝計算してマーカー行を更新 (fail-open)。"""
+def stamp_freshness(paths=None) -> list[str]:
+    """「この数字は何日前の窓か」を毎朝計算してマーカー行を更新 (fail-open)。
+
+    paths を渡すとそのうち FRESHNESS_TARGETS に入っているものだけ (vault_watch.py が変更ファイルで呼ぶ)。
+    """
     today = dt.date.today()
     changed = []
     for path in FRESHNESS_TARGETS:
+        if paths is not None and path not in paths:
+            continue
         try:
             if not path.exists():
                 continue
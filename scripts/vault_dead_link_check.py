@@ -5,122 +5,70 @@
 (旧 audit は wikilink ambiguity のみで検知不能だった)。
 
 (a) AI_adscrm 現役文書の [[wikilink]] → basename 実在照合 (aliases はリンクを解決しない)
+    実体は vault 全体の *.md (.trash を除く・隠しディレクトリ配下も含む)
 (b) vault→repo の file:// 実在 (自ユーザーのパスのみ・別Mac ユーザー名は除外)
 (c) repo→vault の file:// 逆参照 実在 (project-registry の root から repo を発見)
 
 除外: _archive/(歴史・切れ許容) / _INBOX(原文保存) / AGENTS・CLAUDE(自動生成) /
       *-result.md(runner 上書き出力) / symlink / code fence 内 / inline code 内
 出力: 1行1違反 (weekly-vault-audit.sh が violations に計上)
+--anchors: deep link [[note#見出し]] / [[note#^block]] のアンカー不在も dead-anchor: 行で出す。
+    見出しの照合は Obsidian の正規化の近似なので audit (引数なし) では出さない。手動の確認用。
+
+(a)(b)(c) とも link_graph.py のリンクグラフ (vault と各 repo root の索引・stat が変わったファイルだけ読み直す)
+への照会。repo を毎回 rglob + 全読みしない。
 """
-import os
-import re
-import urllib.parse
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from link_graph import LinkGraph  # noqa: E402
+
 HOME = Path.home()
 VAULT = HOME / "Documents/Obsidian Vault"
 # 検査対象プロジェクト（整理済みのものから順次追加・2026-07-17: make_article 追加）
 SCOPE_DIRS = [VAULT / "02_Ai/AI_adscrm", VAULT / "02_Ai/x-buzz"]
 
-WIKILINK = re.compile(r'!?\[\[([^\]|#]+)')
-FILEURI = re.compile(r'file://(/Users/[^)\s>"\'（」・]+)')
-INLINE_CODE = re.compile(r'`[^`]*`')
-ATTACH_EXT = re.compile(r'\.(png|jpe?g|gif|pdf|csv|svg|base|canvas|webp)$', re.I)
 
-
-def lines_outside_fence(p: Path):
-    try:
-        text = p.read_text(encoding="utf-8", errors="ignore")
-    except Exception:
-        return []
-    out, fence = [], False
-    for ln in text.splitlines():
-        if ln.strip().startswith("```"):
-            fence = not fence
+def scope_rows(index):
+    """検査対象ノートの索引行 (path 順)。"""
+    prefixes = tuple(str(scope.relative_to(VAULT)) + "/" for scope in SCOPE_DIRS)
+    for row in index.rows():
+        rel = row["path"]
+        if not rel.startswith(prefixes) or row["symlink"]:
             continue
-        if not fence:
-            out.append(INLINE_CODE.sub("", ln))  # inline code 内の [[例]] を除外
-    return out
-
-
-def scope_files():
-    for scope in SCOPE_DIRS:
-        yield from _scope_files_one(scope)
-
-
-def _scope_files_one(SCOPE):
-    for p in SCOPE.rglob("*.md"):
-        if p.is_symlink():
-            continue
-        if "_archive" in p.parts or "prompts" in p.parts:
+        parts = rel.split("/")
+        if "_archive" in parts or "prompts" in parts:
             continue
-        if p.name.endswith("_INBOX.md") or p.name in ("AGENTS.md", "CLAUDE.md"):
+        name = parts[-1]
+        if name.endswith("_INBOX.md") or name in ("AGENTS.md", "CLAUDE.md"):
             continue
-        if p.name.endswith("-result.md"):  # runner 上書き出力 (自動生成)
+        if name.endswith("-result.md"):  # runner 上書き出力 (自動生成)
             continue
-        yield p
+        yield row
 
 
 def main():
-    basenames = set()
-    for p in VAULT.rglob("*.md"):
-        if ".trash" in p.parts:
-            continue
-        basenames.add(p.stem)
-
-    # (a) dead wikilink + (b) vault→repo file://
-    for p in scope_files():
-        rel = p.relative_to(VAULT)
-        for ln in lines_outside_fence(p):
-            for m in WIKILINK.finditer(ln):
-                t = m.group(1).strip().rstrip("\\")  # 表セル内 \| エスケープの \ を除去
-                if not t or t.startswith("#"):
-                    continue
-                if ATTACH_EXT.search(t):
-                    continue
-                base = t.split("/")[-1]
-                if base.endswith(".md"):
-                    base = base[:-3]
-                if base not in basenames:
-                    print(f"dead-wikilink: {rel} → [[{t}]] の実体なし (aliases はリンクを解決しない・rules/41 §④ 張替え必須)")
-            for m in FILEURI.finditer(ln):
-                path = urllib.parse.unquote(m.group(1)).split("#")[0].rstrip("/").rstrip("`")  # #見出しフラグメントは存在判定から除外
-                if not path.startswith(str(HOME) + "/"):
-                    continue
-                if not os.path.exists(path):
-                    print(f"dead-filelink(vault→repo): {rel} → {path} 不在")
-
-    # (c) repo→vault 逆参照
-    reg = VAULT / "wiki/meta/project-registry.md"
-    roots = []
-    if reg.exists():
-        for m in re.finditer(r'\*\*root\*\*: `([^`]+)`', reg.read_text(encoding="utf-8", errors="ignore")):
-            r = m.group(1)
-            if r.startswith("~"):
-                r = str(HOME) + r[1:]
-            if os.path.isdir(r):
-                roots.append(r)
-    seen = set()
-    for r in roots:
-        for p in Path(r).rglob("*.md"):
-            if ".git" in p.parts or "node_modules" in p.parts or "archive" in p.parts:
-                continue
-            try:
-                text = p.read_text(encoding="utf-8", errors="ignore")
-            except Exception:
-                continue
-            if "Obsidian" not in text:
-                continue
-            for m in FILEURI.finditer(text):
-                path = urllib.parse.unquote(m.group(1)).split("#")[0].rstrip("/")
-                if "Obsidian Vault" not in path or not path.startswith(str(HOME) + "/"):
-                    continue
-                key = (str(p), path)
-                if key in seen:
-                    continue
-                seen.add(key)
-                if not os.path.exists(path):
-                    print(f"dead-filelink(repo→vault): {p} → {path} 不在")
+    anchors = "--anchors" in sys.argv[1:]
+    graph = LinkGraph(VAULT)
+    try:
+        graph.refresh()
+        # (a) dead wikilink (+ --anchors) + (b) vault→repo file:// (リンクは code fence / inline code 外・出現順)
+        scope = {row["path"] for row in scope_rows(graph.vault)}
+        for d in graph.dead_links(scope, anchors=anchors):
+            rel, t = d["src"], d["target"]
+            if d["problem"] == "note":
+                print(f"dead-wikilink: {rel} → [[{t}]] の実体なし (aliases はリンクを解決しない・rules/41 §④ 張替え必須)")
+            elif d["problem"] == "anchor":
+                print(f"dead-anchor: {rel} → [[{t}#{d['anchor']}]] の見出し/ブロックなし")
+            else:
+                print(f"dead-filelink(vault→repo): {rel} → {t} 不在")
+
+        # (c) repo→vault 逆参照
+        for src, path in graph.repo_dead_links():
+            print(f"dead-filelink(repo→vault): {src} → {path} 不在")
+    finally:
+        graph.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,408 @@
+"""vault_index.py — Obsidian vault のメタデータ索引 (SQLite・asa-board-gen.py / vault_dead_link_check.py /
+report_action_presence_gate.py / link_graph.py で共有)
+
+vault 配下の *.md を1ファイル1行 (vault 相対パスが主キー) で持ち、(mtime_ns, size) が変わったファイルだけ
+読み直す。各スクリプトは vault を自前で rglob + 全読みせず、この索引を引く。
+
+1行に持つもの (抽出規則は従来の各スクリプトの実装をそのまま移したもの):
+  stem / symlink / error    basename・symlink か・読込失敗の例外名 (失敗行は次回も読み直す)
+  frontmatter               先頭 --- ブロックの top-level key → 値 (リストは list)
+  headings / blocks         見出し文字列・block-id (report_action_presence_gate のアンカー照合)
+  check_wait                "✅待ち" を含む本文行 (fence・引用行を除く・先頭60字)
+  blue                      *_INBOX.md の 🔵 節の案件行 (テンプレ行・HTML コメントを除く・先頭60字)
+リンクは別表 edges に1リンク1行 (src, 出現順 seq) で持つ:
+  kind                      wikilink / embed (![[…]]) / file (file://)
+  target / stem / anchor    リンク先 (file は unquote 済みの絶対パス)・その basename (拡張子なし)・#以降
+  in_code                   code fence / inline code 内の例示か (vault の検査は 0 だけを見る)
+
+vault 以外 (repo root 等) も root を変えて同じ索引を作れる (prune で降りないディレクトリを足す)。
+
+索引は ~/.claude/state/vault-index/<root パスの sha16>.db (置き場所は VAULT_INDEX_DIR で上書き可)。
+開けない環境 (read-only HOME 等) ではメモリ上の索引で同じ結果を返す (永続化しないだけ)。
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import stat as stat_mod
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+STATE_DIR = Path.home() / ".claude" / "state" / "vault-index"
+PARSER_VERSION = "2"  # 抽出規則・表定義を変えたら上げる (表を作り直して全部読み直す)
+PRUNE_DIRS = {".git"}  # *.md を置かない巨大ディレクトリは降りない
+# 読み直しの並列度。同期フォルダ (iCloud 等) 上の vault は1ファイルごとの読込待ちが支配的なので
+# スレッドで重ねる (抽出は GIL 下でも読込待ちと重なる)。1 なら逐次
+READ_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+
+# --- 抽出規則 ---------------------------------------------------------------
+
+WIKILINK = re.compile(r'(!?)\[\[([^\]|#]+)(?:#([^\]|]*))?')
+FILEURI = re.compile(r'file://(/Users/[^)\s>"\'（」・]+)')
+INLINE_CODE = re.compile(r'`[^`]*`')
+HEADING = re.compile(r"#{1,6}\s+(.*)")
+# block id は独立行 (`^id`) と行末付記 (`本文 ^id`) の両記法が正 (Obsidian 仕様)
+BLOCK_ID = re.compile(r"(?:^|\s)\^([A-Za-z0-9-]+)\s*$")
+HTML_COMMENT = re.compile(r"<!--.*?-->", re.S)
+FM_KEY = re.compile(r"^([A-Za-z0-9_][\w-]*):\s*(.*)$")
+CHECK_WAIT = "✅待ち"
+# 全 INBOX 共通のテンプレ行（セクション見出し・使い方説明）。案件ではない
+INBOX_TEMPLATE_PATTERNS = ("投函🔵 → 記録📒", "INBOX見て", "やってほしいことを 🔵 に貼り")
+
+
+def content_lines(text: str):
+    """fenced code block（``` 内）と引用行（> 開始）を除いた行を yield する。"""
+    in_fence = False
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            in_fence = not in_fence
+            continue
+        if in_fence:
+            continue
+        if stripped.startswith(">"):
+            continue
+        yield line
+
+
+def parse_frontmatter(text: str) -> dict:
+    if not text.startswith("---\n"):
+        return {}
+    end = text.find("\n---", 3)
+    if end == -1:
+        return {}
+    fm, key = {}, None
+    for line in text[4:end].splitlines():
+        m = FM_KEY.match(line)
+        if m:
+            key = m.group(1)
+            fm[key] = m.group(2).strip().strip("\"'")
+        elif key and line.lstrip().startswith("- "):
+            if not isinstance(fm[key], list):
+                fm[key] = []
+            fm[key].append(line.lstrip()[2:].strip().strip("\"'"))
+    return fm
+
+
+def parse_targets(text: str):
+    """(見出し, block-id)。fence 内も含め全行から拾う (従来の link_targets と同じ)。"""
+    hs, blocks = [], []
+    for line in text.splitlines():
+        m = HEADING.match(line)
+        if m:
+            hs.append(m.group(1).strip())
+        m2 = BLOCK_ID.search(line.rstrip())
+        if m2:
+            blocks.append(m2.group(1))
+    return hs, blocks
+
+
+def _stem(target: str) -> str:
+    base = target.rsplit("/", 1)[-1]
+    return base[:-3] if base.endswith(".md") else base
+
+
+def parse_links(text: str):
+    """[kind, target, stem, anchor, in_code] を出現順 (行ごとに wikilink/embed → file://)。
+
+    正規化は従来の vault_dead_link_check と同じ: wikilink は表セル内 \\| エスケープの \\ を除去、
+    file:// は unquote して #フラグメントを anchor に分け、末尾の / と ` を落とす。
+    """
+    links, fence = [], False
+    for ln in text.splitlines():
+        if ln.strip().startswith("```"):
+            fence = not fence
+            continue
+        code = [m.span() for m in INLINE_CODE.finditer(ln)] if not fence else []
+
+        def in_code(m):
+            return int(fence or any(a <= m.start() < b for a, b in code))
+
+        for m in WIKILINK.finditer(ln):
+            t = m.group(2).strip().rstrip("\\")
+            if not t:
+                continue
+            anchor = (m.group(3) or "").rstrip("\\").strip() or None
+            links.append(["embed" if m.group(1) else "wikilink", t, _stem(t), anchor, in_code(m)])
+        for m in FILEURI.finditer(ln):
+            path, _, frag = urllib.parse.unquote(m.group(1)).partition("#")
+            t = path.rstrip("/").rstrip("`")
+            links.append(["file", t, _stem(t), frag.rstrip("`") or None, in_code(m)])
+    return links
+
+
+def parse_check_wait(text: str):
+    return [line.strip()[:60] for line in content_lines(text) if CHECK_WAIT in line]
+
+
+def parse_inbox_blue(text: str):
+    """INBOX の実案件行: 🔵 見出しの節内だけ・テンプレ行と HTML コメント (投函例示) を除く。"""
+    matched = []
+    in_blue_section = False
+    for line in content_lines(HTML_COMMENT.sub("", text)):
+        s = line.strip()
+        if s.startswith("#"):
+            in_blue_section = "🔵" in s
+            continue
+        if not in_blue_section or not s:
+            continue
+        if s.startswith(">") or s in ("---", "***"):
+            continue
+        if any(pat in s for pat in INBOX_TEMPLATE_PATTERNS):
+            continue
+        matched.append(s[:60])
+    return matched
+
+
+def parse_file(rel: str, data: bytes):
+    """bytes → (error, 列 dict)。UTF-8 でなければ error を立てつつ errors=ignore で抽出は続ける。"""
+    error = None
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        error = "UnicodeDecodeError"
+        text = data.decode("utf-8", errors="ignore")
+    text = text.replace("\r\n", "\n").replace("\r", "\n")  # read_text() の universal newlines と揃える
+    hs, blocks = parse_targets(text)
+    return error, {
+        "frontmatter": parse_frontmatter(text),
+        "headings": hs,
+        "blocks": blocks,
+        "links": parse_links(text),
+        "check_wait": parse_check_wait(text),
+        "blue": parse_inbox_blue(text) if rel.endswith("_INBOX.md") else [],
+    }
+
+
+# --- 索引 -------------------------------------------------------------------
+
+JSON_COLUMNS = ("frontmatter", "headings", "blocks", "check_wait", "blue")
+
+
+class VaultIndex:
+    """vault 1つぶんの索引。refresh() で全体を stat して差分だけ読み直す。entry() は1ファイルだけ追従。"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY,
+        stem TEXT NOT NULL,
+        mtime_ns INTEGER,
+        size INTEGER,
+        symlink INTEGER NOT NULL,
+        error TEXT,
+        frontmatter TEXT, headings TEXT, blocks TEXT, check_wait TEXT, blue TEXT
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS files_stem ON files (stem);
+    CREATE TABLE IF NOT EXISTS edges (
+        src TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        target TEXT NOT NULL,
+        stem TEXT NOT NULL,
+        anchor TEXT,
+        in_code INTEGER NOT NULL,
+        PRIMARY KEY (src, seq)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS edges_stem ON edges (stem);
+    CREATE INDEX IF NOT EXISTS edges_target ON edges (target);
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+    """
+
+    def __init__(self, root, db_path=None, prune=PRUNE_DIRS):
+        self.root = Path(root)
+        self.prune = frozenset(prune)
+        self.stats = {"walked": 0, "parsed": 0, "removed": 0}
+        self.changed = []  # 直近の refresh() / update() で読み直した・消した path
+        self.refreshed = False
+        try:
+            self.db = self._open(db_path or self.default_db(self.root))
+        except (OSError, sqlite3.Error):
+            self.db = self._open(":memory:")
+
+    @staticmethod
+    def default_db(root):
+        key = hashlib.sha256(str(Path(root).absolute()).encode()).hexdigest()[:16]
+        return str(Path(os.environ.get("VAULT_INDEX_DIR") or STATE_DIR) / f"{key}.db")
+
+    def _open(self, path):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        if path != ":memory:":
+            db.execute("PRAGMA journal_mode=WAL")
+        db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID")
+        row = db.execute("SELECT value FROM meta WHERE key = 'parser'").fetchone()
+        if not row or row[0] != PARSER_VERSION:
+            db.execute("DROP TABLE IF EXISTS files")
+            db.execute("DROP TABLE IF EXISTS edges")
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('parser', ?)", (PARSER_VERSION,))
+        db.executescript(self.SCHEMA)
+        return db
+
+    def close(self):
+        self.db.close()
+
+    # --- 更新 ---
+
+    def _walk(self, d, prefix):
+        """(rel, is_symlink, stat or None) — rglob("*.md") と同じく symlink ディレクトリには降りない。"""
+        try:
+            it = os.scandir(d)
+        except OSError:
+            return
+        with it:
+            entries = list(it)
+        for e in entries:
+            rel = prefix + e.name
+            try:
+                is_dir = e.is_dir(follow_symlinks=False)
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if e.name not in self.prune:
+                    yield from self._walk(e.path, rel + "/")
+                continue
+            if not e.name.endswith(".md"):
+                continue
+            try:
+                st = e.stat()
+            except OSError:
+                st = None
+            if st is not None and stat_mod.S_ISDIR(st.st_mode):
+                continue
+            yield rel, e.is_symlink(), st
+
+    def _row(self, rel, is_link, st):
+        """読み直した (files の1行, edges の行リスト)。読めなければ mtime/size を NULL にして次回も読み直す。"""
+        stem = rel.rsplit("/", 1)[-1][:-3]
+        cols = dict.fromkeys(JSON_COLUMNS + ("links",))
+        error = None
+        if st is None:
+            error = "FileNotFoundError"
+        else:
+            try:
+                with open(os.path.join(self.root, rel), "rb") as f:
+                    data = f.read()
+                error, cols = parse_file(rel, data)
+            except OSError as e:
+                error = e.__class__.__name__
+        keep = error is None or error == "UnicodeDecodeError"
+        row = (rel, stem,
+               st.st_mtime_ns if st is not None and keep else None,
+               st.st_size if st is not None and keep else None,
+               int(is_link), error,
+               *(json.dumps(cols[c], ensure_ascii=False) if cols[c] is not None else None for c in JSON_COLUMNS))
+        return row, [(rel, seq, *link) for seq, link in enumerate(cols["links"] or ())]
+
+    def _store(self, parsed, gone=()):
+        """_row() の結果を書き込み、gone の行を消す (edges も一緒に差し替える)。
+
+        1トランザクション: 途中で落ちても files だけ新しく edges が無い行は残らない
+        (残ると mtime/size が一致して二度と読み直されない)。同時に走る refresh() / update() とも混ざらない。"""
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self.db.executemany("DELETE FROM edges WHERE src = ?",
+                                [(r[0],) for r, _ in parsed] + [(p,) for p in gone])
+            self.db.executemany("INSERT OR REPLACE INTO files VALUES (%s)" % ",".join("?" * (6 + len(JSON_COLUMNS))),
+                                [r for r, _ in parsed])
+            self.db.executemany("INSERT INTO edges VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                [e for _, es in parsed for e in es])
+            self.db.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in gone])
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def _read_rows(self, todo):
+        """todo [(rel, is_link, st)] を読み直した行を todo と同じ順で返す (READ_WORKERS 並列・DB には触らない)。"""
+        workers = min(READ_WORKERS, len(todo))
+        if workers <= 1:
+            return [self._row(*t) for t in todo]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda t: self._row(*t), todo))
+
+    def refresh(self):
+        """vault 全体を stat し、新規・変更・読込失敗だった行を読み直し、消えた行を消す。"""
+        known = {p: (m, s, l) for p, m, s, l in self.db.execute("SELECT path, mtime_ns, size, symlink FROM files")}
+        seen = set()
+        todo = []
+        for rel, is_link, st in self._walk(str(self.root), ""):
+            seen.add(rel)
+            old = known.get(rel)
+            if (old is not None and st is not None and old[0] == st.st_mtime_ns
+                    and old[1] == st.st_size and old[2] == int(is_link)):
+                continue
+            todo.append((rel, is_link, st))
+        rows = self._read_rows(todo)
+        gone = [p for p in known if p not in seen]
+        if rows or gone:
+            self._store(rows, gone)
+        self.stats = {"walked": len(seen), "parsed": len(rows), "removed": len(gone)}
+        self.changed = sorted([r[0] for r, _ in rows] + gone)
+        self.refreshed = True
+        return self.stats
+
+    def _sync_one(self, rel):
+        """1ファイルだけ stat して追従。戻り値: "parsed" / "removed" / None (変化なし)。"""
+        path = os.path.join(self.root, rel)
+        try:
+            st = os.stat(path)
+            is_link = os.path.islink(path)
+        except OSError:
+            st = None
+        row = self.db.execute("SELECT mtime_ns, size, symlink FROM files WHERE path = ?", (rel,)).fetchone()
+        if st is None or stat_mod.S_ISDIR(st.st_mode):
+            if row is None:
+                return None
+            self._store([], [rel])
+            return "removed"
+        if row == (st.st_mtime_ns, st.st_size, int(is_link)):
+            return None
+        self._store([self._row(rel, is_link, st)])
+        return "parsed"
+
+    def entry(self, rel):
+        """1ファイルだけ stat して (変わっていれば読み直して) 行を返す。無ければ None。"""
+        self._sync_one(rel)
+        return next(self.rows("*", where="path = ?", params=(rel,)), None)
+
+    def update(self, rels):
+        """指定ファイルだけ追従する (監視イベント用・vault_watch.py)。stats は refresh() と同じ形。"""
+        rels = sorted(set(rels))
+        done = [self._sync_one(rel) for rel in rels]
+        self.changed = [rel for rel, d in zip(rels, done) if d]
+        self.stats = {"walked": self.db.execute("SELECT COUNT(*) FROM files").fetchone()[0],
+                      "parsed": done.count("parsed"), "removed": done.count("removed")}
+        return self.stats
+
+    # --- 照会 ---
+
+    def rows(self, *columns, where=None, params=()):
+        """dict を path 順に yield (JSON 列は復元済み)。columns が "*" なら全列。"""
+        cols = ("path", "stem", "symlink", "error") + (JSON_COLUMNS if columns == ("*",) else columns)
+        sql = "SELECT %s FROM files" % ", ".join(cols)
+        if where:
+            sql += " WHERE " + where
+        for r in self.db.execute(sql + " ORDER BY path", params):
+            d = dict(zip(cols, r))
+            for c in JSON_COLUMNS:
+                if c in d:
+                    d[c] = json.loads(d[c]) if d[c] is not None else ([] if c != "frontmatter" else {})
+            yield d
+
+    def by_stem(self, stem):
+        """basename (拡張子なし) が stem の vault 相対パス (path 順)。"""
+        return [p for (p,) in self.db.execute("SELECT path FROM files WHERE stem = ? ORDER BY path", (stem,))]
+
+    def stems(self, where=None, params=()):
+        sql = "SELECT DISTINCT stem FROM files" + (" WHERE " + where if where else "")
+        return {s for (s,) in self.db.execute(sql, params)}
+
+    def edges(self, where=None, params=()):
+        """リンクを dict で (src, seq) 順に yield (link_graph.py の照会の素)。"""
+        cols = ("src", "seq", "kind", "target", "stem", "anchor", "in_code")
+        sql = "SELECT %s FROM edges" % ", ".join(cols) + (" WHERE " + where if where else "")
+        for r in self.db.execute(sql + " ORDER BY src, seq", params):
+            yield dict(zip(cols, r))
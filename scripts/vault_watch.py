@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""vault_watch.py — vault の *.md 変更を監視し、asa-board.md を差分で再生成する常駐プロセス (任意)
+
+asa-board-gen.py は SessionStart (6時間キャッシュ) でしか走らず、ボードが最大で数時間古い。
+常駐させたいときだけこれを起動する (launchd 登録はしない・止めれば従来どおり)。
+
+- Linux: inotify (ctypes・外部依存なし) で vault 配下のディレクトリを監視し、変わったファイルだけ
+  vault_index.VaultIndex.update() で読み直す。ディレクトリの作成・移動・削除と取りこぼし
+  (IN_Q_OVERFLOW) のときだけ refresh() (全体 stat・変わったファイルだけ読む) に落とす。
+  watch の上限超過 (ENOSPC = fs.inotify.max_user_watches / ENOMEM) で張れない配下が出たら
+  ポーリングへ切り替える (起動時なら最初から・監視中なら次の wait から)。
+- それ以外 (macOS 等) / --poll 指定: POLL_SECONDS ごとに refresh()。
+- 1回の変更でイベントが連発するので、最初のイベントから DEBOUNCE_SECONDS 待ってまとめる
+  (編集から再生成まで 1秒以内)。
+- 再生成は asa-board-gen.render() (🔵 / ✅待ち は索引の抽出結果・未変更ファイルは読まない)。
+  自分が書いた asa-board.md は索引に吸わせてから次を待つ (自分の書込みで再生成が回らない)。
+- 変わったファイルが update_claudeenv.FRESHNESS_TARGETS なら、その1枚だけ鮮度行を打ち直す。
+  collector-health.md (--target health) の入力は launchd 状態と .raw 配下なので、従来どおり daily に任せる。
+
+単一インスタンス (~/.claude/state/vault-watch.lock を flock)。再生成の失敗は stderr に出して監視を続ける。
+
+使い方: python3 ~/.claude/scripts/vault_watch.py [--poll [SECONDS]]
+"""
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import fcntl
+import importlib.util
+import os
+import select
+import struct
+import sys
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from vault_index import PRUNE_DIRS, VaultIndex  # noqa: E402
+
+STATE_DIR = Path.home() / ".claude" / "state"
+LOCK_PATH = STATE_DIR / "vault-watch.lock"
+POLL_SECONDS = 1.0
+DEBOUNCE_SECONDS = 0.2
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (+ name[len])
+
+
+def load_board_gen():
+    spec = importlib.util.spec_from_file_location("asa_board_gen", Path(__file__).parent / "asa-board-gen.py")
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def log(msg):
+    print(f"[vault-watch] {datetime.now():%H:%M:%S} {msg}", flush=True)
+
+
+class PollWatcher:
+    """POLL_SECONDS ごとに「全体 stat して」と返すだけ (ファイルの中身は索引が必要なぶんしか読まない)。"""
+
+    name = "poll"
+    degraded = False
+
+    def __init__(self, root, interval=POLL_SECONDS):
+        self.interval = interval
+
+    def wait(self):
+        time.sleep(self.interval)
+        return set(), True
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """vault 配下の全ディレクトリに inotify watch を張る。wait() → (変わった *.md の相対パス, 全体 stat 要否)。"""
+
+    name = "inotify"
+
+    def __init__(self, root):
+        """watch を張りきれなければ (上限超過) OSError — 呼び出し側はポーリングに落とす。"""
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is Linux only")
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.root = str(root)
+        self.dirs = {}  # wd → 相対ディレクトリ ("" = vault 直下)
+        self.degraded = False  # 監視中に watch を張りきれなかった → watch() がポーリングへ切り替える
+        try:
+            self._add_tree(self.root, "")
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def _add_tree(self, path, rel):
+        """VaultIndex._walk と同じ範囲 (symlink ディレクトリ・PRUNE_DIRS には降りない)。
+        上限超過 (ENOSPC / ENOMEM) は OSError — 張れなかった配下は変更が届かないので黙って続けない。"""
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOSPC, errno.ENOMEM):
+                raise OSError(err, "inotify_add_watch: %s (fs.inotify.max_user_watches)" % os.strerror(err), path)
+            if err not in (errno.ENOENT, errno.ENOTDIR):  # 走査中に消えたものは親の IN_DELETE で足りる
+                log(f"watch できず ({os.strerror(err)}): {rel or '.'}")
+            return
+        self.dirs[wd] = rel
+        try:
+            it = os.scandir(path)
+        except OSError:
+            return
+        with it:
+            subdirs = [e for e in it if e.name not in PRUNE_DIRS and e.is_dir(follow_symlinks=False)]
+        for e in subdirs:
+            self._add_tree(e.path, rel + e.name + "/")
+
+    def _read(self, rels):
+        """溜まったイベントを読み切る。戻り値: 全体 stat が要るか。"""
+        rescan = False
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return rescan
+            pos = 0
+            while pos < len(buf):
+                wd, mask, _cookie, size = EVENT.unpack_from(buf, pos)
+                name = buf[pos + EVENT.size:pos + EVENT.size + size].split(b"\0", 1)[0].decode("utf-8", "surrogateescape")
+                pos += EVENT.size + size
+                if mask & IN_Q_OVERFLOW:
+                    rescan = True
+                    continue
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                parent = self.dirs.get(wd)
+                if parent is None:
+                    continue
+                if mask & IN_ISDIR:
+                    # ディレクトリの出入りは配下ごと変わる → watch を張り直して全体 stat
+                    if mask & (IN_CREATE | IN_MOVED_TO) and name not in PRUNE_DIRS and not self.degraded:
+                        try:
+                            self._add_tree(os.path.join(self.root, parent, name), parent + name + "/")
+                        except OSError as e:
+                            log(f"inotify の watch 上限 — ポーリングに切り替え ({e})")
+                            self.degraded = True
+                    rescan = True
+                elif name.endswith(".md"):
+                    rels.add(parent + name)
+
+    def wait(self):
+        rels = set()
+        select.select([self.fd], [], [])
+        time.sleep(DEBOUNCE_SECONDS)
+        rescan = self._read(rels)
+        return rels, rescan
+
+    def close(self):
+        os.close(self.fd)
+
+
+def open_watcher(root, poll=None):
+    if poll is not None:
+        return PollWatcher(root, poll)
+    try:
+        return InotifyWatcher(root)
+    except AttributeError:  # libc に inotify が無い
+        return PollWatcher(root)
+    except OSError as e:  # Linux 以外・watch 上限超過
+        if sys.platform.startswith("linux"):
+            log(f"inotify を使えず ポーリングで監視 ({e})")
+        return PollWatcher(root)
+
+
+def freshness_stamper():
+    """update_claudeenv.stamp_freshness (読めなければ鮮度行は daily に任せる)。"""
+    try:
+        spec = importlib.util.spec_from_file_location("update_claudeenv", Path(__file__).parent / "update_claudeenv.py")
+        mod = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(mod)
+        return mod.stamp_freshness
+    except Exception:
+        return None
+
+
+def watch(poll=None):
+    board = load_board_gen()
+    stamp = freshness_stamper()
+    own = board.rel(board.BOARD)
+    index = VaultIndex(board.VAULT)
+    watcher = open_watcher(board.VAULT, poll)
+    try:
+        started = time.perf_counter()
+        stats = index.refresh()
+        changed = index.changed
+        log(f"監視開始 ({watcher.name}・{stats['walked']} 件)")
+        dirty = True  # 起動時は変更が無くても1回書く
+        while True:
+            if dirty:
+                try:
+                    if stamp is not None:
+                        stamp({board.VAULT / rel for rel in changed})
+                    summary = board.render(index, stats, started)
+                    log(f"{stats['parsed']} 件再解析・{stats['removed']} 件削除 → {summary or '台帳が読めず旧版を保持'}")
+                except Exception:
+                    sys.stderr.write(traceback.format_exc())
+                index.update([own])  # 自分の書込みは次の変更に数えない
+            rels, rescan = watcher.wait()
+            if watcher.degraded:  # 張れなかった配下の変更は届かない → 以後は全体 stat で拾う
+                watcher.close()
+                watcher = PollWatcher(board.VAULT)
+                rescan = True
+            started = time.perf_counter()
+            rels.discard(own)
+            stats = index.refresh() if rescan else index.update(rels)
+            changed = [rel for rel in index.changed if rel != own]
+            dirty = bool(changed)
+    finally:
+        watcher.close()
+        index.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="vault を監視して asa-board.md を差分で再生成する")
+    ap.add_argument("--poll", type=float, nargs="?", const=POLL_SECONDS, default=None, metavar="SECONDS",
+                    help="inotify を使わずポーリング (既定: inotify が使えなければ %.0f 秒ポーリング)" % POLL_SECONDS)
+    args = ap.parse_args()
+
+    os.makedirs(STATE_DIR, exist_ok=True)
+    lock = os.open(LOCK_PATH, os.O_CREAT | os.O_RDWR, 0o600)
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        print("[vault-watch] already running — skip")
+        return 0
+    try:
+        watch(args.poll)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
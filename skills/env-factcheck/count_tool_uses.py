@@ -10,17 +10,244 @@ Usage:
   python3 count_tool_uses.py --days 30 --type skill
   python3 count_tool_uses.py --days 30 --type edited-files
   python3 count_tool_uses.py --days 30 --type all --top 20
+  python3 count_tool_uses.py --days 30 --type all --raw     # rollup を使わず全走査（検証用）
+
+集計は ~/.claude/archives/tool-usage.db の日次 rollup (day × project × kind × name) から引く。
+起動時に窓内(mtime >= cutoff)の JSONL だけを前回の byte offset から追記分のみ読んで rollup に足す
+（縮んだ / 先頭が変わったファイルはそのファイルの寄与を消して再集計）。
+改行で終わらない末尾行は書き込み途中とみなして残す（files.size は読んだ所まで = 次回また読む）。
+mtime から SETTLE_SECONDS 経ったファイルでは、JSON として完結していれば数える。
+1ファイル分（カーソルの読み直し → 集計 → rollup 加算 → カーソル前進）は BEGIN IMMEDIATE の1トランザクション。
+同時に走った別セッションは前のファイルの COMMIT を待ってから進んだカーソルを読むので二重加算しない。
+読込失敗はそのファイル分を ROLLBACK（寄与の削除だけが残ることはない）。
+期間はレコードの timestamp 日付（UTC）で切る。--raw はファイル mtime で切る従来方式。
+
+走査は1パス: 各行を要求された counter 全部に同時に流す。counter ごとの needle
+（"tool_use" / "<command-name>" / "sessionId"）を含まない行は json decode しない。
+json decode するのは needle が "tool_use" / "<command-name>" に当たった行だけ。
+sessionId / timestamp（日付）は top-level の値だけを使う（tool_use input 等に入れ子で埋まった同名キーは拾わない）。
+ほぼ全行にある sessionId と日付は生の行から引く: `"key":"値"` の前に { [ が無い / 後ろに末尾以外の } ] が無い
+なら top-level と確定できる。確定できない行（前後とも入れ子がある等）だけ decode する。
+{…} の形の行は JSON として壊れているかまでは見ない。
 """
 from __future__ import annotations
-import argparse, json, os, re, sys, time
+import argparse, hashlib, json, os, re, sqlite3, sys, time
 from collections import Counter
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 PROJECTS_DIR = Path.home() / ".claude" / "projects"
+ROLLUP_DB = Path.home() / ".claude" / "archives" / "tool-usage.db"
+HEAD_BYTES = 4096
+# 改行なしの最終行を完結行とみなすまでの静止時間（mtime からの秒数・ingest-jsonl-to-sqlite.py と同じ）
+SETTLE_SECONDS = 300
+SKILL_PAT = re.compile(r"<command-name>/?([a-zA-Z0-9_\-:]+)</command-name>")
+EDIT_TOOLS = ("Edit", "Write", "NotebookEdit")
+DAY_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+# key → (needle, "key": "値" の正規表現)
+TOP_STR = {key: (b'"%s"' % key, re.compile(rb'"%s"\s*:\s*"([^"\\]*)"' % key)) for key in (b"sessionId", b"timestamp")}
+UNKNOWN = object()  # top-level の値をバイト列のままでは確定できない（decode する）
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    project TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    byte_offset INTEGER NOT NULL,
+    head_hash TEXT
+);
+-- kind: mcp(server) / builtin(tool) / skill / file(edited path) / session(sessionId)
+CREATE TABLE IF NOT EXISTS rollup (
+    file_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (file_id, day, kind, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rollup_day_kind ON rollup(day, kind);
+"""
+
+
+# ---- counters ----------------------------------------------------------------
+# needle を含む行だけ decode 済み dict (top-level レコード) が events() に渡る。
+
+def _tool_uses(d: dict):
+    content = (d.get("message") or {}).get("content")
+    if not isinstance(content, list):
+        return
+    for item in content:
+        if isinstance(item, dict) and item.get("type") == "tool_use":
+            yield item
+
+
+class McpCounter:
+    kind = "mcp"
+    needle = b'"tool_use"'
+
+    def events(self, d: dict):
+        for tu in _tool_uses(d):
+            name = tu.get("name") or ""
+            if name.startswith("mcp__"):
+                parts = name.split("__", 2)
+                if len(parts) >= 2:
+                    yield parts[1]
+
+
+class BuiltinCounter:
+    kind = "builtin"
+    needle = b'"tool_use"'
+
+    def events(self, d: dict):
+        for tu in _tool_uses(d):
+            name = tu.get("name") or ""
+            if name and not name.startswith("mcp__"):
+                yield name
+
+
+class EditedFileCounter:
+    kind = "file"
+    needle = b'"tool_use"'
+
+    def events(self, d: dict):
+        for tu in _tool_uses(d):
+            if (tu.get("name") or "") not in EDIT_TOOLS:
+                continue
+            inp = tu.get("input") or {}
+            fp = inp.get("file_path") or inp.get("notebook_path")
+            if fp:
+                yield fp
+
+
+class SkillCounter:
+    """<command-name>/skill-name</command-name> タグで識別"""
+    kind = "skill"
+    needle = b"<command-name>"
+
+    def events(self, d: dict):
+        content = (d.get("message") or {}).get("content")
+        texts = []
+        if isinstance(content, str):
+            texts.append(content)
+        elif isinstance(content, list):
+            for item in content:
+                if isinstance(item, dict) and item.get("type") == "text":
+                    texts.append(item.get("text") or "")
+        for t in texts:
+            yield from SKILL_PAT.findall(t)
+
+
+class SessionCounter:
+    kind = "session"
+    needle = b'"sessionId"'
+
+    def peek(self, raw: bytes):
+        """decode せずに引ければ [sessionId] / []、確定できなければ UNKNOWN。"""
+        sid = top_level_str(raw, b"sessionId")
+        if sid is UNKNOWN:
+            return UNKNOWN
+        return [sid] if sid else []
+
+    def events(self, d: dict):
+        sid = d.get("sessionId")
+        if isinstance(sid, str) and sid:
+            yield sid
+
+
+COUNTERS = (McpCounter(), BuiltinCounter(), SkillCounter(), EditedFileCounter(), SessionCounter())
+TYPE_KINDS = {"mcp": ("mcp",), "builtin": ("builtin",), "skill": ("skill",),
+              "edited-files": ("file",), "sessions": ("session",),
+              "all": ("mcp", "builtin", "skill", "file", "session")}
+
 
+class ScanStats:
+    def __init__(self):
+        self.bytes = self.records = self.decoded = self.files = 0
+        self.t0 = time.perf_counter()
 
-def iter_jsonl(days: int):
+    def report(self, label: str) -> str:
+        dt = max(time.perf_counter() - self.t0, 1e-9)
+        return (f"({label}: {self.files} files, {self.bytes / 1e6:.1f} MB, {self.records} records "
+                f"[{self.decoded} decoded] in {dt:.2f}s — {self.bytes / 1e6 / dt:.1f} MB/s, "
+                f"{self.records / dt:,.0f} records/s)")
+
+
+def top_level_str(raw: bytes, key: bytes):
+    """{…} 1行の top-level の "key": "文字列" を decode せずに引く。
+    戻り値: 値 / None（key がどこにも無い）/ UNKNOWN（入れ子と区別できない・文字列でない・エスケープ入り）。
+    key の一致は JSON では常にキー（文字列中の " は \\ 付き）なので、入れ子の深さだけ前後の括弧で確かめる。"""
+    needle, value_re = TOP_STR[key]
+    pos = raw.find(needle)
+    if pos < 0:
+        return None
+    body = raw.rstrip()
+    if body[:1] != b"{" or body[-1:] != b"}":
+        return UNKNOWN
+    last = len(body) - 1
+    while pos >= 0:
+        m = value_re.match(body, pos)
+        # 括弧は bytes.find で探す（正規表現の文字クラスより桁違いに速い）
+        if m and ((body.find(b"{", 1, pos) < 0 and body.find(b"[", 1, pos) < 0)
+                  or (body.find(b"}", m.end(), last) < 0 and body.find(b"]", m.end(), last) < 0)):
+            try:
+                return m.group(1).decode()
+            except UnicodeDecodeError:
+                return UNKNOWN
+        pos = body.find(needle, pos + 1)
+    return UNKNOWN
+
+
+def record_day(d: dict) -> str | None:
+    """top-level timestamp の日付 (YYYY-MM-DD)。無ければ None。"""
+    ts = d.get("timestamp")
+    if isinstance(ts, str) and DAY_RE.match(ts):
+        return ts[:10]
+    return None
+
+
+def _decode(raw: bytes, stats: ScanStats) -> dict | None:
+    try:
+        d = json.loads(raw)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    stats.decoded += 1
+    return d if isinstance(d, dict) else None
+
+
+def line_events(raw: bytes, counters, stats: ScanStats) -> tuple[str | None, list]:
+    """1行 → (top-level timestamp の日付 | None, [(kind, name)])。
+    needle が当たった counter だけ見る。peek（生の行から引く）で確定しない時だけ1回 decode して全 counter で共有。"""
+    d = None
+    out = []
+    for c in counters:
+        if c.needle not in raw:
+            continue
+        names = c.peek(raw) if hasattr(c, "peek") else UNKNOWN
+        if names is UNKNOWN:
+            if d is None:
+                d = _decode(raw, stats)
+                if d is None:
+                    return None, []
+            names = c.events(d)
+        out.extend((c.kind, name) for name in names)
+    if not out or d is not None:
+        return (record_day(d) if d is not None else None), out
+    ts = top_level_str(raw, b"timestamp")
+    if ts is UNKNOWN:
+        d = _decode(raw, stats)
+        if d is None:
+            return None, []
+        return record_day(d), out
+    return (ts[:10] if ts and DAY_RE.match(ts) else None), out
+
+
+def scan_raw(days: int, counters) -> tuple[dict, ScanStats]:
+    """--raw: mtime が窓内のファイルを全行1パス走査。"""
     cutoff = time.time() - days * 86400
+    out = {c.kind: Counter() for c in counters}
+    stats = ScanStats()
     for fp in PROJECTS_DIR.rglob("*.jsonl"):
         try:
             if fp.stat().st_mtime < cutoff:
@@ -28,91 +255,140 @@ def iter_jsonl(days: int):
         except OSError:
             continue
         try:
-            with fp.open() as f:
-                for line in f:
-                    try:
-                        yield json.loads(line)
-                    except json.JSONDecodeError:
-                        continue
+            with fp.open("rb") as f:
+                stats.files += 1
+                for raw in f:
+                    stats.bytes += len(raw)
+                    stats.records += 1
+                    for kind, name in line_events(raw, counters, stats)[1]:
+                        out[kind][name] += 1
         except OSError:
             continue
+    return out, stats
 
 
-def iter_tool_uses(days: int):
-    for d in iter_jsonl(days):
-        msg = d.get("message") or {}
-        content = msg.get("content")
-        if not isinstance(content, list):
-            continue
-        for item in content:
-            if isinstance(item, dict) and item.get("type") == "tool_use":
-                yield item
+# ---- rollup store --------------------------------------------------------------
 
+def _head_hash(f, length: int) -> str:
+    f.seek(0)
+    return hashlib.sha1(f.read(length)).hexdigest()
 
-def count_mcp(days: int) -> Counter:
-    c = Counter()
-    for tu in iter_tool_uses(days):
-        name = tu.get("name") or ""
-        if name.startswith("mcp__"):
-            parts = name.split("__", 2)
-            if len(parts) >= 2:
-                c[parts[1]] += 1
-    return c
 
+def _complete(raw: bytes) -> bool:
+    try:
+        json.loads(raw)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return False
+    return True
 
-def count_builtin(days: int) -> Counter:
-    c = Counter()
-    for tu in iter_tool_uses(days):
-        name = tu.get("name") or ""
-        if name and not name.startswith("mcp__"):
-            c[name] += 1
-    return c
 
+def _cursor(db: sqlite3.Connection, fp: Path, st: os.stat_result):
+    """(files の行 | None, 読む必要があるか)。"""
+    row = db.execute("SELECT id, mtime, size, byte_offset, head_hash FROM files WHERE path = ?",
+                     (str(fp),)).fetchone()
+    # size は読んだ所まで。byte_offset < 実サイズなら未読の末尾がある
+    current = row and row[1] >= st.st_mtime and row[2] == st.st_size and row[3] == st.st_size
+    return row, not current
 
-def count_skill(days: int) -> Counter:
-    """<command-name>/skill-name</command-name> タグで識別"""
-    pat = re.compile(r"<command-name>/?([a-zA-Z0-9_\-:]+)</command-name>")
-    c = Counter()
-    for d in iter_jsonl(days):
-        msg = d.get("message") or {}
-        content = msg.get("content")
-        texts = []
-        if isinstance(content, str):
-            texts.append(content)
-        elif isinstance(content, list):
-            for item in content:
-                if isinstance(item, dict) and item.get("type") == "text":
-                    texts.append(item.get("text") or "")
-        for t in texts:
-            for m in pat.findall(t):
-                c[m] += 1
-    return c
+
+def _refresh_file(db: sqlite3.Connection, fp: Path, st: os.stat_result, counters, stats: ScanStats) -> bool:
+    """1ファイルの追記分を rollup に足す（呼び出し側のトランザクション内）。読んだら True。"""
+    row, todo = _cursor(db, fp, st)  # ロックを取ってから読み直す（別プロセスが先に進めているかもしれない）
+    if not todo:
+        return False
+    rel = fp.relative_to(PROJECTS_DIR)
+    project = rel.parts[0] if len(rel.parts) > 1 else "unknown"
+    fallback_day = datetime.fromtimestamp(st.st_mtime, timezone.utc).date().isoformat()
+    settled = time.time() - st.st_mtime >= SETTLE_SECONDS
+    with fp.open("rb") as f:
+        offset = 0
+        if row and st.st_size >= row[3] and _head_hash(f, min(HEAD_BYTES, row[3])) == row[4]:
+            offset = row[3]
+        if row:
+            file_id = row[0]
+            if offset == 0:
+                db.execute("DELETE FROM rollup WHERE file_id = ?", (file_id,))
+        else:
+            file_id = db.execute(
+                "INSERT INTO files(path, project, mtime, size, byte_offset) VALUES (?, ?, 0, 0, 0)",
+                (str(fp), project)).lastrowid
+        agg = Counter()
+        f.seek(offset)
+        for raw in f:
+            # 書き込み途中の末尾行は次回に回す（静止したファイルで JSON として完結していれば数える）
+            if not raw.endswith(b"\n") and not (settled and _complete(raw)):
+                break
+            offset += len(raw)
+            stats.bytes += len(raw)
+            stats.records += 1
+            day, events = line_events(raw, counters, stats)
+            if events:
+                day = day or fallback_day
+                for kind, name in events:
+                    agg[(day, kind, name)] += 1
+        hh = _head_hash(f, min(HEAD_BYTES, offset))
+    db.executemany(
+        "INSERT INTO rollup(file_id, day, kind, name, n) VALUES (?, ?, ?, ?, ?)"
+        " ON CONFLICT(file_id, day, kind, name) DO UPDATE SET n = n + excluded.n",
+        [(file_id, day, kind, name, n) for (day, kind, name), n in agg.items()])
+    db.execute("UPDATE files SET mtime = ?, size = ?, byte_offset = ?, head_hash = ? WHERE id = ?",
+               (st.st_mtime, offset, offset, hh, file_id))
+    return True
 
 
-def count_edited_files(days: int) -> tuple[Counter, int]:
-    files = Counter()
-    for tu in iter_tool_uses(days):
-        name = tu.get("name") or ""
-        if name not in ("Edit", "Write", "NotebookEdit"):
+def refresh_rollup(db: sqlite3.Connection, days: int, counters=COUNTERS) -> ScanStats:
+    """窓内ファイルの追記分だけを rollup に反映（1ファイル1トランザクション）。"""
+    cutoff = time.time() - days * 86400
+    stats = ScanStats()
+    for fp in PROJECTS_DIR.rglob("*.jsonl"):
+        try:
+            st = fp.stat()
+        except OSError:
+            continue
+        if st.st_mtime < cutoff:
+            continue
+        if not _cursor(db, fp, st)[1]:  # 変化なしはロックを取らずに飛ばす
             continue
-        inp = tu.get("input") or {}
-        fp = inp.get("file_path") or inp.get("notebook_path")
-        if fp:
-            files[fp] += 1
-    return files, len(files)
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            done = _refresh_file(db, fp, st, counters, stats)
+            db.execute("COMMIT")
+        except OSError:
+            db.execute("ROLLBACK")
+            continue
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        stats.files += done
+    return stats
 
 
-def session_count(days: int) -> int:
-    sessions = set()
-    for d in iter_jsonl(days):
-        sid = d.get("sessionId")
-        if sid:
-            sessions.add(sid)
-    return len(sessions)
+def open_rollup(path: Path = ROLLUP_DB) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(path, timeout=30, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(ROLLUP_SCHEMA)
+    return db
+
+
+def cutoff_day(days: int) -> str:
+    return (datetime.now(timezone.utc) - timedelta(days=days)).date().isoformat()
+
+
+def rollup_counter(db: sqlite3.Connection, kind: str, days: int, project: str | None = None) -> Counter:
+    sql = "SELECT r.name, SUM(r.n) FROM rollup r"
+    params: list = [cutoff_day(days), kind]
+    where = "r.day >= ? AND r.kind = ?"
+    if project:
+        sql += " JOIN files f ON f.id = r.file_id"
+        where += " AND f.project LIKE ?"
+        params.append(f"%{project}%")
+    return Counter(dict(db.execute(f"{sql} WHERE {where} GROUP BY r.name", params).fetchall()))
 
 
 def print_top(c: Counter, top: int):
-    for name, n in c.most_common(top):
+    # 同数は名前順（rollup / --raw で出力順を揃える）
+    for name, n in sorted(c.items(), key=lambda kv: (-kv[1], kv[0]))[:top]:
         print(f"{n:6d}  {name}")
 
 
@@ -121,28 +397,46 @@ def main():
     ap.add_argument("--days", type=int, default=30)
     ap.add_argument("--type", choices=["mcp", "builtin", "skill", "edited-files", "sessions", "all"], default="all")
     ap.add_argument("--top", type=int, default=30)
+    ap.add_argument("--project", help="project dir substring (rollup mode only)")
+    ap.add_argument("--raw", action="store_true", help="full JSONL scan instead of the rollup store")
+    ap.add_argument("--no-refresh", action="store_true", help="answer from the rollup without catching up")
+    ap.add_argument("--db", default=str(ROLLUP_DB))
     args = ap.parse_args()
 
-    if args.type in ("mcp", "all"):
+    kinds = TYPE_KINDS[args.type]
+    if args.raw:
+        counters = [c for c in COUNTERS if c.kind in kinds]
+        counts, stats = scan_raw(args.days, counters)
+        print(stats.report("raw scan"), file=sys.stderr)
+    else:
+        db = open_rollup(Path(args.db))
+        if not args.no_refresh:
+            # rollup は全 kind を持つので常に全 counter で追記分を読む
+            stats = refresh_rollup(db, args.days)
+            if stats.files:
+                print(stats.report("rollup catch-up"), file=sys.stderr)
+        counts = {k: rollup_counter(db, k, args.days, args.project) for k in kinds}
+
+    if "mcp" in counts:
         print(f"\n=== MCP usage (tool_use events, last {args.days} days) ===")
-        print_top(count_mcp(args.days), args.top)
+        print_top(counts["mcp"], args.top)
 
-    if args.type in ("builtin", "all"):
+    if "builtin" in counts:
         print(f"\n=== Built-in tools (last {args.days} days) ===")
-        print_top(count_builtin(args.days), args.top)
+        print_top(counts["builtin"], args.top)
 
-    if args.type in ("skill", "all"):
+    if "skill" in counts:
         print(f"\n=== Skill invocations via <command-name> (last {args.days} days) ===")
-        print_top(count_skill(args.days), args.top)
+        print_top(counts["skill"], args.top)
 
-    if args.type in ("edited-files", "all"):
-        files, uniq = count_edited_files(args.days)
-        print(f"\n=== Top edited files (last {args.days} days, unique: {uniq}) ===")
+    if "file" in counts:
+        files = counts["file"]
+        print(f"\n=== Top edited files (last {args.days} days, unique: {len(files)}) ===")
         print_top(files, args.top)
 
-    if args.type in ("sessions", "all"):
+    if "session" in counts:
         print(f"\n=== Sessions (last {args.days} days) ===")
-        print(f"{session_count(args.days):6d}  unique sessionId")
+        print(f"{len(counts['session']):6d}  unique sessionId")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""bench_buzz_patterns.py — buzz_patterns.match_patterns のスライディング窓あたりコスト
+
+実 transcript (JSONL) から transcript-scanner.py と同じ手順でメッセージを取り出し、
+同じ 5 件窓の window_text を作って match_patterns を全窓に流す。
+  reference   : 旧実装 (カテゴリごとに全キーワードを `kw in text`)
+  current     : buzz_patterns.match_patterns (先頭文字の字種で分けた trie 正規表現2本 + 包含/跨ぎ表)
+  incremental : transcript-scanner.py Phase 2 の形 (メッセージごとに1回 keyword_hits →
+                KeywordWindow に出入りの差分だけ反映。窓本文は連結しない)
+3者の結果 (カテゴリ / キーワード / score) の一致も検査する。
+
+実行: python3 ~/.claude/tests/bench/bench_buzz_patterns.py [TRANSCRIPT ...] [--runs N]
+      (TRANSCRIPT 省略時は ~/.claude/projects 配下で最大の *.jsonl)
+"""
+import argparse
+import glob
+import importlib.util
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parents[2] / "hooks" / "scripts"
+sys.path.insert(0, str(SCRIPTS))
+
+import buzz_patterns  # noqa: E402
+
+
+def load_scanner():
+    spec = importlib.util.spec_from_file_location("transcript_scanner", SCRIPTS / "transcript-scanner.py")
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def reference_match_patterns(text):
+    """旧実装そのまま (比較用)。"""
+    results = []
+    for name, pdef in buzz_patterns.PATTERNS.items():
+        distinct = list(dict.fromkeys(kw for kw in pdef["keywords"] if kw in text))
+        if len(distinct) >= pdef["min_keywords"]:
+            score = min(pdef["base_score"] + 0.1 * (len(distinct) - pdef["min_keywords"]),
+                        pdef["base_score"] + 1.0)
+            results.append((name, distinct, round(score, 2)))
+    return results
+
+
+def messages(path, scanner):
+    """transcript-scanner.py Phase 1 と同じ抽出 (prefilter → user/assistant の text ブロック)。"""
+    out = []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if not buzz_patterns.PREFILTER_REGEX.search(line):
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get("type") not in ("user", "assistant"):
+                continue
+            content = (entry.get("message") or {}).get("content", "")
+            if isinstance(content, str):
+                raw = [content]
+            elif isinstance(content, list):
+                raw = [b.get("text", "") for b in content if isinstance(b, dict) and b.get("type") == "text"]
+            else:
+                raw = []
+            texts = [scanner.SYSTEM_TAG_RE.sub("", t).strip() for t in raw
+                     if not any(t.lstrip().startswith(p) for p in scanner.NOISE_PREFIXES)]
+            text = " ".join(t for t in texts if t)
+            if len(text) >= 50:
+                out.append(text)
+    return out
+
+
+def windows(msgs, size):
+    out = []
+    for i in range(len(msgs)):
+        if len(msgs[i]) < 80:
+            continue
+        win = [m for m in msgs[i:i + size] if len(m) >= 50]
+        out.append("\n".join(win))
+    return out
+
+
+def current_match_patterns(text):
+    return [(m.pattern_name, m.matched_keywords, m.score) for m in buzz_patterns.match_patterns(text)]
+
+
+def rescan(msgs, size, fn):
+    """旧 Phase 2: 窓ごとに連結して丸ごと照合。"""
+    return [fn(w) for w in windows(msgs, size)]
+
+
+def incremental(msgs, size):
+    """現 Phase 2: メッセージ単位の hits を窓に出し入れ。"""
+    hits = [buzz_patterns.keyword_hits(m) for m in msgs]
+    window = buzz_patterns.KeywordWindow()
+    for h in hits[:size]:
+        window.add(h)
+    out = []
+    for i in range(len(msgs)):
+        if i:
+            window.remove(hits[i - 1])
+            if i + size - 1 < len(msgs):
+                window.add(hits[i + size - 1])
+        if len(msgs[i]) < 80:
+            continue
+        out.append([(name, window.keywords(name), score) for name, score in window.scores()])
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("transcripts", nargs="*")
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+    paths = args.transcripts or sorted(
+        glob.glob(os.path.expanduser("~/.claude/projects/**/*.jsonl"), recursive=True),
+        key=os.path.getsize)[-1:]
+    if not paths:
+        sys.exit("transcript が見つからない (引数で JSONL を指定)")
+
+    scanner = load_scanner()
+    size = scanner.WINDOW_SIZE
+    transcripts = [messages(p, scanner) for p in paths]
+    wins = [w for msgs in transcripts for w in windows(msgs, size)]
+    chars = sum(map(len, wins))
+    print(f"{len(paths)} transcript(s), {len(wins)} windows, {chars / 1e6:.2f}M chars")
+
+    runners = (
+        ("reference", lambda msgs: rescan(msgs, size, reference_match_patterns)),
+        ("current", lambda msgs: rescan(msgs, size, current_match_patterns)),
+        ("incremental", lambda msgs: incremental(msgs, size)),
+    )
+    want = [r for msgs in transcripts for r in runners[0][1](msgs)]
+    mismatch = 0
+    for tag, fn in runners[1:]:
+        got = [r for msgs in transcripts for r in fn(msgs)]
+        bad = sum(1 for g, w in zip(got, want) if g != w) + abs(len(got) - len(want))
+        print(f"result mismatches ({tag}): {bad}")
+        mismatch += bad
+
+    for tag, fn in runners:
+        best = None
+        for _ in range(args.runs):
+            t0 = time.perf_counter()
+            for msgs in transcripts:
+                fn(msgs)
+            dt = time.perf_counter() - t0
+            best = dt if best is None or dt < best else best
+        print(f"[{tag:11s}] total {best * 1000:8.1f} ms   per window {best / max(1, len(wins)) * 1e6:7.1f} µs")
+    sys.exit(1 if mismatch else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""bench_edit_history.py — Edit/Read 履歴フック (書き手 / 読み手) の1回あたりレイテンシ
+
+  writer: posttooluse-edit-history.py の main() (Edit/Read 1件の記録。履歴は LINES 行から開始)
+  reader: userpromptsubmit-edit-recheck-warn.py の main() (LINES 行の履歴がある状態で1 prompt)
+interpreter 起動を除いた in-process 計測。HOME は一時 dir に差し替える。
+
+--compare DIR で別版のフック2本 (git show REV:hooks/<name> > DIR/<name>) も同じ条件で測る。
+
+実行: python3 ~/.claude/tests/bench/bench_edit_history.py [--lines N] [--runs N] [--compare DIR]
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HOOKS = Path(__file__).resolve().parents[2] / "hooks"
+WRITER = "posttooluse-edit-history.py"
+READER = "userpromptsubmit-edit-recheck-warn.py"
+SESSION = "bench-session"
+
+
+def load(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def seed(home, lines, writer):
+    """LINES 行ずつの edit/read 履歴を writer 経由で作る (ストアと jsonl の両方が揃う)。"""
+    for i in range(lines):
+        session = SESSION if i % 4 == 0 else f"other-{i % 7}"
+        for tool in ("Edit", "Read"):
+            call(writer, {"session_id": session, "tool_name": tool,
+                          "tool_input": {"file_path": f"/proj/src/module_{i % 300}.py"}})
+
+
+def call(mod, payload):
+    sys.stdin = io.StringIO(json.dumps(payload))
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            mod.main()
+        except SystemExit:
+            pass
+
+
+def measure(hooks_dir, lines, runs, tag):
+    home = tempfile.mkdtemp(prefix="bench-edit-history-")
+    old_home = os.environ.get("HOME")
+    os.environ["HOME"] = home
+    try:
+        writer = load(hooks_dir / WRITER, f"writer_{tag}")
+        reader = load(hooks_dir / READER, f"reader_{tag}")
+        seed(home, lines, writer)
+        w, r = [], []
+        for i in range(runs):
+            t0 = time.perf_counter()
+            call(writer, {"session_id": SESSION, "tool_name": "Edit" if i % 2 else "Read",
+                          "tool_input": {"file_path": f"/proj/src/module_{i % 300}.py"}})
+            w.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            call(reader, {"session_id": SESSION, "prompt": f"module_{i % 300}.py の変更を確認して"})
+            r.append((time.perf_counter() - t0) * 1000)
+        print(f"[{tag}] lines={lines}  writer p50 {pct(w, 50):7.3f} / p99 {pct(w, 99):7.3f} ms"
+              f"   reader p50 {pct(r, 50):7.3f} / p99 {pct(r, 99):7.3f} ms")
+    finally:
+        os.environ["HOME"] = old_home or ""
+        sys.stdin = sys.__stdin__
+        shutil.rmtree(home, ignore_errors=True)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, default=1000)
+    ap.add_argument("--runs", type=int, default=200)
+    ap.add_argument("--compare", help="dir containing another version of both hooks")
+    args = ap.parse_args()
+    if args.compare:
+        measure(Path(args.compare), args.lines, args.runs, "compare")
+    measure(HOOKS, args.lines, args.runs, "current")
+
+
+if __name__ == "__main__":
+    main()
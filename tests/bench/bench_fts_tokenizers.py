@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""bench_fts_tokenizers.py — index.db の tokenizer 別 索引サイズ / MATCH レイテンシ比較
+
+既存 index.db の messages を一時 DB にコピーし、unicode61 / trigram / bigram それぞれで
+messages_fts を作って以下を出す:
+  - FTS 索引サイズ (dbstat の messages_fts* 合計。bigram は content_cjk 影列の増分も加算)
+  - クエリ毎の総 hit 件数と MATCH レイテンシ p50 / p99 (search_history.search 経由・limit 20)
+
+実行: python3 ~/.claude/tests/bench/bench_fts_tokenizers.py [--db PATH] [--limit-rows N] [--runs N]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parents[2] / "scripts"
+sys.path.insert(0, str(SCRIPTS))
+from history_fts import TOKENIZERS, cjk_bigrams, fts_schema, match_expr  # noqa: E402
+from search_history import search  # noqa: E402
+
+DEFAULT_DB = Path.home() / ".claude" / "archives" / "index.db"
+QUERIES = ["実装", "テスト", "インデックス", "検索 hook", "session", "vault"]
+
+
+def build(src, dst, tokenizer, limit_rows):
+    shutil.copyfile(src, dst)
+    db = sqlite3.connect(dst)
+    db.create_function("cjk_bigrams", 1, cjk_bigrams, deterministic=True)
+    db.executescript("""
+DROP TRIGGER IF EXISTS messages_ai;
+DROP TRIGGER IF EXISTS messages_ad;
+DROP TABLE IF EXISTS messages_fts;
+""")
+    if limit_rows:
+        db.execute("DELETE FROM messages WHERE id NOT IN (SELECT id FROM messages ORDER BY id LIMIT ?)",
+                   (limit_rows,))
+    cols = {r[1] for r in db.execute("PRAGMA table_info(messages)")}
+    if "content_cjk" not in cols:
+        db.execute("ALTER TABLE messages ADD COLUMN content_cjk TEXT")
+    if tokenizer == "bigram":
+        db.execute("UPDATE messages SET content_cjk = cjk_bigrams(content)")
+    else:
+        db.execute("UPDATE messages SET content_cjk = NULL")
+    db.commit()
+    t0 = time.perf_counter()
+    db.executescript(fts_schema(tokenizer))
+    db.execute("INSERT INTO messages_fts(messages_fts) VALUES('rebuild')")
+    db.commit()
+    build_s = time.perf_counter() - t0
+    db.execute("VACUUM")
+    return db, build_s
+
+
+def fts_bytes(db):
+    fts = db.execute("SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name LIKE 'messages_fts%'").fetchone()[0]
+    shadow = db.execute("SELECT COALESCE(SUM(LENGTH(CAST(content_cjk AS BLOB))), 0) FROM messages").fetchone()[0]
+    return fts, shadow
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=str(DEFAULT_DB))
+    ap.add_argument("--limit-rows", type=int, default=0, help="use only the first N messages")
+    ap.add_argument("--runs", type=int, default=30)
+    args = ap.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"DB not found: {args.db}", file=sys.stderr)
+        sys.exit(1)
+
+    tmp = tempfile.mkdtemp(prefix="bench-fts-")
+    try:
+        print(f"{'tokenizer':10} {'build':>7} {'fts MB':>8} {'shadow MB':>9}  query: hits p50/p99 ms")
+        for tok in TOKENIZERS:
+            db, build_s = build(args.db, os.path.join(tmp, f"{tok}.db"), tok, args.limit_rows)
+            fts, shadow = fts_bytes(db)
+            cells = []
+            for q in QUERIES:
+                try:
+                    hits = db.execute("SELECT COUNT(*) FROM messages_fts WHERE messages_fts MATCH ?",
+                                      (match_expr(q, tok),)).fetchone()[0]
+                except ValueError:
+                    cells.append(f"{q}: n/a")
+                    continue
+                lat = []
+                for _ in range(args.runs):
+                    t0 = time.perf_counter()
+                    search(db, q, limit=20)
+                    lat.append((time.perf_counter() - t0) * 1000)
+                cells.append(f"{q}: {hits} {pct(lat, 50):.1f}/{pct(lat, 99):.1f}")
+            print(f"{tok:10} {build_s:6.1f}s {fts / 1e6:8.1f} {shadow / 1e6:9.1f}  " + " | ".join(cells))
+            db.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""bench_hook_daemon.py — Python フック1回あたりの壁時計 (直接実行 vs _hookd-client.py 経由)
+
+settings.json の直接起動 (~/.claude/hooks/X.py) と、常駐デーモン (_hookd.py) + shim
+(_hookd-client.py X.py) の計測なし (HOOK_PROFILE=0) / 計測あり (既定・hook-profile.bin へ記録) で、
+代表的な stdin JSON を流して p50 / p99 を出す。
+HOME は一時 dir に差し替える (フックの state 書き込みで本物の ~/.claude/state を汚さない)。
+
+実行: python3 ~/.claude/tests/bench/bench_hook_daemon.py [--runs N] [--hook NAME ...]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HOOKS = Path(__file__).resolve().parents[2] / "hooks"
+CLIENT = HOOKS / "_hookd-client.py"
+DAEMON = HOOKS / "_hookd.py"
+
+PAYLOADS = {
+    "block-host-installs.py": {"tool_name": "Bash", "tool_input": {"command": "git status && ls -la"}},
+    "block-dangerous-git.py": {"tool_name": "Bash", "tool_input": {"command": "git log --oneline -5"}},
+    "route-google-workspace.py": {"tool_name": "WebFetch", "tool_input": {"url": "https://example.com/"}},
+    "search-playbook-nudge.py": {"tool_name": "WebSearch", "tool_input": {"query": "sqlite fts5"}},
+    "playwright-proxy-guard.py": {"tool_name": "mcp__playwright__browser_navigate",
+                                  "tool_input": {"url": "https://example.com/"}},
+    "posttooluse-edit-history.py": {"session_id": "bench", "tool_name": "Read",
+                                    "tool_input": {"file_path": "/tmp/bench.txt"}},
+}
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def timed(cmd, stdin, env):
+    t0 = time.perf_counter()
+    subprocess.run(cmd, input=stdin, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - t0) * 1000
+
+
+def wait_socket(path, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if time.monotonic() > deadline:
+            raise SystemExit(f"daemon did not start: {path}")
+        time.sleep(0.02)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=30)
+    ap.add_argument("--hook", action="append", help="hook file name (default: all with a sample payload)")
+    args = ap.parse_args()
+
+    home = tempfile.mkdtemp(prefix="bench-hookd-")
+    sock = os.path.join(home, "hookd.sock")
+    env = dict(os.environ, HOME=home, HOOKD_SOCKET=sock, HOOK_PROFILE="0")
+    env_prof = dict(env, HOOK_PROFILE="1", HOOK_PROFILE_LOG=os.path.join(home, "hook-profile.bin"))
+    daemon = subprocess.Popen([sys.executable, "-I", str(DAEMON), "--socket", sock], env=env)
+    try:
+        wait_socket(sock)
+        print(f"{'hook':30} {'direct p50/p99 ms':>20} {'hookd p50/p99 ms':>20} {'hookd+profile p50/p99':>22}")
+        for name in args.hook or PAYLOADS:
+            stdin = json.dumps(PAYLOADS.get(name, {})).encode()
+            direct, via, prof = [], [], []
+            for _ in range(args.runs):
+                direct.append(timed([str(HOOKS / name)], stdin, env))
+                via.append(timed([str(CLIENT), name], stdin, env))
+                prof.append(timed([str(CLIENT), "--event", "PreToolUse", name], stdin, env_prof))
+            print(f"{name:30} {pct(direct, 50):9.1f}/{pct(direct, 99):<9.1f} {pct(via, 50):9.1f}/{pct(via, 99):<9.1f}"
+                  f" {pct(prof, 50):10.1f}/{pct(prof, 99):<10.1f}")
+    finally:
+        daemon.terminate()
+        daemon.wait()
+        shutil.rmtree(home, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""bench_prompt_history_reflect.py — SessionStart 時の prompt-history-reflect.py 1回の所要時間
+
+合成 vault: 2 ホスト × DAYS 日 × PER_DAY 件の queue (全件反映済み + 台帳済み) に、
+今回ぶんの新着受領票 --new 件を足した状態で1回走らせる (= 毎回の SessionStart の形)。
+  steady  : チェックポイントあり (新規 bytes だけ読む)
+  verify  : --verify (全量再走査・監査用)
+--compare OLD_SCRIPT で別版 (git show REV:scripts/prompt-history-reflect.py > OLD) も同条件で測る。
+
+実行: python3 ~/.claude/tests/bench/bench_prompt_history_reflect.py [--days N] [--per-day N] [--new N] [--runs N]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+
+SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "prompt-history-reflect.py"
+INBOX = "03_ClaudeEnv/prompts/ClaudeEnv_INBOX.md"
+
+
+def record(day, i, prompt):
+    return json.dumps({"ts": f"{day}T{i // 60 % 24:02d}:{i % 60:02d}:00+09:00",
+                       "event_id": str(uuid.uuid4()), "host_uuid": "h", "session_id": "s",
+                       "cwd": "/x", "route": "claude-env", "prompt": prompt,
+                       "mask_hits": [], "held": False}, ensure_ascii=False) + "\n"
+
+
+def build(tmp, days, per_day):
+    state = os.path.join(tmp, "state")
+    vault = os.path.join(tmp, "vault")
+    os.makedirs(os.path.join(state, "receipts"))
+    os.makedirs(os.path.dirname(os.path.join(vault, INBOX)))
+    host = str(uuid.uuid4())
+    with open(os.path.join(state, "host-uuid"), "w") as f:
+        f.write(host + "\n")
+    with open(os.path.join(vault, INBOX), "w") as f:
+        f.write("# 📥 prompts\n")
+    cfg = os.path.join(tmp, "config.json")
+    with open(cfg, "w") as f:
+        json.dump({"writer_host_uuid": host, "vault_root": vault,
+                   "routes": {"claude-env": INBOX, "general": INBOX}, "cwd_prefixes": {}}, f)
+    body = "この関数の挙動を確認して、テストを追加してください。" * 8
+    start = date.today() - timedelta(days=days)
+    for h in (host, str(uuid.uuid4())):
+        qdir = os.path.join(vault, "03_ClaudeEnv", "prompts", ".queue", h)
+        os.makedirs(qdir)
+        for d in range(days):
+            day = (start + timedelta(days=d)).isoformat()
+            with open(os.path.join(qdir, day + ".jsonl"), "w") as f:
+                f.writelines(record(day, i, body) for i in range(per_day))
+    env = dict(os.environ, PROMPT_HISTORY_STATE=state, PROMPT_HISTORY_VAULT=vault,
+               PROMPT_HISTORY_CONFIG=cfg)
+    return env, state
+
+
+def add_receipts(state, n):
+    day = date.today().isoformat()
+    with open(os.path.join(state, "receipts", day + ".jsonl"), "a") as f:
+        f.writelines(record(day, i, f"新着 {i}") for i in range(n))
+
+
+def timed(script, env, *args):
+    t0 = time.perf_counter()
+    r = subprocess.run([sys.executable, str(script), *args], capture_output=True, text=True, env=env)
+    if r.returncode != 0:
+        sys.exit(r.stdout + r.stderr)
+    return (time.perf_counter() - t0) * 1000
+
+
+def measure(script, args, tag, modes):
+    tmp = tempfile.mkdtemp(prefix="bench-phr-")
+    try:
+        env, state = build(tmp, args.days, args.per_day)
+        timed(script, env)  # 既存分を反映 + チェックポイント作成
+        for mode in modes:
+            xs = []
+            for _ in range(args.runs):
+                add_receipts(state, args.new)
+                xs.append(timed(script, env, *(["--verify"] if mode == "verify" else [])))
+            xs.sort()
+            print(f"[{tag}] {mode:6s} events={2 * args.days * args.per_day}"
+                  f"  p50 {xs[len(xs) // 2]:8.1f} ms  max {xs[-1]:8.1f} ms")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=180)
+    ap.add_argument("--per-day", type=int, default=40)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--new", type=int, default=3, help="1回あたりの新着受領票 (0 = 新着なし)")
+    ap.add_argument("--compare", help="別版の prompt-history-reflect.py")
+    args = ap.parse_args()
+    if args.compare:
+        measure(Path(args.compare), args, "compare", ["steady"])
+    measure(SCRIPT, args, "current", ["steady", "verify"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""bench_prompt_masker.py — userpromptsubmit-prompt-history.py の mask_secrets レイテンシ計測
+
+送信のたびに同期で走るマスカーの p50 / p99 を、実形状に寄せた合成コーパスで測る:
+  短文指示 / .env 貼付 / スタックトレース / JSON・ログ貼付 / git diff / ~190KB 巨大貼付
+（200KB 超は hook 側で held になりマスカーを通らないので上限手前まで）
+
+--compare OLD_HOOK で旧実装と同じコーパスを流し、出力 (masked, hits) の一致も検査する。
+
+実行: python3 ~/.claude/tests/bench/bench_prompt_masker.py [--runs N] [--compare PATH]
+"""
+import argparse
+import importlib.util
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+HOOK = Path(__file__).resolve().parents[2] / "hooks" / "userpromptsubmit-prompt-history.py"
+PASTE_LIMIT = 190_000
+
+
+def load(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def rand_token(rng, n, alphabet=string.ascii_letters + string.digits):
+    return "".join(rng.choice(alphabet) for _ in range(n))
+
+
+def build_corpus(seed=7):
+    rng = random.Random(seed)
+    jp = ["INBOX を見て、rules/30-routing.md の表を更新してください。",
+          "このエラーの原因を調べて直して。テストも追加でお願いします。",
+          "前回の続き。plan.md の Phase 2 を実装して、終わったら commit して。",
+          "hook の計測結果を vault にまとめて、差分があれば教えて。"]
+    corpus = []
+    for _ in range(200):
+        corpus.append(("short", rng.choice(jp)))
+    for _ in range(40):
+        env = "\n".join([
+            f"ANTHROPIC_API_KEY=sk-ant-api03-{rand_token(rng, 40)}",
+            f"DATABASE_URL=postgres://admin:{rand_token(rng, 12)}@db.example.com/prod",
+            "DEBUG=true", "PORT=8000", f"SESSION_SECRET={rand_token(rng, 32)}",
+        ])
+        corpus.append(("env", "この .env を見て:\n" + env))
+    trace = "\n".join(
+        f'  File "/Users/me/proj/app/module_{i}.py", line {rng.randint(1, 900)}, in handler_{i}\n'
+        f"    result = self.client.call(payload, request_id='{rand_token(rng, 24)}')"
+        for i in range(40))
+    for _ in range(40):
+        corpus.append(("trace", "これ直して\nTraceback (most recent call last):\n" + trace))
+    log = "\n".join(
+        f'{{"ts": "2026-07-{rng.randint(10, 28)}T10:{rng.randint(10, 59)}:00Z", "level": "info", '
+        f'"trace_id": "{rand_token(rng, 32, "0123456789abcdef")}", "msg": "request handled in {rng.randint(1, 900)}ms"}}'
+        for _ in range(300))
+    for _ in range(20):
+        corpus.append(("log", "ログ貼ります\n" + log))
+    diff = "\n".join(
+        f"+    const {rand_token(rng, 8, string.ascii_lowercase)} = await fetch(`${{BASE}}/api/v1/items/${{id}}`);"
+        for _ in range(400))
+    for _ in range(20):
+        corpus.append(("diff", "diff --git a/src/app.ts b/src/app.ts\n" + diff))
+    for _ in range(5):
+        chunks = []
+        size = 0
+        while size < PASTE_LIMIT:
+            c = rng.choice([trace, log, diff, rng.choice(jp) * 20])
+            chunks.append(c)
+            size += len(c.encode("utf-8"))
+        big = "\n".join(chunks)
+        corpus.append(("paste190k", big.encode("utf-8")[:PASTE_LIMIT].decode("utf-8", "ignore")))
+    return corpus
+
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def measure(mod, corpus, runs):
+    by_kind = {}
+    for _ in range(runs):
+        for kind, text in corpus:
+            t0 = time.perf_counter()
+            mod.mask_secrets(text)
+            by_kind.setdefault(kind, []).append((time.perf_counter() - t0) * 1000)
+    return by_kind
+
+
+def report(label, by_kind):
+    print(f"[{label}]")
+    allv = []
+    for kind, xs in by_kind.items():
+        allv += xs
+        print(f"  {kind:10} n={len(xs):5d}  p50 {pct(xs, 50):8.3f} ms  p99 {pct(xs, 99):8.3f} ms")
+    print(f"  {'ALL':10} n={len(allv):5d}  p50 {pct(allv, 50):8.3f} ms  p99 {pct(allv, 99):8.3f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--hook", default=str(HOOK))
+    ap.add_argument("--compare", help="path to another version of the hook (e.g. git show REV:... > old.py)")
+    args = ap.parse_args()
+
+    corpus = build_corpus()
+    cur = load(args.hook, "masker_current")
+    if args.compare:
+        old = load(args.compare, "masker_compare")
+        mismatch = sum(1 for _, t in corpus if old.mask_secrets(t) != cur.mask_secrets(t))
+        print(f"output mismatches vs --compare: {mismatch}/{len(corpus)}")
+        report("compare", measure(old, corpus, args.runs))
+    report("current", measure(cur, corpus, args.runs))
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""bench_resolve_note.py — report_action_presence_gate.resolve_note の deep link 解決コスト
+
+合成 vault (既定 10k ノート: 100 プロジェクト × 10 サブdir × 10 ノート) に対し、
+近傍 / 遠方 / 未解決が混ざったリンクを解決する。
+  reference : 旧実装 (近傍3段を glob で探り、無ければ glob(VAULT/**/name.md) で vault 全域を歩く)
+  cold      : 現実装・索引 DB なし (初回に vault 全体を読んで索引を作る)
+  warm      : 現実装・索引 DB あり (プロセス起動時の stat 一巡 + basename map 構築込み)
+reference と現実装の解決結果の一致も検査する。
+
+実行: python3 ~/.claude/tests/bench/bench_resolve_note.py [--notes N] [--links N]
+"""
+import argparse
+import glob
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parents[2] / "scripts"
+sys.path.insert(0, str(SCRIPTS))
+
+import report_action_presence_gate as gate  # noqa: E402
+from vault_index import VaultIndex  # noqa: E402
+
+
+def reference_resolve_note(vault, name, near_dir):
+    """旧実装そのまま (比較用)。"""
+    fname = name + ".md"
+    d = near_dir
+    for _ in range(3):
+        for cand in (os.path.join(d, fname), *glob.glob(os.path.join(d, "*", fname))):
+            if os.path.isfile(cand):
+                return cand
+        d = os.path.dirname(d)
+    hits = glob.glob(os.path.join(vault, "**", fname), recursive=True)
+    hits = [h for h in hits if os.path.isfile(h) and "/.trash/" not in h]
+    return hits[0] if hits else None
+
+
+def make_vault(root, notes):
+    """proj-XXX/sub-Y/note-XXX-Y-Z.md (basename は vault 内で一意) と各プロジェクトの reports/。"""
+    per_proj = 100
+    paths = []
+    for i in range(notes):
+        p, rest = divmod(i, per_proj)
+        rel = f"proj-{p:03d}/sub-{rest // 10}/note-{p:03d}-{rest // 10}-{rest % 10}.md"
+        paths.append(rel)
+    for rel in paths:
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("# 見出し\n本文 ^blk\n")
+    for p in range((notes + per_proj - 1) // per_proj):
+        os.makedirs(os.path.join(root, f"proj-{p:03d}", "reports"), exist_ok=True)
+    return paths
+
+
+def make_links(paths, n, rng):
+    """(name, near_dir 相対) — 4割近傍・4割遠方・2割未解決。"""
+    links = []
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.4:
+            rel = rng.choice(paths)
+            links.append((Path(rel).stem, rel.split("/")[0] + "/reports"))
+        elif r < 0.8:
+            rel = rng.choice(paths)
+            other = rng.choice(paths).split("/")[0]
+            links.append((Path(rel).stem, other + "/reports"))
+        else:
+            links.append((f"missing-{rng.randrange(10 ** 6)}", rng.choice(paths).split("/")[0] + "/reports"))
+    return links
+
+
+def run_current(vault, db, links):
+    gate.VAULT = vault
+    gate._index = VaultIndex(vault, db)
+    gate._note_map = None
+    t0 = time.perf_counter()
+    out = [gate.resolve_note(name, os.path.join(vault, near)) for name, near in links]
+    dt = time.perf_counter() - t0
+    gate._index.close()
+    return out, dt
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--notes", type=int, default=10000)
+    ap.add_argument("--links", type=int, default=200)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-resolve-note-")
+    try:
+        vault = os.path.join(tmp, "vault")
+        db = os.path.join(tmp, "index.db")
+        paths = make_vault(vault, args.notes)
+        links = make_links(paths, args.links, random.Random(20261017))
+        print(f"{len(paths)} notes, {len(links)} links")
+
+        t0 = time.perf_counter()
+        want = [reference_resolve_note(vault, name, os.path.join(vault, near)) for name, near in links]
+        ref = time.perf_counter() - t0
+        cold_out, cold = run_current(vault, db, links)
+        warm_out, warm = run_current(vault, db, links)
+        bad = sum(1 for g, w in zip(cold_out, want) if g != w) + sum(1 for g, w in zip(warm_out, want) if g != w)
+        print(f"result mismatches: {bad}")
+        for tag, dt in (("reference", ref), ("cold", cold), ("warm", warm)):
+            print(f"[{tag:9s}] total {dt * 1000:9.1f} ms   per link {dt / len(links) * 1000:8.3f} ms")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    sys.exit(1 if bad else 0)
+
+
+if __name__ == "__main__":
+    main()